@@ -0,0 +1,84 @@
+from typing import Sequence, Union
+import numpy as np
+
+
+class AudioBuffer:
+    # Audio passed between nodes: a float32 (channels, frames) array whose rows are
+    # contiguous, plus its sample rate. Slicing in time or picking channels returns
+    # views, so nodes never need to copy or re-check what they receive.
+    __slots__ = ("data", "sample_rate")
+
+    def __init__(self, data: np.ndarray, sample_rate: int):
+        if data.ndim != 2 or data.dtype != np.float32:
+            raise ValueError(f"AudioBuffer needs a float32 (channels, frames) array, got {data.dtype} {data.shape}")
+        if data.shape[1] > 1 and data.strides[1] != data.itemsize:
+            raise ValueError("AudioBuffer channels must be contiguous in time")
+        self.data = data
+        self.sample_rate = int(sample_rate)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, sample_rate: int) -> 'AudioBuffer':
+        # Accepts the (frames,) and (frames, channels) layouts used by files and the wire format.
+        if array.ndim == 1:
+            return cls(np.asarray(array, dtype=np.float32)[None, :], sample_rate)
+        return cls(np.ascontiguousarray(array.T, dtype=np.float32), sample_rate)
+
+    @classmethod
+    def from_channels(cls, array: np.ndarray, sample_rate: int) -> 'AudioBuffer':
+        # Accepts (channels, frames) data such as model output, copying only if it is not float32 rows already.
+        array = np.asarray(array, dtype=np.float32)
+        if array.ndim == 1:
+            array = array[None, :]
+        if array.shape[1] > 1 and array.strides[1] != array.itemsize:
+            array = np.ascontiguousarray(array)
+        return cls(array, sample_rate)
+
+    @classmethod
+    def allocate(cls, channels: int, frames: int, sample_rate: int, pool=None) -> 'AudioBuffer':
+        if pool is None:
+            return cls(np.empty((channels, frames), dtype=np.float32), sample_rate)
+        return cls(pool.acquire((channels, frames), np.float32), sample_rate)
+
+    @property
+    def channels(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def frames(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def duration_secs(self) -> float:
+        return self.frames / self.sample_rate
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def __repr__(self) -> str:
+        return f"AudioBuffer({self.channels}ch, {self.frames} frames, {self.sample_rate}Hz)"
+
+    def slice(self, start: int, stop: int = None) -> 'AudioBuffer':
+        return AudioBuffer(self.data[:, start:stop], self.sample_rate)
+
+    def select_channels(self, channels: Union[int, slice, Sequence[int]]) -> 'AudioBuffer':
+        if isinstance(channels, int):
+            return AudioBuffer(self.data[channels:channels + 1], self.sample_rate)
+        # Slices stay views; an explicit list of channels has to be gathered into a copy.
+        return AudioBuffer(self.data[channels], self.sample_rate)
+
+    def interleaved(self) -> np.ndarray:
+        # A (frames, channels) view for writers and devices; it is not contiguous unless mono.
+        return self.data.T
+
+    def read_only(self) -> 'AudioBuffer':
+        # A view that raises on writes, for handing one result to several consumers; the owner keeps write access.
+        view = self.data.view()
+        view.flags.writeable = False
+        return AudioBuffer(view, self.sample_rate)
+
+    def copy(self) -> 'AudioBuffer':
+        return AudioBuffer(self.data.copy(), self.sample_rate)
@@ -1,13 +1,60 @@
 import threading
 import queue
 import time
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from nodes import END_OF_STREAM, NODE_REGISTRY
+from model_registry import ModelRegistry
+from buffer_pool import BufferPool
+from render_context import CancelToken, RenderCancelled, RenderContext
+from process_backend import ProcessNodeBackend
+from profiler import NodeProfiler
+from preview import PreviewRenderer
+from waveform import WaveformPyramid
+from audio_buffer import AudioBuffer
+from render_cache import cache_keys
+
+class NodeComputeError(Exception):
+    def __init__(self, node_tag, error):
+        super().__init__(f"Node {node_tag} failed: {error}")
+        self.node_tag = node_tag
+        self.error = error
 
 class AudioEngine:
-    def __init__(self, results_queue):
+    def __init__(self, results_queue, max_workers=None, block_size=4096, retain_outputs=True, process_workers=1,
+                 preload_models=True, model_idle_secs=600.0, track_waveforms=False, render_cache=None):
         self.control_queue = queue.Queue()
         self.results_queue = results_queue
         self.worker_thread = None
         self.is_running = False
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = None
+        self.block_size = block_size
+        self.retain_outputs = retain_outputs
+        self.buffer_pool = BufferPool()
+        self.process_backend = ProcessNodeBackend(num_workers=process_workers)
+        self.preload_models = preload_models
+        self.models = ModelRegistry(idle_timeout_secs=model_idle_secs, status_callback=self.results_queue.put)
+        self.declare_models()
+        self.cancel_token = CancelToken()
+        self._cancel_lock = threading.Lock()
+        self.context = RenderContext(buffer_pool=self.buffer_pool, models=self.models, cancel_token=self.cancel_token)
+        self.output_cache = {}
+        self.dirty_nodes = set()
+        # Optional RenderCache keeping the outputs of expensive nodes on disk across sessions and processes.
+        self.render_cache = render_cache
+        # Overview pyramids per output attribute, for display; only kept when a GUI asks for them.
+        self.track_waveforms = track_waveforms
+        self.waveforms = {}
+        self.profiling = False
+        self.profile_memory = False
+        self.last_profile = None
+        self.preview = None
+        self.preview_sink = None
+        self._preview_lock = threading.Lock()
+        self._rendering = False
 
     def start(self):
         if self.is_running:
@@ -16,6 +63,7 @@ class AudioEngine:
         self.is_running = True
         self.worker_thread = threading.Thread(target=self.processing_loop)
         self.worker_thread.start()
+        self.models.start_reaper()
 
     def stop(self):
         if not self.is_running:
@@ -26,55 +74,543 @@ class AudioEngine:
         if self.worker_thread:
             self.worker_thread.join()
         self.worker_thread = None
+        self.stop_preview()
+        self.shutdown_executor()
+        self.models.stop_reaper()
+        self.models.unload_all()
+        self.process_backend.shutdown()
+
+    def submit(self, task):
+        # A newer render supersedes whatever is running; it is stopped at the next node or block boundary.
+        with self._cancel_lock:
+            self.control_queue.put(task)
+            self.cancel_token.cancel()
+
+    def cancel(self):
+        with self._cancel_lock:
+            self.cancel_token.cancel()
+
+    def take_latest_task(self, task):
+        # Only the newest queued render matters, but the edits behind the dropped ones still have to be recomputed.
+        with self._cancel_lock:
+            dropped = 0
+            while True:
+                try:
+                    newer = self.control_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    self.dirty_nodes.update(task.get('dirty_nodes', ()))
+                    return None
+                newer['dirty_nodes'] = set(newer.get('dirty_nodes', ())) | set(task.get('dirty_nodes', ()))
+                task = newer
+                dropped += 1
+            if dropped:
+                print(f"AudioEngine: Coalesced {dropped} superseded task(s)")
+            self.cancel_token = CancelToken()
+            self.context.cancel_token = self.cancel_token
+        return task
+
+    def start_preview(self, task, sink=None, latency_ms=50.0, output_tag=None):
+        with self._preview_lock:
+            # Previews stream through the same node objects as renders, so the two never overlap.
+            if self._rendering or not self.control_queue.empty():
+                raise RuntimeError("A render is in progress; preview once it has finished")
+            self._stop_preview_locked()
+            self.preview = PreviewRenderer(self, task, output_tag=output_tag, latency_ms=latency_ms).start()
+            self.preview_sink = sink
+            if sink is not None:
+                sink.start(self.preview)
+            return self.preview
+
+    def stop_preview(self):
+        with self._preview_lock:
+            self._stop_preview_locked()
+
+    def _stop_preview_locked(self):
+        if self.preview_sink is not None:
+            self.preview_sink.stop()
+            self.preview_sink = None
+        if self.preview is not None:
+            self.preview.stop()
+            self.preview = None
+
+    def set_profiling(self, enabled, trace_memory=False):
+        self.profiling = enabled
+        self.profile_memory = trace_memory
+
+    def new_profiler(self):
+        if not self.profiling:
+            self.last_profile = None
+            return None
+        self.last_profile = NodeProfiler(trace_memory=self.profile_memory)
+        return self.last_profile
+
+    def model_loader(self, node_type, model_name):
+        if NODE_REGISTRY.info(node_type)["run_out_of_process"]:
+            # Out-of-process nodes keep their models in the workers; the engine only tracks residency.
+            loader = lambda: self.process_backend.load_model(node_type, model_name)
+            unloader = lambda _: self.process_backend.unload_model(node_type, model_name)
+        else:
+            # The node module is only imported once the model is actually loaded.
+            loader = lambda: NODE_REGISTRY[node_type].load_model(model_name)
+            unloader = None
+        return loader, unloader
+
+    def declare_models(self):
+        for node_type in NODE_REGISTRY:
+            for model_name in NODE_REGISTRY.info(node_type)["models"]:
+                self.models.declare(model_name, *self.model_loader(node_type, model_name))
+
+    def preload_node_models(self, nodes):
+        # Only models some node in the graph asks for are warmed up; the rest load on first use, if ever.
+        if not self.preload_models:
+            return
+        names = []
+        for node in nodes:
+            for model_name in node.required_models():
+                self.models.declare(model_name, *self.model_loader(node.NODE_TYPE, model_name))
+                names.append(model_name)
+        if names:
+            self.models.preload(names)
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="AudioEngineNode")
+        return self.executor
+
+    def shutdown_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
 
     def processing_loop(self):
         while self.is_running:
             try:
                 task = self.control_queue.get(timeout=0.1)
+                if task is not None:
+                    task = self.take_latest_task(task)
                 if task is None:
                     break
                 
                 print(f"AudioEngine: Received task: {task['type']}")
                 
                 if task['type'] == 'process_graph':
-                    result = self.execute_graph_task(task)
+                    # Previews stream through the same node objects, so they cannot overlap a render.
+                    with self._preview_lock:
+                        self._stop_preview_locked()
+                        self._rendering = True
+                    try:
+                        result = self.execute_graph_task(task)
+                    finally:
+                        self._rendering = False
                     self.results_queue.put(result)
+                    if self.last_profile is not None:
+                        self.results_queue.put(self.last_profile)
 
             except queue.Empty:
                 pass
         
         print("AudioEngine processing loop stopped.")
 
+    def collect_stale_nodes(self, sorted_nodes, adj):
+        stale = set()
+        for node_tag in sorted_nodes:
+            if node_tag in stale:
+                continue
+            if node_tag in self.dirty_nodes or node_tag not in self.output_cache:
+                stale.add(node_tag)
+                pending = [node_tag]
+                while pending:
+                    for child in adj.get(pending.pop(), ()):
+                        if child not in stale:
+                            stale.add(child)
+                            pending.append(child)
+        return stale
+
+    def compute_nodes(self, nodes, inputs_list):
+        # Nodes of one class, computed in one compute_batch call where the class has one.
+        # Holding the models for the whole compute keeps the idle reaper from unloading them mid-render.
+        acquired = []
+        try:
+            for node in nodes:
+                for model_name in node.required_models():
+                    self.models.declare(model_name, *self.model_loader(node.NODE_TYPE, model_name))
+                    self.models.acquire(model_name)
+                    acquired.append(model_name)
+            results = [None] * len(nodes)
+            in_process = []
+            for index, node in enumerate(nodes):
+                if node.runs_out_of_process():
+                    results[index] = self.process_backend.compute(node, inputs_list[index])
+                else:
+                    in_process.append(index)
+            if len(in_process) > 1 and type(nodes[0]).compute_batch is not None:
+                outputs_list = type(nodes[0]).compute_batch([nodes[index] for index in in_process],
+                                                            [inputs_list[index] for index in in_process])
+                if len(outputs_list) != len(in_process):
+                    raise RuntimeError(f"{type(nodes[0]).__name__}.compute_batch returned {len(outputs_list)} "
+                                       f"results for {len(in_process)} nodes")
+            else:
+                outputs_list = [nodes[index].compute(inputs_list[index]) for index in in_process]
+            for index, outputs_by_name in zip(in_process, outputs_list):
+                results[index] = outputs_by_name
+            return results
+        finally:
+            for model_name in acquired:
+                self.models.release(model_name)
+
+    def compute_nodes_cached(self, nodes, inputs_list, keys=None):
+        # Nodes with a render cache key are looked up first; only the misses are computed, then stored.
+        keys = keys or [None] * len(nodes)
+        results = [None] * len(nodes)
+        missing = []
+        for index, (node, cache_key) in enumerate(zip(nodes, keys)):
+            if cache_key is not None and self.render_cache is not None:
+                outputs_by_name = self.render_cache.load(cache_key)
+                if outputs_by_name is not None:
+                    print(f"AudioEngine: Node {node.dpg_tag} loaded from the render cache")
+                    results[index] = outputs_by_name
+                    continue
+            missing.append(index)
+        if missing:
+            computed = self.compute_nodes([nodes[index] for index in missing], [inputs_list[index] for index in missing])
+            for index, outputs_by_name in zip(missing, computed):
+                results[index] = outputs_by_name
+                if keys[index] is not None and self.render_cache is not None:
+                    self.render_cache.store(keys[index], outputs_by_name)
+        return results
+
+    def update_waveforms(self, node, outputs_by_name):
+        for output_name, output_tag in node.output_attr_map.items():
+            value = outputs_by_name.get(output_name)
+            if isinstance(value, AudioBuffer):
+                self.waveforms[output_tag] = WaveformPyramid.from_array(value.data, value.sample_rate)
+            else:
+                self.waveforms.pop(output_tag, None)
+
+    def prune_waveforms(self, nodes_map, aliases=None):
+        live_tags = {output_tag for node in nodes_map.values() for output_tag in node.output_attr_map.values()}
+        live_tags.update(aliases or ())
+        for output_tag in list(self.waveforms):
+            if output_tag not in live_tags:
+                del self.waveforms[output_tag]
+
+    def share_waveforms(self, aliases):
+        # Outputs of merged duplicate nodes show the pyramid of the output computed in their place.
+        for alias_tag, output_tag in aliases.items():
+            if output_tag in self.waveforms:
+                self.waveforms[alias_tag] = self.waveforms[output_tag]
+            else:
+                self.waveforms.pop(alias_tag, None)
+
+    def count_consumers(self, sorted_nodes, nodes_map, link_map_by_tag):
+        consumers = {}
+        for node_tag in sorted_nodes:
+            for input_tag in nodes_map[node_tag].input_attr_map.values():
+                source_attr_tag = link_map_by_tag.get(input_tag)
+                if source_attr_tag is not None:
+                    consumers[source_attr_tag] = consumers.get(source_attr_tag, 0) + 1
+        return consumers
+
+    def track_buffers(self, value, live_arrays, delta):
+        # Counts live references per array and per base array, so a buffer is only
+        # recycled once neither it nor any view onto it is still held by an output.
+        if not isinstance(value, AudioBuffer):
+            return
+        array = value.data
+        while isinstance(array, np.ndarray):
+            entry = live_arrays.setdefault(id(array), [array, 0])
+            entry[1] += delta
+            if entry[1] <= 0:
+                del live_arrays[id(array)]
+                if delta < 0 and not self.retain_outputs:
+                    self.buffer_pool.release(array)
+            array = array.base
+
+    def recycle_outputs(self, retired):
+        # Buffers of outputs dropped from the output cache go back to the pool, except those a
+        # still cached output holds, for example through a view passed on by a downstream node.
+        held = set()
+        for outputs_by_name in self.output_cache.values():
+            for value in outputs_by_name.values():
+                array = value.data if isinstance(value, AudioBuffer) else None
+                while isinstance(array, np.ndarray):
+                    held.add(id(array))
+                    array = array.base
+        for outputs_by_name in retired:
+            for value in outputs_by_name.values():
+                array = value.data if isinstance(value, AudioBuffer) else None
+                while isinstance(array, np.ndarray):
+                    if id(array) not in held:
+                        held.add(id(array))
+                        self.buffer_pool.release(array)
+                    array = array.base
+
     def execute_graph_task(self, task):
+        if task.get('mode') == 'stream':
+            return self.stream_graph_task(task)
+        
         print("AudioEngine: --- Starting Graph Process ---")
         
         sorted_nodes = task['sorted_nodes']
         link_map_by_tag = task['link_map_by_tag']
         nodes_map = task['nodes_map']
+        adj = task.get('adj', {})
+        
+        self.dirty_nodes.update(task.get('dirty_nodes', ()))
+        retired = [self.output_cache.pop(node_tag) for node_tag in list(self.output_cache) if node_tag not in nodes_map]
+        self.dirty_nodes.intersection_update(nodes_map)
+        if self.track_waveforms:
+            self.prune_waveforms(nodes_map, task.get('aliases'))
+        
+        stale_nodes = self.collect_stale_nodes(sorted_nodes, adj)
+        print(f"AudioEngine: Recomputing {len(stale_nodes)} of {len(sorted_nodes)} nodes")
+        # Cached outputs about to be recomputed are recycled up front, so a re-render reuses their
+        # buffers instead of holding the old and the new outputs at once.
+        retired += [self.output_cache.pop(node_tag) for node_tag in stale_nodes if node_tag in self.output_cache]
+        self.recycle_outputs(retired)
         
         attribute_data_map = {}
+        live_arrays = {}
+        # Results standing in for merged duplicates reach several consumers, which only get read-only views.
+        shared_outputs = set(task.get('aliases', {}).values())
+        remaining_consumers = self.count_consumers(sorted_nodes, nodes_map, link_map_by_tag)
+        for node in nodes_map.values():
+            node.context = self.context
         
-        for node_tag in sorted_nodes:
+        def release(attr_tag):
+            value = attribute_data_map.pop(attr_tag, None)
+            self.track_buffers(value, live_arrays, -1)
+        
+        def consume(node_tag):
+            # The last consumer of an output frees it, so peak memory follows graph width.
+            for input_tag in nodes_map[node_tag].input_attr_map.values():
+                source_attr_tag = link_map_by_tag.get(input_tag)
+                if source_attr_tag is None:
+                    continue
+                remaining_consumers[source_attr_tag] -= 1
+                if remaining_consumers[source_attr_tag] == 0:
+                    release(source_attr_tag)
+        
+        in_degree = dict(task['in_degree']) if 'in_degree' in task else None
+        if in_degree is None:
+            in_degree = {node_tag: 0 for node_tag in sorted_nodes}
+            for node_tag in sorted_nodes:
+                for child in adj.get(node_tag, ()):
+                    in_degree[child] += 1
+        
+        ready = deque(node_tag for node_tag in sorted_nodes if in_degree[node_tag] == 0)
+        running = {}
+        failed_node = None
+        cancel_token = self.cancel_token
+        cancelled = False
+        executor = self.get_executor()
+        profiler = self.new_profiler()
+        disk_keys = {}
+        if self.render_cache is not None:
+            disk_keys = {node_tag: key for node_tag, key in cache_keys(task).items()
+                         if key is not None and nodes_map[node_tag].DISK_CACHEABLE}
+        
+        def publish(node_tag, outputs_by_name):
             node = nodes_map[node_tag]
+            for output_name, value in outputs_by_name.items():
+                if output_name in node.output_attr_map:
+                    output_tag = node.output_attr_map[output_name]
+                    if output_tag in shared_outputs and isinstance(value, AudioBuffer):
+                        value = value.read_only()
+                    attribute_data_map[output_tag] = value
+                    self.track_buffers(value, live_arrays, 1)
+                    if remaining_consumers.get(output_tag, 0) == 0:
+                        release(output_tag)
+            consume(node_tag)
+            for child in adj.get(node_tag, ()):
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    ready.append(child)
+        
+        while ready or running:
+            batches = {}
+            if cancel_token.cancelled and not cancelled:
+                print("AudioEngine: Render cancelled, waiting for running nodes")
+                cancelled = True
+            while ready and failed_node is None and not cancelled:
+                node_tag = ready.popleft()
+                node = nodes_map[node_tag]
+                
+                if node_tag not in stale_nodes:
+                    publish(node_tag, self.output_cache[node_tag])
+                    continue
+                
+                inputs_by_name = {}
+                for input_name, input_tag in node.input_attr_map.items():
+                    if input_tag in link_map_by_tag:
+                        source_attr_tag = link_map_by_tag[input_tag]
+                        inputs_by_name[input_name] = attribute_data_map.get(source_attr_tag)
+                    else:
+                        inputs_by_name[input_name] = None
+                
+                batches.setdefault(type(node), []).append((node_tag, inputs_by_name))
             
-            inputs_by_name = {}
-            for input_name, input_tag in node.input_attr_map.items():
-                if input_tag in link_map_by_tag:
-                    source_attr_tag = link_map_by_tag[input_tag]
-                    inputs_by_name[input_name] = attribute_data_map.get(source_attr_tag)
-                else:
-                    inputs_by_name[input_name] = None
+            for node_class, entries in batches.items():
+                # Classes without compute_batch still share the dispatch path, one node per call.
+                groups = [entries] if node_class.compute_batch is not None else [[entry] for entry in entries]
+                for group in groups:
+                    node_tags = tuple(node_tag for node_tag, _ in group)
+                    compute_args = ([nodes_map[node_tag] for node_tag in node_tags],
+                                    [inputs_by_name for _, inputs_by_name in group],
+                                    [disk_keys.get(node_tag) for node_tag in node_tags])
+                    if profiler is None:
+                        future = executor.submit(self.compute_nodes_cached, *compute_args)
+                    else:
+                        future = executor.submit(profiler.call, node_tags, node_class.NODE_TYPE, compute_args[1],
+                                                 self.compute_nodes_cached, *compute_args)
+                    running[future] = node_tags
             
-            try:
-                outputs_by_name = node.compute(inputs_by_name)
+            if not running:
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node_tags = running.pop(future)
+                try:
+                    results = future.result()
+                except RenderCancelled:
+                    cancelled = True
+                    continue
+                except Exception as e:
+                    print(f"AudioEngine: Error computing node {', '.join(map(str, node_tags))}: {e}")
+                    if failed_node is None:
+                        failed_node = node_tags[0]
+                    continue
                 
-                for output_name, value in outputs_by_name.items():
-                    if output_name in node.output_attr_map:
-                        output_tag = node.output_attr_map[output_name]
-                        attribute_data_map[output_tag] = value
-            except Exception as e:
-                print(f"AudioEngine: Error computing node {node_tag}: {e}")
-                return f"Error: Node {node_tag} failed."
+                for node_tag, outputs_by_name in zip(node_tags, results):
+                    # An output something reads from that came back empty means the node gave up, not that it finished.
+                    missing = [output_name for output_name, output_tag in nodes_map[node_tag].output_attr_map.items()
+                               if remaining_consumers.get(output_tag, 0) and outputs_by_name.get(output_name) is None]
+                    if missing:
+                        print(f"AudioEngine: Node {node_tag} produced no {', '.join(missing)}")
+                        if failed_node is None:
+                            failed_node = node_tag
+                        continue
+                    if self.retain_outputs:
+                        self.output_cache[node_tag] = outputs_by_name
+                    if self.track_waveforms:
+                        self.update_waveforms(nodes_map[node_tag], outputs_by_name)
+                    self.dirty_nodes.discard(node_tag)
+                    # Children must rerun even if this render is aborted before reaching them.
+                    self.dirty_nodes.update(adj.get(node_tag, ()))
+                    if failed_node is None and not cancelled:
+                        publish(node_tag, outputs_by_name)
+
+        for attr_tag in list(attribute_data_map):
+            release(attr_tag)
+        if self.track_waveforms:
+            self.share_waveforms(task.get('aliases', {}))
+        if profiler is not None:
+            profiler.finish()
+
+        if failed_node is not None:
+            return f"Error: Node {failed_node} failed."
+        if cancelled:
+            print("AudioEngine: --- Graph Process Cancelled ---")
+            return "Render cancelled."
 
         print("AudioEngine: --- Graph Process Finished ---")
+        return "Graph processing finished successfully."
+
+    def iter_stream_blocks(self, task, profiler=None, cancel_token=None):
+        sorted_nodes = task['sorted_nodes']
+        link_map_by_tag = task['link_map_by_tag']
+        nodes_map = task['nodes_map']
+        block_size = task.get('block_size', self.block_size)
+        
+        attribute_data_map = {}
+        finished_nodes = set()
+        started_nodes = []
+        
+        waveforms = {}
+        if self.track_waveforms:
+            # Pyramids grow block by block, so long streams can be drawn while they render.
+            for node_tag in sorted_nodes:
+                for output_tag in nodes_map[node_tag].output_attr_map.values():
+                    waveforms[output_tag] = self.waveforms[output_tag] = WaveformPyramid()
+            self.share_waveforms(task.get('aliases', {}))
+        shared_outputs = set(task.get('aliases', {}).values())
+        
+        try:
+            for node_tag in sorted_nodes:
+                nodes_map[node_tag].begin_stream(block_size)
+                started_nodes.append(node_tag)
+            
+            while len(finished_nodes) < len(sorted_nodes):
+                for node_tag in sorted_nodes:
+                    if node_tag in finished_nodes:
+                        continue
+                    if cancel_token is not None:
+                        cancel_token.check()
+                    node = nodes_map[node_tag]
+                    
+                    inputs_by_name = {}
+                    for input_name, input_tag in node.input_attr_map.items():
+                        source_attr_tag = link_map_by_tag.get(input_tag)
+                        inputs_by_name[input_name] = attribute_data_map.get(source_attr_tag, END_OF_STREAM)
+                    
+                    try:
+                        if profiler is None:
+                            outputs_by_name = node.compute_block(inputs_by_name)
+                        else:
+                            outputs_by_name = profiler.call((node_tag,), node.NODE_TYPE, (inputs_by_name,),
+                                                            node.compute_block, inputs_by_name)
+                    except Exception as e:
+                        print(f"AudioEngine: Error computing node {node_tag}: {e}")
+                        raise NodeComputeError(node_tag, e)
+                    
+                    inputs_done = all(value is END_OF_STREAM for value in inputs_by_name.values())
+                    outputs_done = True
+                    for output_name, output_tag in node.output_attr_map.items():
+                        value = outputs_by_name.get(output_name, END_OF_STREAM)
+                        # A node that yields nothing after its inputs ended would otherwise stall the stream.
+                        if value is None and inputs_done:
+                            value = END_OF_STREAM
+                        if output_tag in shared_outputs and isinstance(value, AudioBuffer):
+                            value = value.read_only()
+                        attribute_data_map[output_tag] = value
+                        outputs_done = outputs_done and value is END_OF_STREAM
+                        if output_tag in waveforms and isinstance(value, AudioBuffer):
+                            waveforms[output_tag].sample_rate = value.sample_rate
+                            waveforms[output_tag].append(value.data)
+                    
+                    if outputs_done and (node.output_attr_map or inputs_done):
+                        finished_nodes.add(node_tag)
+                
+                yield attribute_data_map
+        finally:
+            for node_tag in started_nodes:
+                try:
+                    nodes_map[node_tag].end_stream()
+                except Exception as e:
+                    print(f"AudioEngine: Error closing stream for node {node_tag}: {e}")
+
+    def stream_graph_task(self, task):
+        print("AudioEngine: --- Starting Streaming Graph Process ---")
+        
+        # Streamed renders bypass the output cache, but edits still have to reach the next offline render.
+        self.dirty_nodes.update(task.get('dirty_nodes', ()))
+        
+        blocks = 0
+        profiler = self.new_profiler()
+        try:
+            for _ in self.iter_stream_blocks(task, profiler, self.cancel_token):
+                blocks += 1
+        except NodeComputeError as e:
+            return f"Error: Node {e.node_tag} failed."
+        except RenderCancelled:
+            print(f"AudioEngine: --- Streaming Graph Process Cancelled ({blocks} blocks) ---")
+            return "Render cancelled."
+        finally:
+            if profiler is not None:
+                profiler.finish()
+        
+        print(f"AudioEngine: --- Streaming Graph Process Finished ({blocks} blocks) ---")
         return "Graph processing finished successfully."
\ No newline at end of file
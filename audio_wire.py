@@ -0,0 +1,25 @@
+import struct
+from typing import Tuple
+import numpy as np
+
+# magic, version, channels, sample_rate, frames; followed by interleaved little-endian float32 samples.
+AUDIO_HEADER = struct.Struct('<4sHHII')
+AUDIO_MAGIC = b'SINA'
+AUDIO_VERSION = 1
+
+
+def encode_audio(audio_array: np.ndarray, sample_rate: int) -> bytes:
+    audio_array = np.ascontiguousarray(audio_array, dtype='<f4')
+    frames = audio_array.shape[0]
+    channels = 1 if audio_array.ndim == 1 else audio_array.shape[1]
+    return AUDIO_HEADER.pack(AUDIO_MAGIC, AUDIO_VERSION, channels, sample_rate, frames) + audio_array.tobytes()
+
+
+def decode_audio(payload: bytes) -> Tuple[np.ndarray, int]:
+    magic, version, channels, sample_rate, frames = AUDIO_HEADER.unpack_from(payload)
+    if magic != AUDIO_MAGIC or version != AUDIO_VERSION:
+        raise ValueError("Payload is not SIN audio")
+    audio_array = np.frombuffer(payload, dtype='<f4', offset=AUDIO_HEADER.size, count=frames * channels)
+    if channels > 1:
+        audio_array = audio_array.reshape(frames, channels)
+    return audio_array, sample_rate
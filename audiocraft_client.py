@@ -0,0 +1,48 @@
+import threading
+from typing import Tuple
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from audio_wire import decode_audio
+
+SERVER_URL = "http://127.0.0.1:5001"
+
+
+class AudioCraftClient:
+    def __init__(self, base_url: str = SERVER_URL, pool_size: int = 8, timeout: float = 600.0):
+        self.base_url = base_url
+        self.timeout = timeout
+        # One keep-alive session shared by all callers, so concurrent prompts reuse pooled connections.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+
+    def generate(self, prompt: str, duration_secs: float) -> Tuple[np.ndarray, int]:
+        response = self.session.post(f"{self.base_url}/generate",
+                                     json={"prompt": prompt, "duration_secs": duration_secs},
+                                     timeout=self.timeout)
+        if response.status_code != 200:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise RuntimeError(f"AudioCraft server error: {message}")
+        return decode_audio(response.content)
+
+    def shutdown(self):
+        self.session.post(f"{self.base_url}/shutdown", timeout=5)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AudioCraftClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AudioCraftClient()
+        return _client
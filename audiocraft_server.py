@@ -1,24 +1,124 @@
 import sys
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 import logging
 import os
+import argparse
+import threading
+import queue
+import time
+import numpy as np
+from audio_wire import encode_audio
 
 app = Flask(__name__)
 
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 
+batcher = None
+
+class StubModel:
+    sample_rate = 32000
+
+    def __init__(self):
+        self.duration = 5.0
+
+    def set_generation_params(self, duration):
+        self.duration = float(duration)
+
+    def generate(self, descriptions):
+        frames = int(self.sample_rate * self.duration)
+        t = np.arange(frames, dtype=np.float32) / self.sample_rate
+        batch = np.empty((len(descriptions), 1, frames), dtype=np.float32)
+        for index, prompt in enumerate(descriptions):
+            frequency = 110.0 + (sum(prompt.encode()) % 440)
+            batch[index, 0] = 0.3 * np.sin(2. * np.pi * frequency * t)
+        return batch
+
+def load_model(model_name, use_stub):
+    if use_stub:
+        print("[AudioCraft Server]: Using stub model.", file=sys.stderr)
+        return StubModel()
+    try:
+        from audiocraft.models import MusicGen
+    except ImportError as e:
+        # Synthetic audio must never stand in for MusicGen unless asked for.
+        print(f"[AudioCraft Server]: Error - audiocraft is not installed ({e}). "
+              f"Install it, or pass --stub to serve test tones.", file=sys.stderr)
+        sys.exit(1)
+    print(f"[AudioCraft Server]: Loading model {model_name}...", file=sys.stderr)
+    return MusicGen.get_pretrained(model_name)
+
+class GenerationBatcher:
+    def __init__(self, model, window_secs=0.05, max_batch=8):
+        self.model = model
+        self.window_secs = window_secs
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, prompt, duration):
+        pending = {"prompt": prompt, "duration": duration, "done": threading.Event(), "result": None, "error": None}
+        self.requests.put(pending)
+        pending["done"].wait()
+        if pending["error"] is not None:
+            raise pending["error"]
+        return pending["result"]
+
+    def collect_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.window_secs
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect_batch()
+
+            # Generation length is a model-wide setting, so each duration is one forward pass.
+            by_duration = {}
+            for pending in batch:
+                by_duration.setdefault(pending["duration"], []).append(pending)
+
+            for duration, group in by_duration.items():
+                try:
+                    print(f"[AudioCraft Server]: Generating batch of {len(group)} prompt(s), {duration}s", file=sys.stderr)
+                    self.model.set_generation_params(duration=duration)
+                    wavs = self.model.generate(descriptions=[pending["prompt"] for pending in group])
+                    if hasattr(wavs, "cpu"):
+                        wavs = wavs.cpu().numpy()
+                    for pending, wav in zip(group, wavs):
+                        # Models return (channels, frames); the wire format is interleaved frames.
+                        pending["result"] = (np.ascontiguousarray(wav.T), self.model.sample_rate)
+                except Exception as e:
+                    for pending in group:
+                        pending["error"] = e
+                finally:
+                    for pending in group:
+                        pending["done"].set()
+
 @app.route('/generate', methods=['POST'])
 def generate_audio():
     data = request.get_json()
     prompt = data.get('prompt', '')
-    
+    duration = float(data.get('duration_secs', 5))
+
     print(f"[AudioCraft Server]: Received prompt: {prompt}", file=sys.stderr)
-    
-    return jsonify({
-        "status": "success",
-        "message": f"placeholder audio for prompt: {prompt}"
-    })
+
+    try:
+        audio_array, sample_rate = batcher.submit(prompt, duration)
+    except Exception as e:
+        print(f"[AudioCraft Server]: Generation failed: {e}", file=sys.stderr)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    return Response(encode_audio(audio_array, sample_rate), mimetype='application/octet-stream')
 
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
@@ -26,5 +126,14 @@ def shutdown():
     os._exit(0)
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stub", action="store_true", help="Serve a sine-wave stub instead of MusicGen.")
+    parser.add_argument("--model", default="facebook/musicgen-small")
+    parser.add_argument("--batch-window-ms", type=float, default=50.0)
+    parser.add_argument("--max-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    batcher = GenerationBatcher(load_model(args.model, args.stub), args.batch_window_ms / 1000.0, args.max_batch)
+
     print("[AudioCraft Server]: Starting on http://127.0.0.1:5001", file=sys.stderr)
-    app.run(host='127.0.0.1', port=5001)
\ No newline at end of file
+    app.run(host='127.0.0.1', port=5001, threaded=True)
@@ -0,0 +1,378 @@
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+BASELINE_FORMAT_VERSION = 1
+SAMPLE_RATE = 44100
+
+# Graph shapes rendered by default; each one stresses a different part of planning and scheduling.
+DEFAULT_CASES = [
+    {"name": "wide", "nodes": 64, "depth": 2, "fan_in": 1, "fan_out": 1, "duration_secs": 2.0},
+    {"name": "deep", "nodes": 64, "depth": 8, "fan_in": 2, "fan_out": 2, "duration_secs": 2.0},
+    {"name": "fan_out", "nodes": 65, "depth": 2, "fan_in": 1, "fan_out": 64, "duration_secs": 2.0},
+    {"name": "long", "nodes": 2, "depth": 2, "fan_in": 1, "fan_out": 1, "duration_secs": 120.0},
+]
+
+# Lower is better for these, higher is better for throughput.
+LOWER_IS_BETTER = ("plan_ms", "render_ms", "peak_rss_mb", "startup_ms", "startup_plugins_ms")
+HIGHER_IS_BETTER = ("samples_per_sec",)
+# Differences below these are timer and allocator noise, whatever the relative tolerance says.
+ABSOLUTE_SLACK = {"plan_ms": 0.5, "render_ms": 5.0, "peak_rss_mb": 8.0, "startup_ms": 25.0, "startup_plugins_ms": 25.0}
+
+# Path params the generator fills in; node types with any other empty path param are left out.
+SUPPLIED_PATH_PARAMS = ("filepath", "ir_filepath", "filename")
+# Impulse response for convolver nodes: long enough for several partitions at stream block sizes.
+IR_SECS = 0.25
+
+STARTUP_CASE = "startup"
+STARTUP_PLUGINS = 100
+# Everything the GUI does before its first frame except importing dearpygui, in a fresh interpreter.
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from nodes import NODE_REGISTRY
+NODE_REGISTRY.manifest_path = sys.argv[1]
+if len(sys.argv) > 2:
+    NODE_REGISTRY.add_plugin_directory(sys.argv[2])
+import audio_engine, node_graph, graph_io, preview, render_cache
+menu = [NODE_REGISTRY.info(node_type)["name"] for node_type in NODE_REGISTRY]
+print(json.dumps({"ms": (time.perf_counter() - started) * 1e3, "modules": len(sys.modules), "node_types": len(menu)}))
+"""
+# Each generated plugin stands in for a heavy node library with a fixed import cost.
+PLUGIN_TEMPLATE = '''import time
+from nodes import BaseNode, register_node
+
+time.sleep(0.005)
+
+
+@register_node("plugin/bench_{index}")
+class BenchPlugin{index}(BaseNode):
+    NODE_NAME = "Bench Plugin {index}"
+
+    @staticmethod
+    def get_attributes():
+        return {{"inputs": {{"audio_in": "audio"}}, "outputs": {{"audio_out": "audio"}}}}
+
+    @staticmethod
+    def get_parameters():
+        return {{"gain": "1.0"}}
+
+    def compute(self, inputs):
+        return {{"audio_out": inputs.get("audio_in")}}
+'''
+
+
+def _node_roles(node_types: List[str] = None) -> Dict[str, List[str]]:
+    from nodes import NODE_REGISTRY
+
+    roles = {"sources": [], "processors": [], "sinks": []}
+    for node_type in NODE_REGISTRY:
+        if node_types and node_type not in node_types:
+            continue
+        info = NODE_REGISTRY.info(node_type)
+        # Model-backed nodes measure the model, not the engine, so they are left out unless asked for.
+        if not node_types and (info["models"] or info["run_out_of_process"]):
+            continue
+        # A node with an empty file path fails at render time, and a failed node is not work done.
+        missing = [name for name, value in info["params"].items()
+                   if name.endswith(("filepath", "filename")) and not str(value).strip() and name not in SUPPLIED_PATH_PARAMS]
+        if missing:
+            if node_types:
+                raise ValueError(f"Benchmark graphs cannot supply {', '.join(missing)} for {node_type}")
+            print(f"Benchmark: Leaving out {node_type}, which needs {', '.join(missing)}")
+            continue
+        inputs, outputs = info["inputs"], info["outputs"]
+        if outputs and not inputs:
+            roles["sources"].append(node_type)
+        elif outputs:
+            roles["processors"].append(node_type)
+        elif inputs:
+            roles["sinks"].append(node_type)
+    return roles
+
+
+def _layer_widths(nodes: int, depth: int, fan_ins: List[int], fan_out: int) -> List[int]:
+    # Layers follow the fan-out / fan-in ratio from as many sources as fit. Shapes that outgrow
+    # `nodes` even from one source level off at the widest layer that fits, and the sink layer
+    # takes whatever is left, so the graph always has exactly `nodes` nodes.
+    if nodes < depth:
+        raise ValueError(f"{nodes} nodes cannot fill {depth} layers")
+
+    def widths_for(sources, widest=None):
+        widths = [sources]
+        for fan_in in fan_ins:
+            width = max(1, -(-widths[-1] * fan_out // fan_in))
+            widths.append(width if widest is None else min(width, widest))
+        return widths
+
+    sources = 1
+    while sum(widths_for(sources + 1)) <= nodes:
+        sources += 1
+    widths = widths_for(sources)
+    if sum(widths) > nodes:
+        widest = 1
+        while sum(widths_for(1, widest + 1)) <= nodes:
+            widest += 1
+        widths = widths_for(1, widest)
+    widths[-1] += nodes - sum(widths)
+    return widths
+
+
+def generate_graph(case: Dict[str, Any], workdir: str, node_types: List[str] = None) -> Dict[str, Any]:
+    from nodes import NODE_REGISTRY
+    from wav_io import write_wav_chunked
+
+    roles = _node_roles(node_types)
+    if not roles["sources"] or not roles["sinks"]:
+        raise ValueError("Benchmark graphs need at least one source and one sink node type")
+
+    depth = max(2, int(case.get("depth", 2)))
+    if not roles["processors"] and depth > 2:
+        print(f"Benchmark: No processor node types registered, clamping depth of '{case['name']}' to 2")
+        depth = 2
+
+    duration_secs = float(case.get("duration_secs", 1.0))
+    fan_out = max(1, int(case.get("fan_out", 1)))
+    layer_types = [roles["sources"]] + [roles["processors"]] * (depth - 2) + [roles["sinks"]]
+
+    # A layer's fan-in is capped by the ports its node types actually have.
+    fan_ins = []
+    for types in layer_types[1:]:
+        ports = min(len(NODE_REGISTRY.info(node_type)["inputs"]) for node_type in types)
+        fan_ins.append(max(1, min(int(case.get("fan_in", 1)), ports)))
+    widths = _layer_widths(int(case.get("nodes", 2)), depth, fan_ins, fan_out)
+
+    t = np.arange(int(SAMPLE_RATE * duration_secs), dtype=np.float32) / SAMPLE_RATE
+    ir_path = os.path.join(workdir, "benchmark_ir.wav")
+    if not os.path.exists(ir_path):
+        # Decaying noise, like a small room.
+        frames = int(SAMPLE_RATE * IR_SECS)
+        decay = np.exp(-np.arange(frames, dtype=np.float32) / (0.05 * SAMPLE_RATE))
+        write_wav_chunked(ir_path, 0.1 * decay * np.random.default_rng(0).standard_normal(frames), SAMPLE_RATE)
+
+    nodes = []
+    layers = []
+    for layer_index, (types, width) in enumerate(zip(layer_types, widths)):
+        layer = []
+        for index in range(width):
+            node_type = types[index % len(types)]
+            node_id = f"l{layer_index}_n{index}"
+            params = {}
+            defaults = NODE_REGISTRY.info(node_type)["params"]
+            if "duration_secs" in defaults:
+                params["duration_secs"] = str(duration_secs)
+            if "frequency" in defaults:
+                params["frequency"] = str(110.0 + 10.0 * index)
+            if "filepath" in defaults:
+                # Loaders of one shared file would all be merged into a single node, so each gets its own.
+                sample_path = os.path.join(workdir, f"{node_id}_sample.wav")
+                if not os.path.exists(sample_path):
+                    write_wav_chunked(sample_path, 0.5 * np.sin(2 * np.pi * (220.0 + 10.0 * index) * t), SAMPLE_RATE)
+                params["filepath"] = sample_path
+            if "ir_filepath" in defaults:
+                params["ir_filepath"] = ir_path
+            if "filename" in defaults:
+                params["filename"] = os.path.join(workdir, f"{node_id}.wav")
+            nodes.append({"id": node_id, "type": node_type, "params": params})
+            layer.append(node_id)
+        layers.append(layer)
+
+    node_types_by_id = {entry["id"]: entry["type"] for entry in nodes}
+    links = []
+    for layer_index in range(1, depth):
+        previous, layer = layers[layer_index - 1], layers[layer_index]
+        fan_in = fan_ins[layer_index - 1]
+        for index, node_id in enumerate(layer):
+            input_ports = list(NODE_REGISTRY.info(node_types_by_id[node_id])["inputs"])[:fan_in]
+            for port_index, port in enumerate(input_ports):
+                # Consecutive link slots map onto the same upstream node fan_out times.
+                source_id = previous[((index * fan_in + port_index) // fan_out) % len(previous)]
+                source_port = next(iter(NODE_REGISTRY.info(node_types_by_id[source_id])["outputs"]))
+                links.append({"from": [source_id, source_port], "to": [node_id, port]})
+
+    return {"version": 1, "nodes": nodes, "links": links}
+
+
+def run_case(case: Dict[str, Any], repeat: int = 3, mode: str = 'offline', threads: int = None,
+             node_types: List[str] = None) -> Dict[str, Any]:
+    from audio_engine import AudioEngine
+    from node_graph import GraphManager
+    import graph_io
+
+    with tempfile.TemporaryDirectory(prefix="sin_bench_") as workdir:
+        data = generate_graph(case, workdir, node_types)
+        audio_engine = AudioEngine(queue.Queue(), max_workers=threads, retain_outputs=False, preload_models=False)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                graph_manager = GraphManager(audio_engine)
+                graph_io.populate_graph(data, graph_manager)
+
+                plan_times = []
+                for _ in range(repeat):
+                    graph_manager._plan = None
+                    started = time.perf_counter()
+                    graph_manager.compile_plan()
+                    plan_times.append(time.perf_counter() - started)
+
+                render_times = []
+                for _ in range(repeat):
+                    task = graph_manager.build_task(mode)
+                    task['dirty_nodes'] = set(task['sorted_nodes'])
+                    started = time.perf_counter()
+                    result = audio_engine.execute_graph_task(task)
+                    render_times.append(time.perf_counter() - started)
+                    if result.startswith("Error"):
+                        raise RuntimeError(f"Benchmark case '{case['name']}' failed: {result}")
+        finally:
+            audio_engine.shutdown_executor()
+            audio_engine.process_backend.shutdown()
+
+    producers = sum(1 for node in graph_manager.nodes.values() if node.output_attr_map)
+    render_secs = min(render_times)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+    return {
+        "nodes": len(graph_manager.nodes),
+        "links": len(graph_manager.links),
+        "plan_ms": min(plan_times) * 1e3,
+        "render_ms": render_secs * 1e3,
+        "samples_per_sec": producers * float(case.get("duration_secs", 1.0)) * SAMPLE_RATE / render_secs,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def run_isolated(case: Dict[str, Any], *args) -> Dict[str, Any]:
+    # Peak RSS only ever grows within a process, so each case gets a fresh one.
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return pool.submit(run_case, case, *args).result()
+
+
+def _time_startup(repeat: int, manifest_path: str, plugin_dir: str = None) -> Dict[str, Any]:
+    command = [sys.executable, "-c", STARTUP_SCRIPT, manifest_path] + ([plugin_dir] if plugin_dir else [])
+    runs = []
+    # The first run builds the manifest, as a first launch after installing or editing nodes would.
+    for _ in range(repeat + 1):
+        completed = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                   capture_output=True, text=True, check=True)
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return min(runs[1:], key=lambda run: run["ms"])
+
+
+def run_startup(repeat: int = 3) -> Dict[str, Any]:
+    # Time to first frame should not grow with the node library: warm starts read the manifest instead of importing nodes.
+    with tempfile.TemporaryDirectory(prefix="sin_startup_") as workdir:
+        plugin_dir = os.path.join(workdir, "plugins")
+        os.makedirs(plugin_dir)
+        for index in range(STARTUP_PLUGINS):
+            with open(os.path.join(plugin_dir, f"bench_plugin_{index}.py"), "w") as f:
+                f.write(PLUGIN_TEMPLATE.format(index=index))
+
+        builtin = _time_startup(repeat, os.path.join(workdir, "builtin_manifest.json"))
+        plugins = _time_startup(repeat, os.path.join(workdir, "plugin_manifest.json"), plugin_dir)
+    return {
+        "startup_ms": builtin["ms"],
+        "startup_plugins_ms": plugins["ms"],
+        "startup_modules": builtin["modules"],
+        "node_types": plugins["node_types"],
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference is None:
+            continue
+        for metric in LOWER_IS_BETTER:
+            limit = max(reference.get(metric, 0) * (1 + tolerance), reference.get(metric, 0) + ABSOLUTE_SLACK[metric])
+            if metric in reference and metric in metrics and metrics[metric] > limit:
+                regressions.append(f"{name}.{metric}: {metrics[metric]:.2f} vs baseline {reference[metric]:.2f}")
+        for metric in HIGHER_IS_BETTER:
+            if metric in reference and metric in metrics and metrics[metric] < reference[metric] * (1 - tolerance):
+                regressions.append(f"{name}.{metric}: {metrics[metric]:.0f} vs baseline {reference[metric]:.0f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark graph planning and rendering on synthetic graphs.")
+    parser.add_argument("--case", action="append", dest="cases",
+                        help=f"Case to run (default: all of {', '.join(case['name'] for case in DEFAULT_CASES)}, {STARTUP_CASE}).")
+    parser.add_argument("--nodes", type=int, help="Run a single custom case with this many nodes.")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fan-in", type=int, default=1)
+    parser.add_argument("--fan-out", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=2.0, help="Render duration in seconds.")
+    parser.add_argument("--node-type", action="append", dest="node_types",
+                        help="Restrict generated graphs to these registry types.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--stream", action="store_true", help="Render in fixed-size blocks.")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with these results.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing.")
+    args = parser.parse_args(argv)
+
+    if args.nodes:
+        cases = [{"name": "custom", "nodes": args.nodes, "depth": args.depth, "fan_in": args.fan_in,
+                  "fan_out": args.fan_out, "duration_secs": args.duration}]
+    else:
+        cases = [case for case in DEFAULT_CASES if not args.cases or case["name"] in args.cases]
+        if not cases and STARTUP_CASE not in (args.cases or ()):
+            print(f"Benchmark: Unknown case(s) {', '.join(args.cases)}")
+            return 1
+
+    mode = 'stream' if args.stream else 'offline'
+    results = {}
+    print(f"{'Case':<10}{'Nodes':>7}{'Plan ms':>10}{'Render ms':>12}{'Msamples/s':>12}{'RSS MB':>9}")
+    for case in cases:
+        metrics = run_isolated(case, args.repeat, mode, args.threads, args.node_types)
+        results[case["name"]] = metrics
+        print(f"{case['name']:<10}{metrics['nodes']:>7}{metrics['plan_ms']:>10.3f}{metrics['render_ms']:>12.1f}"
+              f"{metrics['samples_per_sec'] / 1e6:>12.1f}{metrics['peak_rss_mb']:>9.1f}")
+
+    if not args.nodes and (not args.cases or STARTUP_CASE in args.cases):
+        metrics = run_startup(args.repeat)
+        results[STARTUP_CASE] = metrics
+        print(f"Benchmark: Startup {metrics['startup_ms']:.1f} ms ({metrics['startup_modules']} modules), "
+              f"{metrics['startup_plugins_ms']:.1f} ms with {STARTUP_PLUGINS} plugin modules ({metrics['node_types']} node types)")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"version": BASELINE_FORMAT_VERSION, "mode": mode, "cases": results}, f, indent=2)
+        print(f"Benchmark: Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Benchmark: No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("mode", "offline") != mode:
+        print(f"Benchmark: Baseline was recorded in {baseline.get('mode')} mode, not comparing.")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Benchmark: Regression {regression}")
+    if regressions:
+        return 1
+    print(f"Benchmark: No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import threading
+import weakref
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class BufferPool:
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.pooled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._free: Dict[Tuple[Tuple[int, ...], str], List[np.ndarray]] = {}
+        self._owned = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=np.float32) -> np.ndarray:
+        shape = tuple(shape) if isinstance(shape, (tuple, list)) else (int(shape),)
+        key = (shape, np.dtype(dtype).str)
+        with self._lock:
+            free_list = self._free.get(key)
+            if free_list:
+                array = free_list.pop()
+                self.pooled_bytes -= array.nbytes
+                self.hits += 1
+            else:
+                array = None
+                self.misses += 1
+
+        if array is None:
+            array = np.empty(shape, dtype=dtype)
+        array.flags.writeable = True
+        self._owned[id(array)] = array
+        return array
+
+    def owns(self, array: np.ndarray) -> bool:
+        return self._owned.get(id(array)) is array
+
+    def release(self, array: np.ndarray) -> bool:
+        with self._lock:
+            if not self.owns(array):
+                return False
+            del self._owned[id(array)]
+            if self.pooled_bytes + array.nbytes > self.max_bytes:
+                return False
+            self._free.setdefault((array.shape, array.dtype.str), []).append(array)
+            self.pooled_bytes += array.nbytes
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self.pooled_bytes = 0
@@ -0,0 +1,116 @@
+import os
+from typing import Tuple
+import numpy as np
+from sample_cache import SampleCache, load_sample
+
+# Whole-buffer renders have no latency budget, so they use longer partitions and fewer of them.
+OFFLINE_PARTITION = 16384
+
+# Impulse-response spectra per (file, mtime, sample rate, partition size), shared by every convolver in the process.
+IR_SPECTRA_CACHE = SampleCache(max_bytes=256 * 1024 * 1024)
+
+
+def ir_spectra(ir: np.ndarray, partition: int) -> np.ndarray:
+    # Splits a (channels, frames) response into partitions of `partition` frames, each zero
+    # padded to 2 * partition and transformed: (channels, partitions, partition + 1) complex64.
+    partitions = max(1, -(-ir.shape[1] // partition))
+    padded = np.zeros((ir.shape[0], partitions * partition), dtype=np.float32)
+    padded[:, :ir.shape[1]] = ir
+    spectra = np.fft.rfft(padded.reshape(ir.shape[0], partitions, partition), n=2 * partition, axis=2)
+    spectra = spectra.astype(np.complex64)
+    spectra.flags.writeable = False
+    return spectra
+
+
+def load_ir_spectra(path: str, sample_rate: int, partition: int) -> Tuple[np.ndarray, int]:
+    # Returns the spectra and the response length in frames, resampling the file to the signal's rate first.
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, sample_rate, partition)
+    cached = IR_SPECTRA_CACHE.get(key)
+    if cached is not None:
+        return cached
+    ir = load_sample(path, sample_rate)
+    entry = (ir_spectra(ir.data, partition), ir.frames)
+    IR_SPECTRA_CACHE.put(key, entry, entry[0].nbytes)
+    return entry
+
+
+class PartitionedConvolver:
+    # Uniformly partitioned overlap-add convolution. Each full partition of input is transformed
+    # once into a frequency-domain delay line; every output partition is the sum of the last P
+    # input spectra times the P response spectra, so the cost per frame does not grow with the
+    # response length the way direct convolution does. Blocks of any size are queued until a
+    # partition is full, and output frame n always lines up with input frame n.
+    def __init__(self, spectra: np.ndarray, ir_frames: int, input_channels: int, wet: float = 1.0, dry: float = 0.0):
+        ir_channels, self.partitions, bins = spectra.shape
+        self.partition = bins - 1
+        self.ir_frames = ir_frames
+        self.wet = wet
+        self.dry = dry
+        # Mono inputs or responses are spread over the other side's channels.
+        self.channels = max(input_channels, ir_channels)
+        self._input_rows = np.arange(self.channels) % input_channels
+        ir_rows = np.arange(self.channels) % ir_channels
+        # Oldest first, to line up with the delay line view below.
+        self._spectra = np.ascontiguousarray(spectra[ir_rows, ::-1])
+        if wet != 1.0:
+            self._spectra *= np.complex64(wet)
+        # The delay line is stored twice over, so the newest P spectra are always one contiguous slice.
+        self._delay_line = np.zeros((self.channels, 2 * self.partitions, bins), dtype=np.complex64)
+        self._product = np.empty((self.channels, self.partitions, bins), dtype=np.complex64)
+        self._accumulator = np.empty((self.channels, bins), dtype=np.complex64)
+        self._tail = np.zeros((self.channels, self.partition), dtype=np.float32)
+        self._queued = np.empty((input_channels, 0), dtype=np.float32)
+        self._slot = 0
+
+    def _convolve_partition(self, block: np.ndarray, out: np.ndarray):
+        spectrum = np.fft.rfft(block, n=2 * self.partition, axis=1)[self._input_rows]
+        self._delay_line[:, self._slot] = spectrum
+        self._delay_line[:, self._slot + self.partitions] = spectrum
+        recent = self._delay_line[:, self._slot + 1:self._slot + 1 + self.partitions]
+        np.multiply(recent, self._spectra, out=self._product)
+        np.sum(self._product, axis=1, out=self._accumulator)
+        result = np.fft.irfft(self._accumulator, n=2 * self.partition, axis=1)
+        np.add(result[:, :self.partition], self._tail, out=out)
+        self._tail[:] = result[:, self.partition:]
+        if self.dry:
+            out += self.dry * block[self._input_rows]
+        self._slot = (self._slot + 1) % self.partitions
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        # Returns every full partition of output the queued input allows, as (channels, frames) float32.
+        queued = np.concatenate([self._queued, np.asarray(block, dtype=np.float32)], axis=1)
+        count = queued.shape[1] // self.partition
+        out = np.empty((self.channels, count * self.partition), dtype=np.float32)
+        for index in range(count):
+            start = index * self.partition
+            self._convolve_partition(queued[:, start:start + self.partition], out[:, start:start + self.partition])
+        self._queued = queued[:, count * self.partition:].copy()
+        return out
+
+    def flush(self) -> np.ndarray:
+        # Everything still owed once the input has ended: the queued input and the response tail.
+        remaining = self.queued_frames() + self.ir_frames - 1
+        padding = -(-remaining // self.partition) * self.partition - self._queued.shape[1]
+        out = self.process(np.zeros((self._queued.shape[0], padding), dtype=np.float32))
+        return out[:, :remaining]
+
+    def queued_frames(self) -> int:
+        return self._queued.shape[1]
+
+
+def convolve(data: np.ndarray, spectra: np.ndarray, ir_frames: int, out: np.ndarray = None,
+             wet: float = 1.0, dry: float = 0.0, chunk_frames: int = 262144) -> np.ndarray:
+    # Full linear convolution of a (channels, frames) buffer, frames + ir_frames - 1 frames long,
+    # fed in chunks so the queued copies stay bounded.
+    convolver = PartitionedConvolver(spectra, ir_frames, data.shape[0], wet, dry)
+    if out is None:
+        out = np.empty((convolver.channels, data.shape[1] + ir_frames - 1), dtype=np.float32)
+    written = 0
+    for start in range(0, data.shape[1], chunk_frames):
+        produced = convolver.process(data[:, start:start + chunk_frames])
+        out[:, written:written + produced.shape[1]] = produced
+        written += produced.shape[1]
+    tail = convolver.flush()
+    out[:, written:written + tail.shape[1]] = tail
+    return out
@@ -0,0 +1,209 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from audio_buffer import AudioBuffer
+from nodes import BaseNode, END_OF_STREAM, register_node
+from wavetable import render_oscillators, waveform_index
+from sample_cache import load_sample
+
+@register_node("generator/audiocraft")
+class AudioCraftNode(BaseNode):
+    NODE_NAME = "AudioCraft"
+    RUN_OUT_OF_PROCESS = True
+    MODELS = ("facebook/musicgen-small",)
+    DISK_CACHEABLE = True
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        return {
+            "prompt": "80s synth solo",
+            "duration_secs": "5",
+            "backend": "local",
+            "model": "facebook/musicgen-small"
+        }
+
+    def _uses_server(self) -> bool:
+        return self.params.get("backend", "local").strip().lower() == "server"
+
+    def runs_out_of_process(self) -> bool:
+        # Server requests only wait on the network, and concurrent ones are batched by the server.
+        return self.RUN_OUT_OF_PROCESS and not self._uses_server()
+
+    def required_models(self) -> List[str]:
+        if self._uses_server():
+            return []
+        return [self.params.get("model", self.MODELS[0])]
+
+    @classmethod
+    def load_model(cls, model_name: str) -> Any:
+        from audiocraft.models import MusicGen
+        return MusicGen.get_pretrained(model_name)
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing AudioCraftNode {self.dpg_tag}")
+
+        if self._uses_server():
+            return self._compute_on_server()
+
+        try:
+            model = self.get_model(self.params.get("model", self.MODELS[0]))
+
+            prompt = self.params.get("prompt", "default prompt")
+            duration = int(self.params.get("duration_secs", "5"))
+            
+            self.check_cancelled()
+            print(f"AudioCraftNode: Generating with prompt: {prompt}")
+            model.set_generation_params(duration=duration)
+            
+            wav_tensors = model.generate(descriptions=[prompt])
+            
+            # Models return (channels, frames), which is already the buffer layout.
+            audio = AudioBuffer.from_channels(wav_tensors[0].cpu().numpy(), model.sample_rate)
+
+            print(f"AudioCraftNode: Generation complete.")
+            return {"audio_out": audio}
+
+        except Exception as e:
+            print(f"AudioCraftNode: Error during compute: {e}")
+            return {"audio_out": None}
+
+    def _compute_on_server(self) -> Dict[str, Any]:
+        try:
+            from audiocraft_client import get_client
+
+            prompt = self.params.get("prompt", "default prompt")
+            duration = float(self.params.get("duration_secs", "5"))
+
+            print(f"AudioCraftNode: Requesting server generation for prompt: {prompt}")
+            audio_array, sample_rate = get_client().generate(prompt, duration)
+
+            print(f"AudioCraftNode: Server generation complete.")
+            return {"audio_out": AudioBuffer.from_array(audio_array, sample_rate)}
+
+        except Exception as e:
+            print(f"AudioCraftNode: Error during server generation: {e}")
+            return {"audio_out": None}
+
+
+@register_node("generator/osc")
+class OscNode(BaseNode):
+    NODE_NAME = "Oscillator"
+    PURE = True
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        return {
+            "frequency": "440",
+            "amplitude": "0.5",
+            "waveform": "sine",
+            "duration_secs": "1",
+            "sample_rate": "44100"
+        }
+
+    def output_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        return self._param_rate()
+
+    def _read_params(self) -> Tuple[float, float, int, float, int]:
+        frequency = float(self.params.get("frequency", "440"))
+        amplitude = float(self.params.get("amplitude", "0.5"))
+        waveform = waveform_index(self.params.get("waveform", "sine").strip().lower())
+        duration_secs = float(self.params.get("duration_secs", "1"))
+        sample_rate = int(self.params.get("sample_rate", "44100"))
+        return frequency, amplitude, waveform, duration_secs, sample_rate
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return OscNode.compute_batch([self], [inputs])[0]
+
+    @classmethod
+    def compute_batch(cls, nodes: List['OscNode'], inputs_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = [{"audio_out": None} for _ in nodes]
+        groups: Dict[Tuple[int, int], List[Tuple[int, float, float, int]]] = {}
+
+        for index, node in enumerate(nodes):
+            print(f"Computing OscNode {node.dpg_tag}")
+            try:
+                frequency, amplitude, waveform, duration_secs, sample_rate = node._read_params()
+                frames = int(sample_rate * duration_secs)
+                groups.setdefault((sample_rate, frames), []).append((index, frequency, amplitude, waveform))
+            except Exception as e:
+                print(f"OscNode: Error computing test signal: {e}")
+
+        # Voices sharing a rate and length are rendered together in one vectorized pass.
+        for (sample_rate, frames), voices in groups.items():
+            indices, frequencies, amplitudes, waveforms = zip(*voices)
+            out = nodes[indices[0]].allocate((len(voices), frames))
+            block, _ = render_oscillators(frequencies, amplitudes, waveforms, frames, sample_rate, out=out)
+            # Each voice is a one-channel view onto its row of the shared block.
+            for row, index in enumerate(indices):
+                results[index] = {"audio_out": AudioBuffer(block[row:row + 1], sample_rate)}
+            print(f"OscNode: Generated {len(voices)} voice(s) of {frames} frames at {sample_rate}Hz")
+
+        return results
+
+    def begin_stream(self, block_size: int):
+        super().begin_stream(block_size)
+        _, _, _, duration_secs, sample_rate = self._read_params()
+        self._phase = np.zeros(1)
+        self._frames_left = int(sample_rate * duration_secs)
+
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        if self._frames_left <= 0:
+            return {"audio_out": END_OF_STREAM}
+
+        frequency, amplitude, waveform, _, sample_rate = self._read_params()
+        frames = min(self.block_size, self._frames_left)
+
+        block, self._phase = render_oscillators([frequency], [amplitude], [waveform], frames, sample_rate, self._phase)
+
+        self._frames_left -= frames
+        return {"audio_out": AudioBuffer(block, sample_rate)}
+
+@register_node("generator/sample_loader")
+class SampleLoaderNode(BaseNode):
+    NODE_NAME = "Sample Loader"
+    PURE = True
+    FILE_PARAMS = ("filepath",)
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        return {
+            "filepath": "",
+            "sample_rate": ""
+        }
+
+    def output_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        return self._param_rate()
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing SampleLoaderNode {self.dpg_tag}")
+        try:
+            filepath = self.params.get("filepath", "")
+            target_rate = self.params.get("sample_rate", "").strip()
+            audio = load_sample(filepath, int(target_rate) if target_rate else None)
+
+            print(f"SampleLoaderNode: Loaded {audio.frames} frames from {filepath} at {audio.sample_rate}Hz")
+            return {"audio_out": audio}
+
+        except Exception as e:
+            print(f"SampleLoaderNode: Error loading sample: {e}")
+            return {"audio_out": None}
@@ -0,0 +1,76 @@
+import json
+import itertools
+from typing import Dict, Any, Callable, Optional, Tuple
+from nodes import NODE_REGISTRY
+
+GRAPH_FORMAT_VERSION = 1
+
+
+def serialize_graph(graph_manager, positions: Optional[Dict[int, Tuple[float, float]]] = None) -> Dict[str, Any]:
+    node_ids = {}
+    port_by_attr = {}
+    nodes = []
+
+    for index, (node_tag, node) in enumerate(graph_manager.nodes.items(), start=1):
+        node_id = f"node_{index}"
+        node_ids[node_tag] = node_id
+
+        for port_name, attr_tag in node.input_attr_map.items():
+            port_by_attr[attr_tag] = (node_id, port_name)
+        for port_name, attr_tag in node.output_attr_map.items():
+            port_by_attr[attr_tag] = (node_id, port_name)
+
+        node_entry = {"id": node_id, "type": node.NODE_TYPE, "params": dict(node.params)}
+        if positions and node_tag in positions:
+            node_entry["pos"] = list(positions[node_tag])
+        nodes.append(node_entry)
+
+    links = []
+    for attr_out, attr_in in graph_manager.links.values():
+        if attr_out in port_by_attr and attr_in in port_by_attr:
+            links.append({"from": list(port_by_attr[attr_out]), "to": list(port_by_attr[attr_in])})
+
+    return {"version": GRAPH_FORMAT_VERSION, "nodes": nodes, "links": links}
+
+
+def populate_graph(data: Dict[str, Any], graph_manager, tag_factory: Callable[[], int] = None) -> Dict[str, int]:
+    if data.get("version", GRAPH_FORMAT_VERSION) > GRAPH_FORMAT_VERSION:
+        raise ValueError(f"Unsupported graph format version {data.get('version')}")
+
+    if tag_factory is None:
+        counter = itertools.count(1)
+        tag_factory = lambda: next(counter)
+
+    node_tags = {}
+    for node_entry in data.get("nodes", []):
+        node_id = node_entry["id"]
+        node_type = node_entry["type"]
+        if node_id in node_tags:
+            raise ValueError(f"Duplicate node id '{node_id}'")
+        if node_type not in NODE_REGISTRY:
+            raise ValueError(f"Unknown node type '{node_type}' for node '{node_id}'")
+
+        node = graph_manager.add_node(node_type, tag_factory(), tag_factory=tag_factory, params=node_entry.get("params", {}))
+        node_tags[node_id] = node.dpg_tag
+
+    for link_entry in data.get("links", []):
+        (out_id, out_port), (in_id, in_port) = link_entry["from"], link_entry["to"]
+        try:
+            attr_out = graph_manager.nodes[node_tags[out_id]].output_attr_map[out_port]
+            attr_in = graph_manager.nodes[node_tags[in_id]].input_attr_map[in_port]
+        except KeyError:
+            raise ValueError(f"Invalid link {out_id}.{out_port} -> {in_id}.{in_port}")
+        if not graph_manager.on_link_added(tag_factory(), attr_out, attr_in):
+            raise ValueError(f"Link {out_id}.{out_port} -> {in_id}.{in_port} would create a cycle")
+
+    return node_tags
+
+
+def save_graph_file(path: str, graph_manager, positions: Optional[Dict[int, Tuple[float, float]]] = None):
+    with open(path, "w") as f:
+        json.dump(serialize_graph(graph_manager, positions), f, indent=2)
+
+
+def read_graph_file(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return json.load(f)
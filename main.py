@@ -1,18 +1,25 @@
 import dearpygui.dearpygui as dpg
 from audio_engine import AudioEngine
+from profiler import NodeProfiler
+from preview import default_sink
+from render_cache import RenderCache
 from node_graph import GraphManager
 from nodes import NODE_REGISTRY
 import queue
 from theme import apply_theme
-import subprocess
-import requests
+import graph_io
 import sys
 import threading
 import json
 import os
+import numpy as np
 
 audiocraft_server_process = None
 CONFIG = {}
+THUMBNAIL_POINTS = 128
+# output attribute tag -> {"plot": thumbnail item, "drawn": what it currently shows}
+waveform_thumbnails = {}
+waveform_view = {"output_tag": None, "drawn": None}
 
 def load_config():
     global CONFIG
@@ -65,9 +72,11 @@ def _launch_server_thread():
         results_queue.put("AudioCraft server path invalid. Check config.json.")
         return
 
+    import subprocess
+
     try:
         local_process = subprocess.Popen(
-            [python_executable, "audiocraft_server.py"],
+            [python_executable, "audiocraft_server.py"] + CONFIG.get("audiocraft_server_args", []),
             stderr=subprocess.PIPE,
             text=True,
             bufsize=1
@@ -117,8 +126,12 @@ def stop_audiocraft_server_callback():
     global audiocraft_server_process
     if audiocraft_server_process is not None and audiocraft_server_process.poll() is None:
         print("GUI: Stopping AudioCraft server...")
+        # Only needed here, so they stay out of the startup path.
+        import subprocess
+        import requests
+        from audiocraft_client import get_client
         try:
-            requests.post("http://127.0.0.1:5001/shutdown")
+            get_client().shutdown()
             audiocraft_server_process.communicate(timeout=5)
             print("GUI: AudioCraft server stopped.")
             dpg.set_value("status_text", "AudioCraft server stopped.")
@@ -144,7 +157,102 @@ def process_graph_callback():
     message = "--- GUI: Processing Graph ---"
     print(message)
     dpg.set_value("status_text", message)
-    graph_manager.process_graph()
+    mode = 'stream' if dpg.get_value("stream_mode_checkbox") else 'offline'
+    graph_manager.process_graph(mode=mode)
+
+def play_preview_callback():
+    task = graph_manager.build_task('stream', keep_dirty=True)
+    if task is None:
+        dpg.set_value("status_text", "Error: Cycle detected in graph.")
+        return
+    try:
+        audio_engine.start_preview(task, sink=default_sink())
+        dpg.set_value("status_text", "Previewing...")
+    except Exception as e:
+        print(f"GUI: Failed to start preview: {e}")
+        dpg.set_value("status_text", f"Error: {e}")
+
+def stop_preview_callback():
+    audio_engine.stop_preview()
+    dpg.set_value("preview_status_text", "")
+
+def _update_preview_status():
+    preview = audio_engine.preview
+    if preview is None:
+        return
+    stats = preview.stats()
+    state = "done" if preview.done else "playing"
+    dpg.set_value("preview_status_text", f"Preview {state}: {stats['underruns']} underrun(s), "
+                                         f"{stats['buffered_frames']} frames buffered")
+
+def _update_waveform_thumbnails():
+    for output_tag, entry in list(waveform_thumbnails.items()):
+        if not dpg.does_item_exist(entry["plot"]):
+            del waveform_thumbnails[output_tag]
+            continue
+        pyramid = audio_engine.waveforms.get(output_tag)
+        drawn = (id(pyramid), pyramid.version) if pyramid is not None else None
+        if drawn == entry["drawn"]:
+            continue
+        entry["drawn"] = drawn
+        if pyramid is None:
+            dpg.set_value(entry["plot"], [])
+            continue
+        # Interleaving each bin's max and min draws the envelope as a single polyline.
+        _, mins, maxs = pyramid.view(max_points=THUMBNAIL_POINTS // 2)
+        dpg.set_value(entry["plot"], np.column_stack([maxs, mins]).ravel().tolist())
+
+def _update_waveform_view():
+    pyramid = audio_engine.waveforms.get(waveform_view["output_tag"])
+    if pyramid is None:
+        return
+    x_min, x_max = dpg.get_axis_limits("waveform_x_axis")
+    width = max(64, int(dpg.get_item_rect_size("waveform_plot")[0]))
+    drawn = (id(pyramid), pyramid.version, x_min, x_max, width)
+    if drawn == waveform_view["drawn"]:
+        return
+    refit = waveform_view["drawn"] is None or waveform_view["drawn"][0] != id(pyramid)
+    waveform_view["drawn"] = drawn
+    # Only the bins inside the visible range are drawn, at roughly one per pixel.
+    start, end = (0.0, None) if refit else (max(0.0, x_min), x_max)
+    positions, mins, maxs = pyramid.view_seconds(start, end, max_points=width)
+    dpg.configure_item("waveform_series", x=positions.tolist(), y1=maxs.tolist(), y2=mins.tolist())
+    if refit:
+        dpg.fit_axis_data("waveform_x_axis")
+
+def cancel_render_callback():
+    print("GUI: Cancelling render...")
+    audio_engine.cancel()
+
+def profiling_toggled_callback(sender, app_data):
+    audio_engine.set_profiling(app_data, trace_memory=dpg.get_value("profile_memory_checkbox"))
+
+def export_trace_callback():
+    profile = audio_engine.last_profile
+    if profile is None:
+        dpg.set_value("status_text", "No profile recorded yet.")
+        return
+    path = dpg.get_value("trace_path_input")
+    try:
+        profile.export_chrome_trace(path)
+        print(f"GUI: Exported trace to {path}")
+        dpg.set_value("status_text", f"Exported trace to {path}")
+    except Exception as e:
+        print(f"GUI: Failed to export trace: {e}")
+        dpg.set_value("status_text", "Error: Could not export trace.")
+
+def _show_profile(profile):
+    dpg.delete_item("profile_table", children_only=True, slot=1)
+    for row in profile.summary():
+        node_label = graph_manager.nodes[row["node_tag"]].NODE_NAME if row["node_tag"] in graph_manager.nodes else row["node_type"]
+        peak = f"{row['peak_bytes'] / 1e6:.2f}" if row["peak_bytes"] is not None else "-"
+        with dpg.table_row(parent="profile_table"):
+            dpg.add_text(f"{node_label} {row['node_tag']}")
+            dpg.add_text(f"{row['wall'] * 1e3:.1f}")
+            dpg.add_text(f"{row['cpu'] * 1e3:.1f}")
+            dpg.add_text(f"{row['output_bytes'] / 1e6:.1f}")
+            dpg.add_text(peak)
+            dpg.add_text(f"{row['samples_per_sec'] / 1e6:.1f}")
 
 def link_callback(sender, app_data):
     attr_out = app_data[0]
@@ -152,7 +260,9 @@ def link_callback(sender, app_data):
     
     link_tag = dpg.add_node_link(attr_out, attr_in, parent=sender)
     print(f"GUI: Link created via callback: {link_tag}")
-    graph_manager.on_link_added(link_tag, attr_out, attr_in)
+    if not graph_manager.on_link_added(link_tag, attr_out, attr_in):
+        dpg.delete_item(link_tag)
+        dpg.set_value("status_text", "Error: Link would create a cycle.")
 
 def delink_callback(sender, app_data):
     link_tag = app_data
@@ -164,6 +274,27 @@ def _parameter_changed_callback(sender, app_data, user_data):
     node = user_data["node"]
     param_name = user_data["param_name"]
     node.params[param_name] = app_data
+    graph_manager.mark_node_dirty(node.dpg_tag)
+    if param_name in node.PORT_PARAMS:
+        _sync_node_ports(node)
+
+def _sync_node_ports(node_object):
+    node_tag = node_object.dpg_tag
+    attributes = list(node_object.input_attr_map.values()) + list(node_object.output_attr_map.values())
+    link_tags = graph_manager.find_links_for_attributes(attributes)
+    if not graph_manager.sync_ports(node_tag, dpg.generate_uuid):
+        return
+
+    # Ports cannot be added to a built node, so it is rebuilt in place with the links that survived.
+    pos = dpg.get_item_pos(node_tag)
+    for link_tag in link_tags:
+        dpg.delete_item(link_tag)
+    dpg.delete_item(node_tag)
+    _build_node_ui(node_object, pos)
+    for link_tag in link_tags:
+        if link_tag in graph_manager.links:
+            attr_out, attr_in = graph_manager.links[link_tag]
+            dpg.add_node_link(attr_out, attr_in, parent="Node Editor", tag=link_tag)
 
 def _node_selected_callback(sender, app_data, user_data):
     node_object = user_data
@@ -172,6 +303,11 @@ def _node_selected_callback(sender, app_data, user_data):
     if not node_object:
         return
 
+    output_tags = list(node_object.output_attr_map.values())
+    if output_tags and waveform_view["output_tag"] != output_tags[0]:
+        waveform_view["output_tag"] = output_tags[0]
+        waveform_view["drawn"] = None
+
     dpg.add_text(f"Node: {node_object.NODE_NAME}", parent="Parameter View")
     
     for param_name, default_value in node_object.params.items():
@@ -179,6 +315,8 @@ def _node_selected_callback(sender, app_data, user_data):
         dpg.add_input_text(
             default_value=default_value,
             width=-1,
+            # Port counts apply on enter, so typing 64 does not pass through 6 and unlink inputs 7 to 16.
+            on_enter=param_name in node_object.PORT_PARAMS,
             callback=_parameter_changed_callback,
             user_data={"node": node_object, "param_name": param_name},
             parent="Parameter View"
@@ -190,38 +328,88 @@ def add_node_callback(sender, app_data, user_data):
         return
 
     node_tag = dpg.generate_uuid()
-    node_object = graph_manager.add_node(node_type, node_tag)
+    node_object = graph_manager.add_node(node_type, node_tag, tag_factory=dpg.generate_uuid)
     
     if not node_object:
         print(f"GUI: Error: Could not create node of type {node_type}")
         return
         
-    attr_def = node_object.get_attributes()
+    _build_node_ui(node_object)
+    
+    dpg.configure_item("Node Context Menu", show=False)
+
+def _build_node_ui(node_object, pos=None):
+    node_tag = node_object.dpg_tag
+    attr_def = node_object.port_attributes()
     inputs_def = attr_def.get("inputs", {})
     outputs_def = attr_def.get("outputs", {})
 
-    with dpg.node(label=node_object.NODE_NAME, tag=node_tag, parent="Node Editor"):
+    node_kwargs = {"pos": pos} if pos else {}
+    with dpg.node(label=node_object.NODE_NAME, tag=node_tag, parent="Node Editor", **node_kwargs):
         
         for input_name, input_type_str in inputs_def.items():
-            attr_tag = dpg.generate_uuid()
-            node_object.input_attr_map[input_name] = attr_tag
+            attr_tag = node_object.input_attr_map[input_name]
             
             with dpg.node_attribute(label=input_name, tag=attr_tag, attribute_type=dpg.mvNode_Attr_Input):
                 dpg.add_text(input_type_str)
 
         for output_name, output_type_str in outputs_def.items():
-            attr_tag = dpg.generate_uuid()
-            node_object.output_attr_map[output_name] = attr_tag
+            attr_tag = node_object.output_attr_map[output_name]
             
             with dpg.node_attribute(label=output_name, tag=attr_tag, attribute_type=dpg.mvNode_Attr_Output):
                 dpg.add_text(output_type_str)
+                plot_tag = dpg.add_simple_plot(height=32, width=140)
+                waveform_thumbnails[attr_tag] = {"plot": plot_tag, "drawn": None}
     
     with dpg.item_handler_registry() as node_handler:
         dpg.add_item_clicked_handler(callback=_node_selected_callback, user_data=node_object)
     
     dpg.bind_item_handler_registry(node_tag, node_handler)
-    
-    dpg.configure_item("Node Context Menu", show=False)
+
+def save_graph_callback():
+    path = dpg.get_value("graph_path_input")
+    positions = {node_tag: dpg.get_item_pos(node_tag) for node_tag in graph_manager.nodes}
+    try:
+        graph_io.save_graph_file(path, graph_manager, positions)
+        print(f"GUI: Saved graph to {path}")
+        dpg.set_value("status_text", f"Saved graph to {path}")
+    except Exception as e:
+        print(f"GUI: Failed to save graph: {e}")
+        dpg.set_value("status_text", "Error: Could not save graph.")
+
+def load_graph_callback():
+    path = dpg.get_value("graph_path_input")
+    try:
+        data = graph_io.read_graph_file(path)
+    except Exception as e:
+        print(f"GUI: Failed to read graph: {e}")
+        dpg.set_value("status_text", "Error: Could not read graph file.")
+        return
+
+    dpg.delete_item("Parameter View", children_only=True)
+    for link_tag in list(graph_manager.links):
+        dpg.delete_item(link_tag)
+        graph_manager.on_link_removed(link_tag)
+    for node_tag in list(graph_manager.nodes):
+        dpg.delete_item(node_tag)
+        graph_manager.remove_node(node_tag)
+
+    try:
+        node_tags = graph_io.populate_graph(data, graph_manager, tag_factory=dpg.generate_uuid)
+    except Exception as e:
+        print(f"GUI: Failed to load graph: {e}")
+        dpg.set_value("status_text", "Error: Invalid graph file.")
+        return
+
+    positions = {node_entry["id"]: node_entry.get("pos") for node_entry in data.get("nodes", [])}
+    for node_id, node_tag in node_tags.items():
+        _build_node_ui(graph_manager.nodes[node_tag], positions.get(node_id))
+
+    for link_tag, (attr_out, attr_in) in graph_manager.links.items():
+        dpg.add_node_link(attr_out, attr_in, parent="Node Editor", tag=link_tag)
+
+    print(f"GUI: Loaded graph from {path}")
+    dpg.set_value("status_text", f"Loaded graph from {path}")
 
 def delete_node_callback():
     print("GUI: Delete key pressed.")
@@ -260,80 +448,117 @@ def on_exit_callback():
     stop_engine_callback()
     stop_audiocraft_server_callback()
 
-results_queue = queue.Queue()
-audio_engine = AudioEngine(results_queue)
-graph_manager = GraphManager(audio_engine)
+if __name__ == '__main__':
+    results_queue = queue.Queue()
+    audio_engine = AudioEngine(results_queue, track_waveforms=True, render_cache=RenderCache())
+    graph_manager = GraphManager(audio_engine)
 
-dpg.create_context()
+    dpg.create_context()
 
-load_config()
+    load_config()
 
-with dpg.window(tag="Primary Window", no_title_bar=True, no_close=True, no_move=True):
-    with dpg.group(horizontal=True):
-        with dpg.child_window(width=300):
-            dpg.add_text("SIN // Minimal Audio Architect")
+    with dpg.window(tag="Primary Window", no_title_bar=True, no_close=True, no_move=True):
+        with dpg.group(horizontal=True):
+            with dpg.child_window(width=300):
+                dpg.add_text("SIN // Minimal Audio Architect")
             
-            dpg.add_separator()
-            dpg.add_text("Audio Engine")
-            with dpg.group(horizontal=True):
-                dpg.add_button(label="Start Engine", callback=start_engine_callback)
-                dpg.add_button(label="Stop Engine", callback=stop_engine_callback)
+                dpg.add_separator()
+                dpg.add_text("Audio Engine")
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="Start Engine", callback=start_engine_callback)
+                    dpg.add_button(label="Stop Engine", callback=stop_engine_callback)
             
-            dpg.add_separator()
-            dpg.add_text("AudioCraft Server")
-            with dpg.group(horizontal=True):
-                dpg.add_button(label="Start Server", callback=start_audiocraft_server_callback)
-                dpg.add_button(label="Stop Server", callback=stop_audiocraft_server_callback)
-
-            dpg.add_separator()
-            dpg.add_text("Graph")
-            dpg.add_button(label="Process Graph", callback=process_graph_callback)
-            dpg.add_text("Ready", tag="status_text")
+                dpg.add_separator()
+                dpg.add_text("AudioCraft Server")
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="Start Server", callback=start_audiocraft_server_callback)
+                    dpg.add_button(label="Stop Server", callback=stop_audiocraft_server_callback)
+
+                dpg.add_separator()
+                dpg.add_text("Graph")
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="Process Graph", callback=process_graph_callback)
+                    dpg.add_button(label="Cancel", callback=cancel_render_callback)
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="Play", callback=play_preview_callback)
+                    dpg.add_button(label="Stop", callback=stop_preview_callback)
+                dpg.add_text("", tag="preview_status_text")
+                dpg.add_checkbox(label="Stream in blocks", tag="stream_mode_checkbox")
+                dpg.add_input_text(default_value="graph.json", width=-1, tag="graph_path_input")
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="Save Graph", callback=save_graph_callback)
+                    dpg.add_button(label="Load Graph", callback=load_graph_callback)
+                dpg.add_text("Ready", tag="status_text")
+
+                dpg.add_separator()
+                dpg.add_text("Profiling")
+                with dpg.group(horizontal=True):
+                    dpg.add_checkbox(label="Profile renders", tag="profile_checkbox", callback=profiling_toggled_callback)
+                    dpg.add_checkbox(label="Memory", tag="profile_memory_checkbox",
+                                     callback=lambda: profiling_toggled_callback(None, dpg.get_value("profile_checkbox")))
+                dpg.add_input_text(default_value="trace.json", width=-1, tag="trace_path_input")
+                dpg.add_button(label="Export Trace", callback=export_trace_callback)
+                with dpg.table(tag="profile_table", header_row=True, resizable=True, policy=dpg.mvTable_SizingStretchProp):
+                    for column_label in ("Node", "ms", "CPU", "MB", "Peak", "Ms/s"):
+                        dpg.add_table_column(label=column_label)
             
-            dpg.add_separator()
-            dpg.add_text("Parameters")
-            with dpg.group(tag="Parameter View"):
-                pass
+                dpg.add_separator()
+                dpg.add_text("Parameters")
+                with dpg.group(tag="Parameter View"):
+                    pass
         
-        with dpg.child_window(width=-1):
-            with dpg.node_editor(tag="Node Editor", callback=link_callback, delink_callback=delink_callback):
-                pass
-
-with dpg.window(tag="Node Context Menu", no_title_bar=True, no_resize=True, no_move=True, no_scrollbar=True, modal=False, show=False):
-    for node_type_name, node_class in NODE_REGISTRY.items():
-        dpg.add_menu_item(
-            label=f"Add: {node_class.NODE_NAME}",
-            callback=add_node_callback,
-            user_data=node_type_name
-        )
-    dpg.add_separator()
-    dpg.add_menu_item(label="Close", callback=lambda: dpg.configure_item("Node Context Menu", show=False))
-
-dpg.create_viewport(title='SIN', width=1280, height=720)
-dpg.setup_dearpygui()
-apply_theme()
-
-dpg.set_primary_window("Primary Window", True)
-
-with dpg.handler_registry(tag="Global Key Handler"):
-    dpg.add_key_press_handler(key=dpg.mvKey_Delete, callback=delete_node_callback)
-
-with dpg.handler_registry(tag="Global Mouse Handler"):
-    dpg.add_mouse_click_handler(button=dpg.mvMouseButton_Left, callback=hide_node_context_menu)
-    dpg.add_mouse_click_handler(button=dpg.mvMouseButton_Right, callback=show_node_context_menu)
-
-dpg.show_viewport()
-
-dpg.set_exit_callback(on_exit_callback)
-
-while dpg.is_dearpygui_running():
-    try:
-        result = results_queue.get(block=False)
-        print(f"GUI: Received result {result}")
-        dpg.set_value("status_text", result)
-    except queue.Empty:
-        pass
-    
-    dpg.render_dearpygui_frame()
-
-dpg.destroy_context()
\ No newline at end of file
+            with dpg.child_window(width=-1):
+                with dpg.node_editor(tag="Node Editor", callback=link_callback, delink_callback=delink_callback,
+                                     height=-220):
+                    pass
+                with dpg.plot(tag="waveform_plot", height=-1, width=-1, no_title=True):
+                    dpg.add_plot_axis(dpg.mvXAxis, label="seconds", tag="waveform_x_axis")
+                    with dpg.plot_axis(dpg.mvYAxis, tag="waveform_y_axis"):
+                        dpg.add_shade_series([], [], y2=[], tag="waveform_series")
+                    dpg.set_axis_limits("waveform_y_axis", -1.0, 1.0)
+
+    with dpg.window(tag="Node Context Menu", no_title_bar=True, no_resize=True, no_move=True, no_scrollbar=True, modal=False, show=False):
+        # Built from the cached node manifest; node modules are imported when a node is first added.
+        for node_type_name in NODE_REGISTRY:
+            dpg.add_menu_item(
+                label=f"Add: {NODE_REGISTRY.info(node_type_name)['name']}",
+                callback=add_node_callback,
+                user_data=node_type_name
+            )
+        dpg.add_separator()
+        dpg.add_menu_item(label="Close", callback=lambda: dpg.configure_item("Node Context Menu", show=False))
+
+    dpg.create_viewport(title='SIN', width=1280, height=720)
+    dpg.setup_dearpygui()
+    apply_theme()
+
+    dpg.set_primary_window("Primary Window", True)
+
+    with dpg.handler_registry(tag="Global Key Handler"):
+        dpg.add_key_press_handler(key=dpg.mvKey_Delete, callback=delete_node_callback)
+
+    with dpg.handler_registry(tag="Global Mouse Handler"):
+        dpg.add_mouse_click_handler(button=dpg.mvMouseButton_Left, callback=hide_node_context_menu)
+        dpg.add_mouse_click_handler(button=dpg.mvMouseButton_Right, callback=show_node_context_menu)
+
+    dpg.show_viewport()
+
+    dpg.set_exit_callback(on_exit_callback)
+
+    while dpg.is_dearpygui_running():
+        try:
+            result = results_queue.get(block=False)
+            if isinstance(result, NodeProfiler):
+                _show_profile(result)
+            else:
+                print(f"GUI: Received result {result}")
+                dpg.set_value("status_text", result)
+        except queue.Empty:
+            pass
+
+        _update_preview_status()
+        _update_waveform_thumbnails()
+        _update_waveform_view()
+        dpg.render_dearpygui_frame()
+
+    dpg.destroy_context()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class _ModelEntry:
+    def __init__(self, loader: Callable[[], Any], unloader: Optional[Callable[[Any], None]]):
+        self.loader = loader
+        self.unloader = unloader
+        self.future: Optional[Future] = None
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    def __init__(self, idle_timeout_secs: Optional[float] = 600.0, status_callback: Callable[[str], None] = None):
+        self.idle_timeout_secs = idle_timeout_secs
+        self.status_callback = status_callback
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper_thread = None
+        self._reaper_stop = threading.Event()
+
+    def _report(self, message: str):
+        print(f"ModelRegistry: {message}")
+        if self.status_callback is not None:
+            self.status_callback(message)
+
+    def declare(self, name: str, loader: Callable[[], Any], unloader: Callable[[Any], None] = None):
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _ModelEntry(loader, unloader)
+
+    def _start_load(self, name: str) -> Future:
+        # Called with the lock held; the first caller starts the load and everyone else shares its future.
+        entry = self._entries[name]
+        if entry.future is None:
+            entry.future = Future()
+            threading.Thread(target=self._load, args=(name, entry, entry.future), daemon=True).start()
+        return entry.future
+
+    def _load(self, name: str, entry: _ModelEntry, future: Future):
+        self._report(f"Loading model {name}...")
+        started = time.perf_counter()
+        try:
+            model = entry.loader()
+        except Exception as e:
+            with self._lock:
+                if entry.future is future:
+                    entry.future = None
+            future.set_exception(e)
+            self._report(f"Model {name} failed to load: {e}")
+            return
+        entry.last_used = time.monotonic()
+        future.set_result(model)
+        self._report(f"Model {name} ready ({time.perf_counter() - started:.1f}s).")
+
+    def preload(self, names: Iterable[str] = None):
+        with self._lock:
+            for name in list(self._entries) if names is None else names:
+                if name in self._entries:
+                    self._start_load(name)
+
+    def acquire(self, name: str, loader: Callable[[], Any] = None) -> Any:
+        with self._lock:
+            if name not in self._entries:
+                if loader is None:
+                    raise KeyError(f"Model {name} is not declared")
+                self._entries[name] = _ModelEntry(loader, None)
+            entry = self._entries[name]
+            future = self._start_load(name)
+            entry.in_use += 1
+        try:
+            return future.result()
+        except Exception:
+            self.release(name)
+            raise
+
+    def release(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.in_use = max(0, entry.in_use - 1)
+                entry.last_used = time.monotonic()
+
+    def get(self, name: str, loader: Callable[[], Any] = None) -> Any:
+        model = self.acquire(name, loader)
+        self.release(name)
+        return model
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(name)
+            future = entry.future if entry is not None else None
+        return future is not None and future.done() and future.exception() is None
+
+    def unload(self, name: str, reason: str = ""):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.future is None or not entry.future.done() or entry.in_use:
+                return
+            future, entry.future = entry.future, None
+        if future.exception() is not None:
+            return
+        if entry.unloader is not None:
+            try:
+                entry.unloader(future.result())
+            except Exception as e:
+                print(f"ModelRegistry: Error unloading model {name}: {e}")
+        self._report(f"Model {name} unloaded{reason}.")
+
+    def unload_idle(self):
+        if self.idle_timeout_secs is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle = [name for name, entry in self._entries.items()
+                    if entry.future is not None and entry.future.done() and not entry.in_use
+                    and now - entry.last_used > self.idle_timeout_secs]
+        for name in idle:
+            self.unload(name, " (idle)")
+
+    def unload_all(self):
+        with self._lock:
+            names = list(self._entries)
+        for name in names:
+            self.unload(name)
+
+    def start_reaper(self, interval_secs: float = 5.0):
+        if self._reaper_thread is not None:
+            return
+        self._reaper_stop.clear()
+
+        def reap():
+            while not self._reaper_stop.wait(interval_secs):
+                self.unload_idle()
+
+        self._reaper_thread = threading.Thread(target=reap, daemon=True)
+        self._reaper_thread.start()
+
+    def stop_reaper(self):
+        if self._reaper_thread is None:
+            return
+        self._reaper_stop.set()
+        self._reaper_thread.join()
+        self._reaper_thread = None
+
+
+_process_registry = None
+_process_registry_lock = threading.Lock()
+
+
+def process_registry() -> ModelRegistry:
+    # Used where no engine owns the node, such as inside out-of-process workers.
+    global _process_registry
+    with _process_registry_lock:
+        if _process_registry is None:
+            _process_registry = ModelRegistry(idle_timeout_secs=None)
+        return _process_registry
@@ -1,98 +1,385 @@
+import hashlib
 from collections import deque
 from nodes import NODE_REGISTRY
-from typing import Dict, Any
+from typing import Dict, Any, Callable
 
 class GraphManager:
     def __init__(self, audio_engine):
         self.nodes = {}
         self.links = {}
+        self.dirty_nodes = set()
         self.audio_engine = audio_engine
 
-    def add_node(self, node_type: str, dpg_tag: int) -> Any:
+        # Indexes kept up to date on every structural edit so planning and deletes never rescan the graph.
+        self.node_lookup_by_attr = {}
+        self.links_by_attr = {}
+        self.link_map_by_tag = {}
+        self.edge_counts = {}
+        self.children = {}
+        self.parents = {}
+        self._plan = None
+        # Resamplers the planner inserts in front of inputs that pin a sample rate, by synthetic node tag.
+        self._auto_resamplers = {}
+        # Duplicate nodes merged by the last build_task, alias node tag -> the node computed in its place.
+        self._merged = {}
+
+    def add_node(self, node_type: str, dpg_tag: int, tag_factory: Callable[[], int] = None,
+                 params: Dict[str, Any] = None) -> Any:
         print(f"GraphManager: Adding node {dpg_tag} of type {node_type}")
         if node_type in NODE_REGISTRY:
             node_class = NODE_REGISTRY[node_type]
             new_node = node_class(dpg_tag=dpg_tag)
+            # Params go in before the ports are created, since some nodes size their ports from them.
+            for param_name, value in (params or {}).items():
+                new_node.params[param_name] = str(value)
+            if tag_factory is not None:
+                attr_def = new_node.port_attributes()
+                for input_name in attr_def.get("inputs", {}):
+                    new_node.input_attr_map[input_name] = tag_factory()
+                for output_name in attr_def.get("outputs", {}):
+                    new_node.output_attr_map[output_name] = tag_factory()
             self.nodes[dpg_tag] = new_node
+            self.children[dpg_tag] = {}
+            self.parents[dpg_tag] = {}
+            self.register_node_attributes(dpg_tag)
+            self.dirty_nodes.add(dpg_tag)
+            self._plan = None
             return new_node
         else:
             print(f"GraphManager: Unknown node type {node_type}")
             return None
 
+    def sync_ports(self, node_tag, tag_factory: Callable[[], int]) -> bool:
+        # After an edit to one of a node's PORT_PARAMS: adds the ports it gained and drops the ones it lost,
+        # along with their links. Returns whether anything changed.
+        node = self.nodes[node_tag]
+        attr_def = node.port_attributes()
+        changed = False
+        for attr_map, names in ((node.input_attr_map, attr_def.get("inputs", {})),
+                                (node.output_attr_map, attr_def.get("outputs", {}))):
+            for name in [name for name in attr_map if name not in names]:
+                attr_tag = attr_map.pop(name)
+                for link_tag in self.find_links_for_attributes([attr_tag]):
+                    self.on_link_removed(link_tag)
+                self.node_lookup_by_attr.pop(attr_tag, None)
+                self.links_by_attr.pop(attr_tag, None)
+                changed = True
+            for name in names:
+                if name not in attr_map:
+                    attr_map[name] = tag_factory()
+                    self.node_lookup_by_attr[attr_map[name]] = node_tag
+                    changed = True
+        if changed:
+            print(f"GraphManager: Node {node_tag} now has {len(node.input_attr_map)} input(s)")
+            self.mark_node_dirty(node_tag)
+            self._plan = None
+        return changed
+
+    def register_node_attributes(self, node_tag):
+        node = self.nodes[node_tag]
+        for attr_tag in node.input_attr_map.values():
+            self.node_lookup_by_attr[attr_tag] = node_tag
+        for attr_tag in node.output_attr_map.values():
+            self.node_lookup_by_attr[attr_tag] = node_tag
+
     def remove_node(self, node_tag):
         if node_tag in self.nodes:
             print(f"GraphManager: Removing node {node_tag}")
+            node = self.nodes[node_tag]
+            attributes = list(node.input_attr_map.values()) + list(node.output_attr_map.values())
+
+            for link_tag in self.find_links_for_attributes(attributes):
+                self.on_link_removed(link_tag)
+            for attr_tag in attributes:
+                self.node_lookup_by_attr.pop(attr_tag, None)
+                self.links_by_attr.pop(attr_tag, None)
+
             del self.nodes[node_tag]
+            del self.children[node_tag]
+            del self.parents[node_tag]
+            self.dirty_nodes.discard(node_tag)
+            self._plan = None
         else:
             print(f"GraphManager: Warning: Node {node_tag} not found in manager.")
 
-    def on_link_added(self, link_tag, attr_out, attr_in):
+    def creates_cycle(self, source_node, dest_node) -> bool:
+        if source_node == dest_node:
+            return True
+        pending = [dest_node]
+        visited = {dest_node}
+        while pending:
+            for child in self.children[pending.pop()]:
+                if child == source_node:
+                    return True
+                if child not in visited:
+                    visited.add(child)
+                    pending.append(child)
+        return False
+
+    def on_link_added(self, link_tag, attr_out, attr_in) -> bool:
+        source_node = self.node_lookup_by_attr.get(attr_out)
+        dest_node = self.node_lookup_by_attr.get(attr_in)
+
+        if source_node is not None and dest_node is not None and self.creates_cycle(source_node, dest_node):
+            print(f"GraphManager: Error: Link {attr_out} -> {attr_in} would create a cycle. Link rejected.")
+            return False
+
         print(f"GraphManager: Storing link {link_tag}: {attr_out} -> {attr_in}")
         self.links[link_tag] = (attr_out, attr_in)
+        self.links_by_attr.setdefault(attr_out, set()).add(link_tag)
+        self.links_by_attr.setdefault(attr_in, set()).add(link_tag)
+
+        if source_node is not None and dest_node is not None:
+            self.link_map_by_tag[attr_in] = attr_out
+            self._add_edge(source_node, dest_node)
+            self._plan = None
+
+        self.mark_node_dirty(dest_node)
+        return True
 
     def on_link_removed(self, link_tag):
         print(f"GraphManager: Removing link {link_tag}")
-        self.links.pop(link_tag, None)
+        link = self.links.pop(link_tag, None)
+        if link is None:
+            return
+
+        attr_out, attr_in = link
+        for attr_tag in link:
+            attr_links = self.links_by_attr.get(attr_tag)
+            if attr_links is not None:
+                attr_links.discard(link_tag)
+
+        source_node = self.node_lookup_by_attr.get(attr_out)
+        dest_node = self.node_lookup_by_attr.get(attr_in)
+        if source_node is not None and dest_node is not None:
+            self._remove_edge(source_node, dest_node)
+            if self.link_map_by_tag.get(attr_in) == attr_out:
+                del self.link_map_by_tag[attr_in]
+                # Another link may still feed the same input port.
+                for other_tag in self.links_by_attr.get(attr_in, ()):
+                    other_out = self.links[other_tag][0]
+                    if other_out in self.node_lookup_by_attr:
+                        self.link_map_by_tag[attr_in] = other_out
+            self._plan = None
+
+        self.mark_node_dirty(dest_node)
+
+    def _add_edge(self, source_node, dest_node):
+        edge = (source_node, dest_node)
+        self.edge_counts[edge] = self.edge_counts.get(edge, 0) + 1
+        self.children[source_node][dest_node] = True
+        self.parents[dest_node][source_node] = True
+
+    def _remove_edge(self, source_node, dest_node):
+        edge = (source_node, dest_node)
+        count = self.edge_counts.get(edge, 0) - 1
+        if count > 0:
+            self.edge_counts[edge] = count
+            return
+        self.edge_counts.pop(edge, None)
+        self.children[source_node].pop(dest_node, None)
+        self.parents[dest_node].pop(source_node, None)
+
+    def mark_node_dirty(self, node_tag):
+        if node_tag in self.nodes:
+            self.dirty_nodes.add(node_tag)
+
+    def find_node_for_attribute(self, attr_tag):
+        return self.node_lookup_by_attr.get(attr_tag)
 
     def find_links_for_attributes(self, attributes):
         links_to_remove = []
-        for link_tag, (attr_out, attr_in) in self.links.items():
-            if attr_out in attributes or attr_in in attributes:
-                links_to_remove.append(link_tag)
+        for attr_tag in attributes:
+            for link_tag in self.links_by_attr.get(attr_tag, ()):
+                if link_tag not in links_to_remove:
+                    links_to_remove.append(link_tag)
         return links_to_remove
 
-    def process_graph(self):
-        print("GraphManager: --- Preparing Graph Process Task ---")
-        
-        node_lookup_by_attr = {}
-        
-        for node_tag, node in self.nodes.items():
-            for tag in node.input_attr_map.values():
-                node_lookup_by_attr[tag] = node_tag
-            for tag in node.output_attr_map.values():
-                node_lookup_by_attr[tag] = node_tag
-        
-        adj = {node_tag: [] for node_tag in self.nodes}
-        in_degree = {node_tag: 0 for node_tag in self.nodes}
-        
-        link_map_by_tag = {}
-
-        for attr_out, attr_in in self.links.values():
-            if attr_out in node_lookup_by_attr and attr_in in node_lookup_by_attr:
-                source_node = node_lookup_by_attr[attr_out]
-                dest_node = node_lookup_by_attr[attr_in]
-                
-                if dest_node not in adj[source_node]:
-                    adj[source_node].append(dest_node)
-                    in_degree[dest_node] += 1
-                
-                link_map_by_tag[attr_in] = attr_out
-            
-        queue = deque([node_tag for node_tag in self.nodes if in_degree[node_tag] == 0])
+    def compile_plan(self):
+        if self._plan is not None:
+            return self._plan
+
+        adj = {node_tag: list(children) for node_tag, children in self.children.items()}
+        in_degree = {node_tag: len(parents) for node_tag, parents in self.parents.items()}
+        remaining = dict(in_degree)
+
+        queue = deque([node_tag for node_tag in self.nodes if remaining[node_tag] == 0])
         sorted_nodes = []
-        
+
         while queue:
             node_tag = queue.popleft()
             sorted_nodes.append(node_tag)
-            
+
             for neighbor in adj[node_tag]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
+                remaining[neighbor] -= 1
+                if remaining[neighbor] == 0:
                     queue.append(neighbor)
-                    
+
         if len(sorted_nodes) != len(self.nodes):
             print("GraphManager: Error: Cycle detected in graph. Process aborted.")
-            return
+            return None
 
-        print(f"GraphManager: Submitting task for execution order: {sorted_nodes}")
-        
-        task = {
-            'type': 'process_graph',
+        self._plan = {
             'sorted_nodes': sorted_nodes,
-            'link_map_by_tag': link_map_by_tag,
-            'nodes_map': self.nodes
+            'link_map_by_tag': dict(self.link_map_by_tag),
+            'nodes_map': dict(self.nodes),
+            'adj': adj,
+            'in_degree': in_degree
         }
-        
-        self.audio_engine.control_queue.put(task)
-        
-        print("GraphManager: --- Graph Process Submitted ---")
\ No newline at end of file
+        return self._plan
+
+    def build_task(self, mode='offline', keep_dirty=False):
+        plan = self.compile_plan()
+        if plan is None:
+            return None
+
+        task = {'type': 'process_graph', 'mode': mode}
+        task.update(plan)
+        task['dirty_nodes'] = set(self.dirty_nodes)
+        # Models load in the background while the rest of the graph renders.
+        self.audio_engine.preload_node_models(plan['nodes_map'].values())
+        # Rates come from params, which the structural plan cache does not track, so this runs every time.
+        self.reconcile_rates(task)
+        self.merge_duplicates(task)
+        # Previews bypass the output cache, so their edits must stay pending for the next render.
+        if not keep_dirty:
+            self.dirty_nodes.clear()
+        return task
+
+    def _mark_plan_dirty(self, task, node_tags):
+        # Plan-time changes have to outlive this task: a preview build keeps self.dirty_nodes for the
+        # next render, which would otherwise find nothing changed and reuse stale cached outputs.
+        task['dirty_nodes'].update(node_tags)
+        self.dirty_nodes.update(node_tags)
+
+    def reconcile_rates(self, task):
+        nodes_map = task['nodes_map']
+        link_map = task['link_map_by_tag']
+        rates = {}
+        insertions = []
+        for node_tag in task['sorted_nodes']:
+            node = nodes_map[node_tag]
+            # Only linked inputs are passed, with None for rates that depend on data, such as sample files.
+            input_rates = {input_name: rates.get(link_map[attr_tag])
+                           for input_name, attr_tag in node.input_attr_map.items() if attr_tag in link_map}
+            required_rate = node.required_input_rate(input_rates)
+            if required_rate is not None:
+                for input_name, attr_tag in node.input_attr_map.items():
+                    # Unknown rates get a resampler too; it passes audio through untouched if the rate already matches.
+                    if attr_tag in link_map:
+                        insertions.append((node_tag, attr_tag, required_rate))
+                        input_rates[input_name] = required_rate
+            output_rate = node.output_rate(input_rates)
+            for attr_tag in node.output_attr_map.values():
+                rates[attr_tag] = output_rate
+
+        active = {}
+        if insertions:
+            task['sorted_nodes'] = list(task['sorted_nodes'])
+            task['link_map_by_tag'] = link_map = dict(link_map)
+            task['nodes_map'] = nodes_map = dict(nodes_map)
+            task['adj'] = adj = {node_tag: list(children) for node_tag, children in task['adj'].items()}
+            task['in_degree'] = in_degree = dict(task['in_degree'])
+
+        for dest_node, input_attr, rate in insertions:
+            resample_tag = f"auto_resample:{input_attr}"
+            resampler = self._auto_resamplers.get(resample_tag)
+            if resampler is None:
+                resampler = NODE_REGISTRY["utility/resample"](dpg_tag=resample_tag)
+                resampler.input_attr_map["audio_in"] = f"{resample_tag}.audio_in"
+                resampler.output_attr_map["audio_out"] = f"{resample_tag}.audio_out"
+                self._mark_plan_dirty(task, (resample_tag, dest_node))
+            if resampler.params["sample_rate"] != str(rate):
+                resampler.params["sample_rate"] = str(rate)
+                self._mark_plan_dirty(task, (resample_tag, dest_node))
+            active[resample_tag] = resampler
+
+            source_attr = link_map[input_attr]
+            source_node = self.node_lookup_by_attr[source_attr]
+            link_map[resampler.input_attr_map["audio_in"]] = source_attr
+            link_map[input_attr] = resampler.output_attr_map["audio_out"]
+            nodes_map[resample_tag] = resampler
+            # The original edge stays while other inputs of the destination still read from the source.
+            if not any(self.node_lookup_by_attr.get(link_map[attr_tag]) == source_node
+                       for attr_tag in nodes_map[dest_node].input_attr_map.values() if attr_tag in link_map):
+                adj[source_node].remove(dest_node)
+                in_degree[dest_node] -= 1
+            adj[source_node].append(resample_tag)
+            adj[resample_tag] = [dest_node]
+            in_degree[resample_tag] = 1
+            in_degree[dest_node] += 1
+            task['sorted_nodes'].insert(task['sorted_nodes'].index(dest_node), resample_tag)
+
+        self._auto_resamplers = active
+
+    def merge_duplicates(self, task):
+        nodes_map = task['nodes_map']
+        link_map = task['link_map_by_tag']
+        owners = {attr_tag: (node_tag, output_name) for node_tag, node in nodes_map.items()
+                  for output_name, attr_tag in node.output_attr_map.items()}
+
+        # A fingerprint covers the node type, its params and its inputs' fingerprints, so duplicated
+        # subgraphs collapse from their sources down. Impure nodes are fingerprinted by their own tag.
+        fingerprints = {}
+        canonical_by_fingerprint = {}
+        merged = {}
+        for node_tag in task['sorted_nodes']:
+            node = nodes_map[node_tag]
+            if not node.PURE:
+                fingerprints[node_tag] = repr(node_tag).encode()
+                continue
+            upstream = []
+            for input_name, attr_tag in sorted(node.input_attr_map.items()):
+                source_node, output_name = owners.get(link_map.get(attr_tag), (None, None))
+                upstream.append((input_name, fingerprints.get(source_node), output_name))
+            params = sorted((name, str(value)) for name, value in node.params.items())
+            fingerprint = hashlib.sha1(repr((node.NODE_TYPE, params, upstream)).encode()).digest()
+            fingerprints[node_tag] = fingerprint
+            canonical = canonical_by_fingerprint.setdefault(fingerprint, node_tag)
+            if canonical != node_tag:
+                merged[node_tag] = canonical
+
+        # Consumers of a node whose merge status changed now read a different output than the one they cached.
+        for node_tag in set(merged) | set(self._merged):
+            if merged.get(node_tag) != self._merged.get(node_tag):
+                self._mark_plan_dirty(task, task['adj'].get(node_tag, ()))
+        self._merged = merged
+        task['aliases'] = {}
+        if not merged:
+            return
+
+        aliases = task['aliases']
+        merged_inputs = set()
+        for alias_tag, canonical_tag in merged.items():
+            alias, canonical = nodes_map[alias_tag], nodes_map[canonical_tag]
+            for output_name, attr_tag in alias.output_attr_map.items():
+                aliases[attr_tag] = canonical.output_attr_map[output_name]
+            merged_inputs.update(alias.input_attr_map.values())
+
+        task['nodes_map'] = nodes_map = {node_tag: node for node_tag, node in nodes_map.items() if node_tag not in merged}
+        task['sorted_nodes'] = [node_tag for node_tag in task['sorted_nodes'] if node_tag not in merged]
+        task['link_map_by_tag'] = link_map = {attr_in: aliases.get(attr_out, attr_out) for attr_in, attr_out in link_map.items()
+                                              if attr_in not in merged_inputs}
+        adj = {node_tag: [] for node_tag in nodes_map}
+        in_degree = dict.fromkeys(nodes_map, 0)
+        for node_tag, node in nodes_map.items():
+            parents = {owners[link_map[attr_tag]][0] for attr_tag in node.input_attr_map.values() if attr_tag in link_map}
+            for parent in parents:
+                adj[parent].append(node_tag)
+                in_degree[node_tag] += 1
+        task['adj'] = adj
+        task['in_degree'] = in_degree
+        print(f"GraphManager: Merged {len(merged)} duplicate node(s)")
+
+    def process_graph(self, mode='offline'):
+        print("GraphManager: --- Preparing Graph Process Task ---")
+
+        task = self.build_task(mode)
+        if task is None:
+            return
+
+        print(f"GraphManager: Submitting task for execution order: {task['sorted_nodes']}")
+
+        self.audio_engine.submit(task)
+
+        print("GraphManager: --- Graph Process Submitted ---")
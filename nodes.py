@@ -1,18 +1,214 @@
 import abc
-from typing import Any, Dict, Callable, List, Tuple
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
-from scipy.io.wavfile import write as write_wav
+from audio_buffer import AudioBuffer
+
+MANIFEST_FORMAT_VERSION = 1
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".cache", "sin", "node_manifest.json")
+# Node implementations live in these modules, in menu order; *.py files in PLUGIN_DIR are added after them.
+BUILTIN_NODE_MODULES = ("generator_nodes", "output_nodes", "utility_nodes")
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugins")
+
+# Block value marking that an output will produce no further blocks in streaming mode.
+END_OF_STREAM = object()
+
+
+def describe_node(node_class) -> Dict[str, Any]:
+    attributes = node_class.get_attributes()
+    return {
+        "class": node_class.__name__,
+        "name": node_class.NODE_NAME,
+        "inputs": dict(attributes.get("inputs", {})),
+        "outputs": dict(attributes.get("outputs", {})),
+        "params": dict(node_class.get_parameters()),
+        "models": list(node_class.MODELS),
+        "run_out_of_process": bool(node_class.RUN_OUT_OF_PROCESS),
+    }
+
+
+def _module_stamp(module_name: str) -> Optional[List[Any]]:
+    try:
+        spec = importlib.util.find_spec(module_name)
+        stat = os.stat(spec.origin)
+    except (ImportError, AttributeError, TypeError, ValueError, OSError):
+        return None
+    return [spec.origin, stat.st_mtime_ns, stat.st_size]
+
+
+class NodeRegistry(Mapping):
+    # Node type -> class, importing each node module only when one of its classes is first needed.
+    # Until then, names, ports and default params come from describe_node() output cached in a
+    # manifest, keyed by each module's path, mtime and size, so menus and planning never import nodes.
+    def __init__(self, modules=(), manifest_path: str = DEFAULT_MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self._modules: List[str] = list(modules)
+        self._scanned = set()
+        self._classes: Dict[str, type] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._module_of: Dict[str, str] = {}
+        self._types_by_module: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+
+    def add_module(self, module_name: str):
+        with self._lock:
+            if module_name not in self._modules:
+                self._modules.append(module_name)
+
+    def add_plugin_directory(self, directory: str):
+        if not os.path.isdir(directory):
+            return
+        if directory not in sys.path:
+            # Also inherited by spawned worker processes, so they can import plugin nodes by module name.
+            sys.path.append(directory)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py") and not name.startswith("_"):
+                self.add_module(name[:-3])
+
+    def register(self, node_type: str, node_class):
+        with self._lock:
+            node_class.NODE_TYPE = node_type
+            module_name = node_class.__module__
+            self._classes[node_type] = node_class
+            self._info[node_type] = describe_node(node_class)
+            self._module_of[node_type] = module_name
+            types = self._types_by_module.setdefault(module_name, [])
+            if node_type not in types:
+                types.append(node_type)
+
+    def _import(self, module_name: str) -> bool:
+        try:
+            importlib.import_module(module_name)
+            return True
+        except Exception as e:
+            print(f"NodeRegistry: Failed to import node module {module_name}: {e}")
+            return False
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_FORMAT_VERSION:
+            return {}
+        return manifest.get("modules", {})
+
+    def _write_manifest(self, modules: Dict[str, Any]):
+        # Written to a temporary file and renamed, so concurrent readers never see a partial manifest.
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump({"version": MANIFEST_FORMAT_VERSION, "modules": modules}, f, indent=2)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as e:
+            print(f"NodeRegistry: Could not write node manifest {self.manifest_path}: {e}")
+
+    def _scan(self):
+        with self._lock:
+            pending = [module_name for module_name in self._modules if module_name not in self._scanned]
+            if not pending:
+                return
+            manifest = self._read_manifest()
+            changed = False
+            for module_name in pending:
+                self._scanned.add(module_name)
+                stamp = _module_stamp(module_name)
+                entry = manifest.get(module_name)
+                if stamp is not None and entry is not None and entry.get("stamp") == stamp:
+                    for node_type, info in entry["nodes"].items():
+                        if node_type not in self._info:
+                            self._info[node_type] = info
+                            self._module_of[node_type] = module_name
+                            self._types_by_module.setdefault(module_name, []).append(node_type)
+                    continue
+                # A new or edited module is imported once to describe it; later runs read the manifest.
+                if self._import(module_name):
+                    nodes = {node_type: self._info[node_type] for node_type in self._types_by_module.get(module_name, [])}
+                    manifest[module_name] = {"stamp": stamp, "nodes": nodes}
+                    changed = True
+            if changed:
+                self._write_manifest(manifest)
+
+    def info(self, node_type: str) -> Dict[str, Any]:
+        self._scan()
+        return self._info[node_type]
+
+    def __getitem__(self, node_type: str):
+        node_class = self._classes.get(node_type)
+        if node_class is not None:
+            return node_class
+        self._scan()
+        with self._lock:
+            module_name = self._module_of.get(node_type)
+            if module_name is not None and node_type not in self._classes:
+                self._import(module_name)
+            if node_type not in self._classes:
+                raise KeyError(node_type)
+            return self._classes[node_type]
+
+    def __contains__(self, node_type) -> bool:
+        self._scan()
+        return node_type in self._info
+
+    def __iter__(self) -> Iterator[str]:
+        self._scan()
+        with self._lock:
+            ordered = [node_type for module_name in self._modules for node_type in self._types_by_module.get(module_name, [])]
+            ordered += [node_type for node_type in self._info if node_type not in ordered]
+        return iter(ordered)
+
+    def __len__(self) -> int:
+        self._scan()
+        return len(self._info)
+
+
+NODE_REGISTRY = NodeRegistry(BUILTIN_NODE_MODULES)
+NODE_REGISTRY.add_plugin_directory(PLUGIN_DIR)
+
+
+def __getattr__(name: str):
+    # Node classes used to be defined here; importing one by name still works and loads its module.
+    # The import system probes dunders such as __path__ on every "from nodes import ...", and
+    # answering those must not scan the registry.
+    if name.startswith("__"):
+        raise AttributeError(f"module 'nodes' has no attribute '{name}'")
+    for node_type in NODE_REGISTRY:
+        if NODE_REGISTRY.info(node_type)["class"] == name:
+            return NODE_REGISTRY[node_type]
+    raise AttributeError(f"module 'nodes' has no attribute '{name}'")
 
-NODE_REGISTRY: Dict[str, 'BaseNode'] = {}
 
 def register_node(name: str):
     def decorator(cls):
-        NODE_REGISTRY[name] = cls
+        NODE_REGISTRY.register(name, cls)
         return cls
     return decorator
 
 class BaseNode(abc.ABC):
     NODE_NAME = "Base Node"
+    NODE_TYPE = None
+    # Heavy nodes can opt in to running inside a persistent worker process.
+    RUN_OUT_OF_PROCESS = False
+    # Names of models this node type may need; the engine preloads the ones a graph's nodes require.
+    MODELS: Tuple[str, ...] = ()
+    # Deterministic, side-effect free nodes: identical copies with identical inputs are computed once per render.
+    PURE = False
+    # Expensive nodes can opt in to the on-disk render cache; bump CACHE_VERSION whenever their output changes.
+    DISK_CACHEABLE = False
+    CACHE_VERSION = 1
+    # Params naming files the output is read from; render cache keys include each file's size and mtime.
+    FILE_PARAMS: Tuple[str, ...] = ()
+    # Params that change the node's ports; see port_attributes.
+    PORT_PARAMS: Tuple[str, ...] = ()
+    context = None
     
     def __init__(self, dpg_tag: int):
         self.dpg_tag = dpg_tag
@@ -30,141 +226,117 @@ class BaseNode(abc.ABC):
     def get_parameters() -> Dict[str, Any]:
         pass
 
+    def port_attributes(self) -> Dict[str, Any]:
+        # The ports this node has; nodes whose port count is a param override it.
+        return self.get_attributes()
+
     @abc.abstractmethod
     def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         pass
 
-@register_node("generator/audiocraft")
-class AudioCraftNode(BaseNode):
-    NODE_NAME = "AudioCraft"
-    _model = None
+    def runs_out_of_process(self) -> bool:
+        return self.RUN_OUT_OF_PROCESS
 
-    @staticmethod
-    def get_attributes() -> Dict[str, Any]:
-        return {
-            "inputs": {},
-            "outputs": {"audio_out": "audio"}
-        }
-
-    @staticmethod
-    def get_parameters() -> Dict[str, Any]:
-        return {
-            "prompt": "80s synth solo",
-            "duration_secs": "5"
-        }
+    # Rate planning: before each render GraphManager propagates sample rates from params and
+    # inserts resamplers wherever a node needs a rate its inputs may not have. None means unknown.
+    def output_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        # input_rates holds the linked inputs; any unknown rate leaves the output unknown too.
+        rates = set(input_rates.values())
+        return rates.pop() if len(rates) == 1 else None
 
-    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        print(f"Computing AudioCraftNode {self.dpg_tag}")
+    def required_input_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        return None
 
+    def _param_rate(self, param_name: str = "sample_rate") -> Optional[int]:
         try:
-            if AudioCraftNode._model is None:
-                print("AudioCraftNode: Loading model (first run)...")
-                #import torch
-                #from audiocraft.models import MusicGen
-                
-                #model = MusicGen.get_pretrained('facebook/audiocraft-small')
-                #AudioCraftNode._model = model
-                print("AudioCraftNode: Model loaded successfully.")
-
-            prompt = self.params.get("prompt", "default prompt")
-            duration = int(self.params.get("duration_secs", "5"))
-            
-            print(f"AudioCraftNode: Generating with prompt: {prompt}")
-            AudioCraftNode._model.set_generation_params(duration=duration)
-            
-            wav_tensors = AudioCraftNode._model.generate(descriptions=[prompt])
-            
-            audio_array = wav_tensors[0].cpu().numpy()
-            sample_rate = AudioCraftNode._model.sample_rate
-
-            print(f"AudioCraftNode: Generation complete.")
-            return {"audio_out": (audio_array, sample_rate)}
+            value = str(self.params.get(param_name, "")).strip()
+            return int(value) if value else None
+        except ValueError:
+            return None
 
-        except Exception as e:
-            print(f"AudioCraftNode: Error during compute: {e}")
-            return {"audio_out": None}
+    def required_models(self) -> List[str]:
+        return []
 
+    @classmethod
+    def load_model(cls, model_name: str) -> Any:
+        raise NotImplementedError(f"{cls.__name__} does not load models")
 
-@register_node("generator/osc")
-class OscNode(BaseNode):
-    NODE_NAME = "Oscillator"
+    def get_model(self, model_name: str) -> Any:
+        registry = self.context.models if self.context is not None else None
+        if registry is None:
+            from model_registry import process_registry
+            registry = process_registry()
+        return registry.get(model_name, lambda: type(self).load_model(model_name))
 
-    @staticmethod
-    def get_attributes() -> Dict[str, Any]:
-        return {
-            "inputs": {},
-            "outputs": {"audio_out": "audio"}
-        }
+    def check_cancelled(self):
+        # Long computes call this between chunks of work; it raises RenderCancelled once the render is superseded.
+        token = self.context.cancel_token if self.context is not None else None
+        if token is not None:
+            token.check()
 
-    @staticmethod
-    def get_parameters() -> Dict[str, Any]:
-        return {
-            "frequency": "440",
-            "duration_secs": "1",
-            "sample_rate": "44100"
-        }
+    def allocate(self, shape, dtype=np.float32) -> np.ndarray:
+        # Pooled arrays are recycled once the engine releases the output, so nodes must not keep them.
+        pool = self.context.buffer_pool if self.context is not None else None
+        if pool is None:
+            return np.empty(shape, dtype=dtype)
+        return pool.acquire(shape, dtype)
 
-    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        print(f"Computing OscNode {self.dpg_tag}")
-        try:
-            frequency = float(self.params.get("frequency", "440"))
-            duration_secs = float(self.params.get("duration_secs", "1"))
-            sample_rate = int(self.params.get("sample_rate", "44100"))
-            
-            t = np.linspace(0., duration_secs, int(sample_rate * duration_secs), endpoint=False)
-            sine_wave = (0.5 * np.sin(2. * np.pi * frequency * t)).astype(np.float32)
-
-            print(f"OscNode: Generated {duration_secs}s test tone at {frequency}Hz")
-            return {"audio_out": (sine_wave, sample_rate)}
-            
-        except Exception as e:
-            print(f"OscNode: Error computing test signal: {e}")
-            return {"audio_out": None}
+    def allocate_buffer(self, channels: int, frames: int, sample_rate: int) -> AudioBuffer:
+        pool = self.context.buffer_pool if self.context is not None else None
+        return AudioBuffer.allocate(channels, frames, sample_rate, pool)
 
-@register_node("output/file_out")
-class FileOutNode(BaseNode):
-    NODE_NAME = "File Out"
+    # Nodes may define a classmethod compute_batch(nodes, inputs_list) -> outputs_list
+    # so the engine can compute several ready nodes of the same class in one call.
+    compute_batch = None
 
-    @staticmethod
-    def get_attributes() -> Dict[str, Any]:
-        return {
-            "inputs": {"audio_in": "audio"},
-            "outputs": {}
-        }
-    
-    @staticmethod
-    def get_parameters() -> Dict[str, Any]:
-        return {"filename": "output.wav"}
+    def begin_stream(self, block_size: int):
+        self.block_size = block_size
+        self._buffered_inputs: Dict[str, List[AudioBuffer]] = {}
+        self._buffered_outputs = None
+        self._stream_position = 0
 
-    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        print(f"Computing FileOutNode {self.dpg_tag}")
-        input_value = inputs.get("audio_in")
-        
-        if input_value is None:
-            print(f"FileOutNode: No input received.")
-            return {}
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        # Fallback for nodes without native block support: gather the whole input
+        # streams, compute once, then hand the result downstream block by block.
+        output_names = self.port_attributes().get("outputs", {})
 
-        try:
-            if not isinstance(input_value, tuple) or len(input_value) != 2:
-                print(f"FileOutNode: Error - Input must be a (array, rate) tuple.")
-                return {}
-                
-            audio_array, sample_rate = input_value
-            
-            if not isinstance(audio_array, np.ndarray):
-                print(f"FileOutNode: Error - Audio data is not a numpy array.")
-                return {}
-
-            if not isinstance(sample_rate, int):
-                print(f"FileOutNode: Error - Sample rate is not an integer.")
-                return {}
-
-            filename = self.params.get("filename", "error.wav")
-            
-            write_wav(filename, sample_rate, audio_array)
-            print(f"FileOutNode: Saved audio to {filename} with rate {sample_rate}")
-        
-        except Exception as e:
-            print(f"FileOutNode: Failed to write file: {e}")
+        if self._buffered_outputs is None:
+            pending = False
+            for input_name, value in inputs.items():
+                if value is END_OF_STREAM:
+                    continue
+                pending = True
+                if value is not None:
+                    self._buffered_inputs.setdefault(input_name, []).append(value)
+            if pending:
+                return {output_name: None for output_name in output_names}
+
+            whole_inputs = {}
+            for input_name in inputs:
+                blocks = self._buffered_inputs.get(input_name)
+                if blocks:
+                    whole_inputs[input_name] = AudioBuffer(np.concatenate([block.data for block in blocks], axis=1),
+                                                           blocks[0].sample_rate)
+                else:
+                    whole_inputs[input_name] = None
+            self._buffered_inputs = {}
+            self._buffered_outputs = self.compute(whole_inputs)
+            missing = [output_name for output_name in output_names if self._buffered_outputs.get(output_name) is None]
+            if missing:
+                # Streams treat None as "nothing yet", so a compute that gave up has to fail loudly here.
+                raise RuntimeError(f"{self.NODE_NAME} produced no {', '.join(missing)}")
+
+        start = self._stream_position
+        self._stream_position += self.block_size
+        outputs = {}
+        for output_name in output_names:
+            value = self._buffered_outputs.get(output_name)
+            if isinstance(value, AudioBuffer) and start < value.frames:
+                outputs[output_name] = value.slice(start, start + self.block_size)
+            else:
+                outputs[output_name] = END_OF_STREAM
+        return outputs
 
-        return {}
\ No newline at end of file
+    def end_stream(self):
+        self._buffered_inputs = {}
+        self._buffered_outputs = None
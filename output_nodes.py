@@ -0,0 +1,86 @@
+from typing import Any, Dict, Optional, Tuple
+from audio_buffer import AudioBuffer
+from nodes import BaseNode, END_OF_STREAM, register_node
+from wav_io import WavStreamWriter, write_wav_chunked
+
+@register_node("output/file_out")
+class FileOutNode(BaseNode):
+    NODE_NAME = "File Out"
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {"audio_in": "audio"},
+            "outputs": {}
+        }
+    
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        return {
+            "filename": "output.wav",
+            "format": "float32",
+            "dither": "none",
+            "sample_rate": ""
+        }
+
+    def required_input_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        # Empty keeps whatever rate arrives; a value makes the planner resample the input to it.
+        return self._param_rate()
+
+    def _read_format(self) -> Tuple[str, str]:
+        sample_format = self.params.get("format", "float32").strip().lower()
+        dither = self.params.get("dither", "none").strip().lower()
+        return sample_format, dither
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing FileOutNode {self.dpg_tag}")
+        input_value = inputs.get("audio_in")
+        
+        if input_value is None:
+            print(f"FileOutNode: No input received.")
+            return {}
+
+        try:
+            if not isinstance(input_value, AudioBuffer):
+                raise TypeError("input must be an AudioBuffer")
+
+            filename = self.params.get("filename", "error.wav")
+            sample_format, dither = self._read_format()
+            
+            write_wav_chunked(filename, input_value.interleaved(), input_value.sample_rate, sample_format, dither,
+                              on_chunk=self.check_cancelled)
+            print(f"FileOutNode: Saved {sample_format} audio to {filename} with rate {input_value.sample_rate}")
+        
+        except Exception as e:
+            print(f"FileOutNode: Failed to write file: {e}")
+            raise
+
+        return {}
+
+    def begin_stream(self, block_size: int):
+        super().begin_stream(block_size)
+        self._writer = None
+
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        input_value = inputs.get("audio_in")
+
+        if input_value is END_OF_STREAM:
+            self.end_stream()
+            return {}
+        if input_value is None:
+            return {}
+
+        if self._writer is None:
+            filename = self.params.get("filename", "error.wav")
+            sample_format, dither = self._read_format()
+            self._writer = WavStreamWriter(filename, input_value.sample_rate, input_value.channels, sample_format, dither)
+
+        self._writer.write(input_value.interleaved())
+        return {}
+
+    def end_stream(self):
+        super().end_stream()
+        if self._writer is not None:
+            self._writer.close()
+            print(f"FileOutNode: Streamed {self._writer.frames_written} frames to {self._writer.filename}")
+            self._writer = None
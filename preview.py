@@ -0,0 +1,308 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+from audio_buffer import AudioBuffer
+from render_context import CancelToken, RenderCancelled
+
+
+class RingBuffer:
+    # Single producer, single consumer. Each side only ever advances its own
+    # position, so neither needs a lock; the positions grow without wrapping.
+    def __init__(self, capacity: int, channels: int):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((capacity, channels), dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def available(self) -> int:
+        return self.write_pos - self.read_pos
+
+    def free(self) -> int:
+        return self.capacity - self.available()
+
+    def write(self, block: np.ndarray) -> int:
+        if block.ndim == 1:
+            block = block[:, None]
+        frames = min(len(block), self.free())
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.data[start:start + first] = block[:first]
+        self.data[:frames - first] = block[first:frames]
+        self.write_pos += frames
+        return frames
+
+    def read(self, out: np.ndarray) -> int:
+        frames = min(len(out), self.available())
+        start = self.read_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:frames] = self.data[:frames - first]
+        self.read_pos += frames
+        return frames
+
+
+def _upstream_nodes(task: Dict[str, Any], node_tag) -> set:
+    parents = {}
+    for parent, children in task.get('adj', {}).items():
+        for child in children:
+            parents.setdefault(child, []).append(parent)
+    upstream = {node_tag}
+    pending = [node_tag]
+    while pending:
+        for parent in parents.get(pending.pop(), ()):
+            if parent not in upstream:
+                upstream.add(parent)
+                pending.append(parent)
+    return upstream
+
+
+def find_preview_output(task: Dict[str, Any]) -> Optional[int]:
+    # Previews tap whatever feeds the first sink, or the last output in the graph if there is no sink.
+    nodes_map = task['nodes_map']
+    for node_tag in task['sorted_nodes']:
+        node = nodes_map[node_tag]
+        if not node.output_attr_map:
+            for input_tag in node.input_attr_map.values():
+                if input_tag in task['link_map_by_tag']:
+                    return task['link_map_by_tag'][input_tag]
+    for node_tag in reversed(task['sorted_nodes']):
+        for output_tag in nodes_map[node_tag].output_attr_map.values():
+            return output_tag
+    return None
+
+
+class PreviewRenderer:
+    def __init__(self, engine, task: Dict[str, Any], output_tag: int = None, latency_ms: float = 50.0,
+                 block_size: int = None):
+        self.engine = engine
+        if output_tag is None:
+            output_tag = find_preview_output(task)
+            if output_tag is None:
+                raise ValueError("Graph has no audio output to preview")
+        # A merged node's outputs are published under the node it was merged into.
+        self.output_tag = task.get('aliases', {}).get(output_tag, output_tag)
+        self.latency_ms = latency_ms
+        self.block_size = block_size or engine.block_size
+        self.sample_rate = None
+        self.ring: Optional[RingBuffer] = None
+        self.finished = False
+        self.error = None
+        self.underruns = 0
+        self.underrun_frames = 0
+        self.frames_rendered = 0
+        self.frames_played = 0
+
+        # Only the nodes the tapped output depends on are run; sinks would otherwise write files while previewing.
+        source_node = next((node_tag for node_tag, node in task['nodes_map'].items()
+                            if self.output_tag in node.output_attr_map.values()), None)
+        if source_node is None:
+            raise ValueError(f"Output {output_tag} is not in the graph")
+        upstream = _upstream_nodes(task, source_node)
+        self.task = dict(task)
+        self.task['sorted_nodes'] = [node_tag for node_tag in task['sorted_nodes'] if node_tag in upstream]
+        self.task['block_size'] = self.block_size
+
+        self._cancel_token = CancelToken()
+        self._ready = threading.Event()
+        self._data_event = threading.Event()
+        self._space_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._render, name="PreviewRenderer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._cancel_token.cancel()
+        self._space_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _target_frames(self) -> int:
+        return max(self.block_size, int(self.sample_rate * self.latency_ms / 1000.0))
+
+    def _render(self):
+        try:
+            for attribute_data_map in self.engine.iter_stream_blocks(self.task, cancel_token=self._cancel_token):
+                value = attribute_data_map.get(self.output_tag)
+                if not isinstance(value, AudioBuffer):
+                    continue
+                # Devices take interleaved frames, so the ring stores them that way.
+                block = value.interleaved()
+                if self.ring is None:
+                    self.sample_rate = value.sample_rate
+                    self.ring = RingBuffer(self._target_frames() + self.block_size, value.channels)
+                    self._ready.set()
+
+                written = 0
+                while written < len(block):
+                    # Stay at most one latency target ahead of the reader.
+                    while self.ring.available() >= self._target_frames():
+                        self._space_event.wait(0.05)
+                        self._space_event.clear()
+                        self._cancel_token.check()
+                    written += self.ring.write(block[written:])
+                    self._data_event.set()
+                self.frames_rendered += len(block)
+        except RenderCancelled:
+            pass
+        except Exception as e:
+            print(f"PreviewRenderer: Error rendering preview: {e}")
+            self.error = e
+        finally:
+            self.finished = True
+            self._ready.set()
+            self._data_event.set()
+
+    def pull(self, frames: int, block: bool = False, timeout: float = None) -> np.ndarray:
+        channels = self.ring.channels if self.ring is not None else 1
+        out = np.zeros((frames, channels), dtype=np.float32)
+        self.pull_into(out, block, timeout)
+        return out
+
+    def pull_into(self, out: np.ndarray, block: bool = False, timeout: float = None) -> int:
+        # Real-time consumers never wait; missing frames stay silent and count as an underrun.
+        if block:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.finished and (self.ring is None or self.ring.available() < len(out)):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._data_event.wait(0.05 if remaining is None else min(remaining, 0.05))
+                self._data_event.clear()
+
+        frames = self.ring.read(out) if self.ring is not None else 0
+        if frames < len(out):
+            out[frames:] = 0
+            if not self.finished:
+                self.underruns += 1
+                self.underrun_frames += len(out) - frames
+        self.frames_played += frames
+        self._space_event.set()
+        return frames
+
+    @property
+    def done(self) -> bool:
+        return self.finished and (self.ring is None or self.ring.available() == 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"frames_rendered": self.frames_rendered, "frames_played": self.frames_played,
+                "underruns": self.underruns, "underrun_frames": self.underrun_frames,
+                "buffered_frames": self.ring.available() if self.ring is not None else 0}
+
+
+class _PullSink:
+    def __init__(self, frames_per_pull: int = 512, realtime: bool = True):
+        self.frames_per_pull = frames_per_pull
+        self.realtime = realtime
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, renderer: PreviewRenderer):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(renderer,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, renderer: PreviewRenderer):
+        if not renderer.wait_ready(5.0) or renderer.ring is None:
+            return
+        period = self.frames_per_pull / renderer.sample_rate
+        next_pull = time.monotonic()
+        out = np.zeros((self.frames_per_pull, renderer.ring.channels), dtype=np.float32)
+        try:
+            while not self._stop.is_set() and not renderer.done:
+                # Without real-time pacing the sink waits for audio instead of underrunning.
+                frames = renderer.pull_into(out, block=not self.realtime)
+                # Underrun silence is what a device would play, but padding after the stream ends is not.
+                self.consume(out[:frames] if renderer.done else out, renderer.sample_rate)
+                if self.realtime:
+                    next_pull += period
+                    self._stop.wait(max(0.0, next_pull - time.monotonic()))
+        finally:
+            self.close()
+
+    def consume(self, frames: np.ndarray, sample_rate: int):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(_PullSink):
+    # Stands in for an audio device in tests: pulls at device pace and discards the audio.
+    pass
+
+
+class FileSink(_PullSink):
+    def __init__(self, filename: str, frames_per_pull: int = 512, realtime: bool = False):
+        super().__init__(frames_per_pull, realtime)
+        self.filename = filename
+        self._writer = None
+
+    def consume(self, frames: np.ndarray, sample_rate: int):
+        from wav_io import WavStreamWriter
+
+        if self._writer is None:
+            self._writer = WavStreamWriter(self.filename, sample_rate, frames.shape[1])
+        self._writer.write(frames)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class DeviceSink:
+    def __init__(self, frames_per_pull: int = 512):
+        self.frames_per_pull = frames_per_pull
+        self._stream = None
+        self._thread = None
+
+    def start(self, renderer: PreviewRenderer):
+        # The stream can only be opened once the first block has fixed the rate and channel count.
+        self._thread = threading.Thread(target=self._open, args=(renderer,), daemon=True)
+        self._thread.start()
+
+    def _open(self, renderer: PreviewRenderer):
+        import sounddevice
+
+        if not renderer.wait_ready(5.0) or renderer.ring is None:
+            return
+
+        def callback(outdata, frames, time_info, status):
+            renderer.pull_into(outdata)
+
+        self._stream = sounddevice.OutputStream(samplerate=renderer.sample_rate, channels=renderer.ring.channels,
+                                                dtype="float32", blocksize=self.frames_per_pull, callback=callback)
+        self._stream.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def default_sink():
+    try:
+        import sounddevice  # noqa: F401
+        return DeviceSink()
+    except ImportError:
+        print("PreviewRenderer: sounddevice not installed, previewing to a null sink.")
+        return NullSink()
@@ -0,0 +1,288 @@
+import multiprocessing as mp
+import queue
+import threading
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from audio_buffer import AudioBuffer
+from render_context import RenderContext
+
+_pending_close: List[shared_memory.SharedMemory] = []
+_pending_close_lock = threading.Lock()
+
+
+def _close_later(shm: shared_memory.SharedMemory):
+    # Runs while the dying array still holds its buffer export, so closing has to wait.
+    with _pending_close_lock:
+        _pending_close.append(shm)
+
+
+def close_pending_segments():
+    with _pending_close_lock:
+        still_open = []
+        for shm in _pending_close:
+            try:
+                shm.close()
+            except BufferError:
+                still_open.append(shm)
+        _pending_close[:] = still_open
+
+
+def share_array(array: np.ndarray) -> Tuple[Dict[str, Any], shared_memory.SharedMemory]:
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[...] = array
+    del shared
+    return {"name": shm.name, "shape": array.shape, "dtype": array.dtype.str}, shm
+
+
+def attach_array(descriptor: Dict[str, Any], unlink: bool = False) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    if unlink:
+        # The mapping stays valid after unlinking; only the name is released.
+        shm.unlink()
+    array = np.ndarray(descriptor["shape"], dtype=np.dtype(descriptor["dtype"]), buffer=shm.buf,
+                       offset=descriptor.get("offset", 0), strides=descriptor.get("strides"))
+    weakref.finalize(array, _close_later, shm)
+    return array
+
+
+class SharedMemoryPool:
+    # Buffer pool for worker processes. Every array it hands out lives in its own shared memory
+    # segment, so outputs nodes build with allocate() or allocate_buffer() reach the parent as is.
+    def __init__(self):
+        self._segments: Dict[int, Tuple[np.ndarray, shared_memory.SharedMemory]] = {}
+
+    def acquire(self, shape, dtype=np.float32) -> np.ndarray:
+        shape = tuple(shape) if isinstance(shape, (tuple, list)) else (int(shape),)
+        dtype = np.dtype(dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self._segments[id(array)] = (array, shm)
+        return array
+
+    def describe(self, array: np.ndarray) -> Optional[Tuple[Dict[str, Any], shared_memory.SharedMemory]]:
+        # Views of pooled arrays, such as a trimmed slice, are described by their offset into the segment.
+        view = array
+        while isinstance(array, np.ndarray):
+            entry = self._segments.get(id(array))
+            if entry is not None and entry[0] is array:
+                offset = view.__array_interface__["data"][0] - array.__array_interface__["data"][0]
+                return {"name": entry[1].name, "shape": view.shape, "dtype": view.dtype.str,
+                        "offset": offset, "strides": view.strides}, entry[1]
+            array = array.base
+        return None
+
+    def take_segments(self) -> List[shared_memory.SharedMemory]:
+        segments = [shm for _, shm in self._segments.values()]
+        self._segments = {}
+        return segments
+
+
+def _encode_values(values: Dict[str, Any], segments: List[shared_memory.SharedMemory],
+                   pool: SharedMemoryPool = None) -> Dict[str, Any]:
+    encoded = {}
+    for name, value in values.items():
+        if isinstance(value, AudioBuffer):
+            shared = pool.describe(value.data) if pool is not None else None
+            if shared is None:
+                shared = share_array(value.data)
+                segments.append(shared[1])
+            encoded[name] = ("shared_audio", shared[0], value.sample_rate)
+        else:
+            encoded[name] = value
+    return encoded
+
+
+def _decode_values(values: Dict[str, Any], unlink: bool) -> Dict[str, Any]:
+    decoded = {}
+    unlinked = set()
+    for name, value in values.items():
+        if isinstance(value, tuple) and len(value) == 3 and value[0] == "shared_audio":
+            # Several outputs can be views of one segment; its name is released once.
+            segment = value[1]["name"]
+            decoded[name] = AudioBuffer(attach_array(value[1], unlink=unlink and segment not in unlinked), value[2])
+            unlinked.add(segment)
+        else:
+            decoded[name] = value
+    return decoded
+
+
+def _worker_compute(message):
+    from nodes import NODE_REGISTRY
+
+    _, node_type, dpg_tag, params, encoded_inputs = message
+    segments = []
+    pool = SharedMemoryPool()
+    try:
+        node = NODE_REGISTRY[node_type](dpg_tag=dpg_tag)
+        node.params.update(params)
+        node.context = RenderContext(buffer_pool=pool)
+        outputs = node.compute(_decode_values(encoded_inputs, unlink=False))
+        reply = ("ok", _encode_values(outputs, segments, pool))
+    except Exception as e:
+        reply = ("error", f"{type(e).__name__}: {e}")
+    finally:
+        node = outputs = None
+    # Pooled segments the reply does not name are scratch space nobody else will unlink.
+    named = {value[1]["name"] for value in reply[1].values()
+             if isinstance(value, tuple) and len(value) == 3 and value[0] == "shared_audio"} if reply[0] == "ok" else set()
+    scratch = []
+    for shm in pool.take_segments():
+        if shm.name in named:
+            segments.append(shm)
+        else:
+            scratch.append(shm)
+    return reply, segments, scratch
+
+
+def _worker_model_command(message):
+    from nodes import NODE_REGISTRY
+    from model_registry import process_registry
+
+    command, node_type, model_name = message
+    try:
+        registry = process_registry()
+        if command == "load_model":
+            node_class = NODE_REGISTRY[node_type]
+            registry.get(model_name, lambda: node_class.load_model(model_name))
+        else:
+            registry.unload(model_name)
+        return ("ok", None)
+    except Exception as e:
+        return ("error", f"{type(e).__name__}: {e}")
+
+
+def _worker_main(conn):
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        segments = []
+        scratch = []
+        if message[0] == "compute":
+            reply, segments, scratch = _worker_compute(message)
+        else:
+            reply = _worker_model_command(message)
+
+        conn.send(reply)
+        # The parent attaches and unlinks the output segments; this process only drops its handles.
+        for shm in scratch:
+            shm.unlink()
+        for shm in segments + scratch:
+            try:
+                shm.close()
+            except BufferError:
+                _close_later(shm)
+        close_pending_segments()
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+
+class ProcessNodeBackend:
+    def __init__(self, num_workers: int = 1):
+        self.num_workers = num_workers
+        self._context = mp.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._broadcast_lock = threading.Lock()
+
+    def _acquire_worker(self) -> _Worker:
+        while True:
+            with self._lock:
+                try:
+                    return self._idle.get_nowait()
+                except queue.Empty:
+                    pass
+                if len(self._workers) < self.num_workers:
+                    worker = _Worker(self._context)
+                    self._workers.append(worker)
+                    print(f"ProcessNodeBackend: Started worker process {worker.process.pid}")
+                    return worker
+            # Re-check periodically in case a crashed worker freed a slot.
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _discard_worker(self, worker: _Worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if worker.process.is_alive():
+            worker.process.terminate()
+
+    def compute(self, node, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        close_pending_segments()
+        worker = self._acquire_worker()
+        segments = []
+        try:
+            encoded_inputs = _encode_values(inputs, segments)
+            worker.conn.send(("compute", node.NODE_TYPE, node.dpg_tag, dict(node.params), encoded_inputs))
+            status, payload = worker.conn.recv()
+        except Exception as e:
+            self._discard_worker(worker)
+            raise RuntimeError(f"Worker process for {node.NODE_TYPE} failed: {e}")
+        else:
+            self._idle.put(worker)
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+        if status == "error":
+            raise RuntimeError(payload)
+        return _decode_values(payload, unlink=True)
+
+    def broadcast(self, message):
+        # Holds every worker at once so each one receives the message exactly once.
+        with self._broadcast_lock:
+            held = [self._acquire_worker() for _ in range(self.num_workers)]
+            replies = []
+            try:
+                for worker in held:
+                    worker.conn.send(message)
+                for worker in held:
+                    replies.append(worker.conn.recv())
+            except Exception as e:
+                for worker in held:
+                    self._discard_worker(worker)
+                raise RuntimeError(f"Worker processes failed: {e}")
+            for worker in held:
+                self._idle.put(worker)
+
+        for status, payload in replies:
+            if status == "error":
+                raise RuntimeError(payload)
+
+    def load_model(self, node_type: str, model_name: str) -> str:
+        self.broadcast(("load_model", node_type, model_name))
+        return f"{model_name} in worker processes"
+
+    def unload_model(self, node_type: str, model_name: str):
+        self.broadcast(("unload_model", node_type, model_name))
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._idle = queue.Queue()
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+from audio_buffer import AudioBuffer
+
+
+def _count_audio(values: Dict[str, Any]):
+    total_bytes = 0
+    total_samples = 0
+    for value in (values or {}).values():
+        if isinstance(value, AudioBuffer):
+            total_bytes += value.nbytes
+            total_samples += value.data.size
+    return total_bytes, total_samples
+
+
+class NodeSpan:
+    __slots__ = ("node_tags", "node_type", "start", "wall", "cpu", "output_bytes", "samples",
+                 "peak_bytes", "thread_id", "failed")
+
+    def __init__(self, node_tags, node_type, start, thread_id):
+        self.node_tags = node_tags
+        self.node_type = node_type
+        self.start = start
+        self.thread_id = thread_id
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.output_bytes = 0
+        self.samples = 0
+        self.peak_bytes = None
+        self.failed = False
+
+
+class NodeProfiler:
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.spans: List[NodeSpan] = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self._lock = threading.Lock()
+        # tracemalloc peaks are process-wide, so memory profiling runs one node at a time to keep them attributable.
+        self._memory_lock = threading.Lock() if trace_memory else None
+        self._started_tracemalloc = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def call(self, node_tags: Sequence[int], node_type: str, inputs_list: Sequence[Dict[str, Any]],
+             fn: Callable, *args):
+        if self._memory_lock is not None:
+            self._memory_lock.acquire()
+        span = NodeSpan(tuple(node_tags), node_type, time.perf_counter(), threading.get_ident())
+        cpu_start = time.thread_time()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        results = None
+        try:
+            results = fn(*args)
+            return results
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            span.wall = time.perf_counter() - span.start
+            span.cpu = time.thread_time() - cpu_start
+            if self.trace_memory:
+                span.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - memory_start)
+                self._memory_lock.release()
+            if results is not None:
+                outputs_list = [results] if isinstance(results, dict) else results
+                for outputs, inputs in zip(outputs_list, inputs_list):
+                    output_bytes, output_samples = _count_audio(outputs)
+                    span.output_bytes += output_bytes
+                    # Sinks produce no audio, so their throughput is measured on what they consumed.
+                    span.samples += output_samples or _count_audio(inputs)[1]
+            with self._lock:
+                self.spans.append(span)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            share = 1.0 / len(span.node_tags)
+            for node_tag in span.node_tags:
+                row = rows.setdefault(node_tag, {"node_tag": node_tag, "node_type": span.node_type, "calls": 0,
+                                                 "wall": 0.0, "cpu": 0.0, "output_bytes": 0, "samples": 0,
+                                                 "peak_bytes": None, "failed": False})
+                # Batched computes are one call, so their cost is split evenly between the nodes.
+                row["calls"] += 1
+                row["wall"] += span.wall * share
+                row["cpu"] += span.cpu * share
+                row["output_bytes"] += int(span.output_bytes * share)
+                row["samples"] += int(span.samples * share)
+                row["failed"] = row["failed"] or span.failed
+                if span.peak_bytes is not None:
+                    row["peak_bytes"] = max(row["peak_bytes"] or 0, span.peak_bytes)
+        for row in rows.values():
+            row["samples_per_sec"] = row["samples"] / row["wall"] if row["wall"] > 0 else 0.0
+        return sorted(rows.values(), key=lambda row: row["wall"], reverse=True)
+
+    def format_summary(self) -> str:
+        lines = [f"{'Node':<28}{'Wall ms':>10}{'CPU ms':>10}{'Out MB':>9}{'Peak MB':>9}{'Msmp/s':>9}"]
+        for row in self.summary():
+            label = f"{row['node_type']} {row['node_tag']}"
+            peak = f"{row['peak_bytes'] / 1e6:.2f}" if row["peak_bytes"] is not None else "-"
+            lines.append(f"{label:<28}{row['wall'] * 1e3:>10.2f}"
+                         f"{row['cpu'] * 1e3:>10.2f}{row['output_bytes'] / 1e6:>9.2f}{peak:>9}"
+                         f"{row['samples_per_sec'] / 1e6:>9.2f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events = []
+        thread_ids = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            tid = thread_ids.setdefault(span.thread_id, len(thread_ids) + 1)
+            args = {"node_tags": list(span.node_tags), "cpu_ms": span.cpu * 1e3,
+                    "output_bytes": span.output_bytes, "samples": span.samples}
+            if span.peak_bytes is not None:
+                args["peak_bytes"] = span.peak_bytes
+            if span.failed:
+                args["failed"] = True
+            name = span.node_type if len(span.node_tags) == 1 else f"{span.node_type} x{len(span.node_tags)}"
+            events.append({"name": name, "cat": "node", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": (span.start - self.started) * 1e6, "dur": span.wall * 1e6, "args": args})
+        for thread_id, tid in thread_ids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": f"Worker {tid}"}})
+        if self.finished is not None:
+            events.append({"name": "Render", "cat": "graph", "ph": "X", "pid": pid, "tid": 0, "ts": 0,
+                           "dur": (self.finished - self.started) * 1e6})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,122 @@
+import argparse
+import os
+import queue
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from audio_engine import AudioEngine
+from node_graph import GraphManager
+from render_cache import DEFAULT_CACHE_DIR, RenderCache
+import graph_io
+import sweep
+
+
+def collect_graph_files(paths: List[str]) -> List[str]:
+    graph_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json") and not name.endswith(".trace.json"):
+                    graph_files.append(os.path.join(path, name))
+        else:
+            graph_files.append(path)
+    return graph_files
+
+
+def render_graph_file(path: str, mode: str = 'offline', block_size: int = 4096, threads: int = None,
+                      profile: bool = False, cache_dir: str = None,
+                      variants: List[sweep.Variant] = None) -> Tuple[str, bool, str]:
+    render_cache = RenderCache(cache_dir) if cache_dir else None
+    audio_engine = AudioEngine(queue.Queue(), max_workers=threads, block_size=block_size, retain_outputs=False,
+                               render_cache=render_cache)
+    audio_engine.set_profiling(profile)
+    try:
+        graph_manager = GraphManager(audio_engine)
+        data = graph_io.read_graph_file(path)
+        trace_path = os.path.splitext(path)[0] + ".trace.json"
+        if variants is not None:
+            data = sweep.expand_graph(data, variants)
+            trace_path = os.path.splitext(path)[0] + f".v{variants[0][0]:03d}.trace.json"
+        graph_io.populate_graph(data, graph_manager)
+
+        task = graph_manager.build_task(mode)
+        if task is None:
+            return path, False, "Error: Cycle detected in graph."
+
+        result = audio_engine.execute_graph_task(task)
+        if audio_engine.last_profile is not None:
+            audio_engine.last_profile.export_chrome_trace(trace_path)
+            print(f"Render: Profile for {path} (trace written to {trace_path})\n{audio_engine.last_profile.format_summary()}")
+        return path, not result.startswith("Error"), result
+    except Exception as e:
+        return path, False, f"Error: {e}"
+    finally:
+        audio_engine.shutdown_executor()
+        audio_engine.process_backend.shutdown()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render SIN graph files without the GUI.")
+    parser.add_argument("paths", nargs="+", help="Graph JSON files or directories containing them.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of graphs rendered in parallel processes.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Engine thread pool size per graph (defaults to the CPU count).")
+    parser.add_argument("--stream", action="store_true", help="Render in fixed-size blocks.")
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-node timings and write a Chrome trace next to each graph file.")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NODE.PARAM=VALUES",
+                        help="Render one variant per value, e.g. osc.frequency=110,220,440 or osc.frequency=100:1000:10. "
+                             "Repeat for more parameters.")
+    parser.add_argument("--sweep-mode", choices=("grid", "zip"), default="grid",
+                        help="Combine sweep axes as a full grid or pair them up value by value.")
+    parser.add_argument("--render-cache", default=DEFAULT_CACHE_DIR,
+                        help="Directory of the on-disk render cache shared with the GUI and other renders.")
+    parser.add_argument("--no-render-cache", action="store_true", help="Recompute cacheable nodes every time.")
+    args = parser.parse_args(argv)
+
+    graph_files = collect_graph_files(args.paths)
+    if not graph_files:
+        print("Render: No graph files found.")
+        return 1
+
+    mode = 'stream' if args.stream else 'offline'
+    cache_dir = None if args.no_render_cache else args.render_cache
+    render_args = (mode, args.block_size, args.threads, args.profile, cache_dir)
+
+    jobs = [(path, None) for path in graph_files]
+    if args.sweep:
+        try:
+            axes = [sweep.parse_axis(text) for text in args.sweep]
+            variants = sweep.expand_variants(axes, args.sweep_mode)
+            for path in graph_files:
+                sweep.validate_axes(graph_io.read_graph_file(path), axes)
+        except (OSError, ValueError) as e:
+            print(f"Render: Invalid sweep: {e}")
+            return 1
+        for index, overrides in variants:
+            print(f"Render: {sweep.describe_variant(index, overrides)}")
+        # Each process renders its share of the variants as one combined graph.
+        chunks = sweep.chunk_variants(variants, max(1, args.workers // len(graph_files)))
+        jobs = [(path, chunk) for path in graph_files for chunk in chunks]
+
+    if len(jobs) == 1 or args.workers <= 1:
+        results = [render_graph_file(path, *render_args, variants=chunk) for path, chunk in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            futures = [pool.submit(render_graph_file, path, *render_args, variants=chunk) for path, chunk in jobs]
+            results = [future.result() for future in futures]
+
+    failures = 0
+    for path, ok, message in results:
+        print(f"Render: {path}: {message}")
+        failures += not ok
+
+    print(f"Render: {len(results) - failures}/{len(results)} graphs rendered successfully.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import numpy as np
+from audio_buffer import AudioBuffer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bump when the on-disk layout changes; nodes bump their own CACHE_VERSION when their output changes.
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sin", "renders")
+MANIFEST_NAME = "manifest.json"
+
+
+def _file_identity(path: str):
+    # A file rewritten in place keeps its path, so its size and mtime stand in for its contents.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def cache_keys(task: Dict[str, Any]) -> Dict[Any, Optional[str]]:
+    # Keys chain like the plan-time fingerprints: node type, code version, params, the files named
+    # in FILE_PARAMS and the keys of whatever feeds each input. Nodes that are neither pure nor disk
+    # cacheable get no key, and neither does anything downstream of them.
+    nodes_map = task['nodes_map']
+    link_map = task['link_map_by_tag']
+    owners = {attr_tag: (node_tag, output_name) for node_tag, node in nodes_map.items()
+              for output_name, attr_tag in node.output_attr_map.items()}
+
+    keys = {}
+    for node_tag in task['sorted_nodes']:
+        node = nodes_map[node_tag]
+        keys[node_tag] = None
+        if not (node.PURE or node.DISK_CACHEABLE):
+            continue
+        upstream = []
+        for input_name, attr_tag in sorted(node.input_attr_map.items()):
+            source_attr = link_map.get(attr_tag)
+            if source_attr is None:
+                upstream.append((input_name, None, None))
+                continue
+            source_node, output_name = owners[source_attr]
+            if keys[source_node] is None:
+                break
+            upstream.append((input_name, keys[source_node], output_name))
+        else:
+            params = sorted((name, str(value)) for name, value in node.params.items())
+            identity = (CACHE_FORMAT_VERSION, node.NODE_TYPE, node.CACHE_VERSION, params,
+                        [_file_identity(str(node.params.get(name, ""))) for name in node.FILE_PARAMS], upstream)
+            keys[node_tag] = hashlib.sha256(repr(identity).encode()).hexdigest()
+    return keys
+
+
+class RenderCache:
+    # Node outputs on disk, one directory per key holding a .npy file per output and a manifest.
+    # Entries are built in a temporary directory and renamed into place, so readers only ever see
+    # complete entries; publishing and eviction hold an flock so the GUI and headless renders can
+    # share one directory. Entry mtimes are the LRU order.
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 4 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._thread_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entry_path(key)
+        try:
+            with open(os.path.join(entry, MANIFEST_NAME), "r") as f:
+                manifest = json.load(f)
+            outputs = {}
+            for output_name, sample_rate in manifest["outputs"].items():
+                # Mapped read-only: pages are read on demand and shared with every other process using the entry.
+                data = np.load(os.path.join(entry, f"{output_name}.npy"), mmap_mode="r")
+                outputs[output_name] = AudioBuffer(data, sample_rate)
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            # Missing, evicted mid-read, or written by an incompatible version; all count as misses.
+            self.misses += 1
+            return None
+        self.hits += 1
+        return outputs
+
+    def store(self, key: str, outputs: Dict[str, Any]) -> bool:
+        if not outputs or not all(isinstance(value, AudioBuffer) for value in outputs.values()):
+            return False
+
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        try:
+            for output_name, value in outputs.items():
+                np.save(os.path.join(staging, f"{output_name}.npy"), np.ascontiguousarray(value.data))
+            with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+                json.dump({"outputs": {name: value.sample_rate for name, value in outputs.items()}}, f)
+
+            with self._locked():
+                try:
+                    os.rename(staging, self._entry_path(key))
+                except OSError:
+                    # Another process stored the same key first; its entry is just as good.
+                    return False
+                self._evict()
+            return True
+        except OSError as e:
+            print(f"RenderCache: Failed to store {key}: {e}")
+            return False
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+            except OSError:
+                continue
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # Processes still mapping an evicted entry keep their pages until they unmap.
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            print(f"RenderCache: Evicted {os.path.basename(path)} ({size / (1024 * 1024):.1f} MB)")
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        with self._locked():
+            for _, _, path in self._entries():
+                shutil.rmtree(path, ignore_errors=True)
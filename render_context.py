@@ -0,0 +1,30 @@
+import threading
+
+
+class RenderCancelled(BaseException):
+    # Derives from BaseException, like asyncio.CancelledError, so the broad
+    # "except Exception" handlers inside node computes do not swallow it.
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise RenderCancelled()
+
+
+class RenderContext:
+    def __init__(self, buffer_pool=None, models=None, cancel_token=None):
+        self.buffer_pool = buffer_pool
+        self.models = models
+        self.cancel_token = cancel_token
@@ -0,0 +1,117 @@
+import math
+from functools import lru_cache
+from typing import Tuple
+import numpy as np
+
+# Taps per phase when upsampling. Decimating narrows the cutoff, which widens the sinc by the same
+# factor, so taps_per_phase scales the count to keep the same number of lobes under the window.
+TAPS_PER_PHASE = 32
+KAISER_BETA = 8.6
+# Outputs computed per vectorized step; bounds the (channels, outputs, taps) gather temporary.
+CHUNK_OUTPUTS = 8192
+
+
+def rational_ratio(source_rate: int, target_rate: int) -> Tuple[int, int]:
+    divisor = math.gcd(int(source_rate), int(target_rate))
+    return int(target_rate) // divisor, int(source_rate) // divisor
+
+
+def taps_per_phase(up: int, down: int) -> int:
+    return TAPS_PER_PHASE * max(1, -(-down // up))
+
+
+@lru_cache(maxsize=32)
+def filter_bank(up: int, down: int, taps: int) -> np.ndarray:
+    # Kaiser-windowed sinc low-pass at the lower of the two Nyquist rates, split into
+    # `up` phases of `taps` taps. bank[p, k] = up * h[p + k * up].
+    length = up * taps
+    cutoff = 1.0 / max(up, down)
+    # Centred on a whole sample so the delay removed by Resampler is exact; the last tap stays zero.
+    centre = (length - 1) // 2
+    n = np.arange(length, dtype=np.float64)
+    window = np.zeros(length)
+    window[:2 * centre + 1] = np.kaiser(2 * centre + 1, KAISER_BETA)
+    prototype = cutoff * np.sinc(cutoff * (n - centre)) * window
+    bank = (up * prototype).reshape(taps, up).T
+    bank = np.ascontiguousarray(bank, dtype=np.float32)
+    bank.flags.writeable = False
+    return bank
+
+
+class Resampler:
+    # Streaming polyphase resampler over (channels, frames) float32 blocks. Output n is
+    # taken at upsampled position n * down + delay, so the filter's group delay is removed
+    # and block-by-block output matches a whole-buffer pass exactly.
+    def __init__(self, source_rate: int, target_rate: int, channels: int, taps: int = None):
+        self.source_rate = int(source_rate)
+        self.target_rate = int(target_rate)
+        self.channels = channels
+        self.up, self.down = rational_ratio(self.source_rate, self.target_rate)
+        self.taps = taps or taps_per_phase(self.up, self.down)
+        self.bank = filter_bank(self.up, self.down, self.taps)
+        self.delay = (self.up * self.taps - 1) // 2
+        # The last taps - 1 inputs, followed by inputs not yet fully consumed.
+        self._history = np.zeros((channels, self.taps - 1), dtype=np.float32)
+        self._history_start = -(self.taps - 1)
+        self._inputs_seen = 0
+        self._outputs_done = 0
+
+    def _expected_outputs(self) -> int:
+        return -(-self._inputs_seen * self.up // self.down)
+
+    def _produce(self, signal: np.ndarray, signal_start: int, available_until: int) -> np.ndarray:
+        # signal holds inputs [signal_start, available_until); produce every output whose window fits.
+        last_output = (available_until * self.up - self.delay - 1) // self.down
+        count = max(0, min(last_output + 1, self._expected_outputs()) - self._outputs_done)
+        out = np.empty((self.channels, count), dtype=np.float32)
+        k = np.arange(self.taps)
+        for start in range(0, count, CHUNK_OUTPUTS):
+            n = self._outputs_done + start + np.arange(min(CHUNK_OUTPUTS, count - start))
+            m = n * self.down + self.delay
+            base = m // self.up - signal_start
+            phase = m % self.up
+            # Windows run backwards in time from each output's newest input; indices before the signal are silent.
+            index = base[:, None] - k[None, :]
+            windows = signal[:, np.clip(index, 0, None)]
+            if index.min() < 0:
+                windows[:, index < 0] = 0.0
+            np.einsum('cnt,nt->cn', windows, self.bank[phase], out=out[:, start:start + len(n)])
+        self._outputs_done += count
+        return out
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        signal = np.concatenate([self._history, block], axis=1)
+        signal_start = self._history_start
+        self._inputs_seen += block.shape[1]
+        out = self._produce(signal, signal_start, self._inputs_seen)
+
+        # Keep only what later outputs can still reach.
+        next_base = (self._outputs_done * self.down + self.delay) // self.up
+        keep_from = max(signal_start, min(next_base - (self.taps - 1), self._inputs_seen))
+        self._history = signal[:, keep_from - signal_start:].copy()
+        self._history_start = keep_from
+        return out
+
+    def flush(self) -> np.ndarray:
+        # Pads the end with silence so the final outputs see a full window.
+        pad_frames = self.delay // self.up + self.taps + 1
+        signal = np.concatenate([self._history, np.zeros((self.channels, pad_frames), dtype=np.float32)], axis=1)
+        return self._produce(signal, self._history_start, self._inputs_seen + pad_frames)
+
+
+def resample_array(data: np.ndarray, source_rate: int, target_rate: int, chunk_frames: int = 65536) -> np.ndarray:
+    # Whole-buffer resampling for (channels, frames) data, fed in chunks so temporaries stay bounded.
+    if int(source_rate) == int(target_rate):
+        return data
+    resampler = Resampler(source_rate, target_rate, data.shape[0])
+    expected = -(-data.shape[1] * resampler.up // resampler.down)
+    out = np.empty((data.shape[0], expected), dtype=np.float32)
+    written = 0
+    for start in range(0, data.shape[1], chunk_frames):
+        produced = resampler.process(data[:, start:start + chunk_frames])
+        out[:, written:written + produced.shape[1]] = produced
+        written += produced.shape[1]
+    tail = resampler.flush()
+    out[:, written:written + tail.shape[1]] = tail
+    return out
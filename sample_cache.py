@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import numpy as np
+from audio_buffer import AudioBuffer
+from resample import resample_array
+
+UNCOMPRESSED_EXTENSIONS = (".wav", ".wave")
+
+
+class SampleCache:
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+# Shared by every sample loader in the process so identical files are decoded once.
+SAMPLE_CACHE = SampleCache()
+
+
+def _int_to_float(data: np.ndarray) -> np.ndarray:
+    if data.dtype.kind == 'f':
+        return data.astype(np.float32, copy=False)
+    if data.dtype.kind == 'u':
+        half = float(2 ** (data.dtype.itemsize * 8 - 1))
+        return ((data.astype(np.float32) - half) / half)
+    return data.astype(np.float32) / float(2 ** (data.dtype.itemsize * 8 - 1))
+
+
+def _read_wav(path: str) -> Tuple[np.ndarray, int]:
+    from scipy.io import wavfile
+
+    try:
+        sample_rate, data = wavfile.read(path, mmap=True)
+    except ValueError:
+        # 24-bit PCM cannot be memory-mapped by scipy, so it is decoded instead.
+        sample_rate, data = wavfile.read(path)
+        return _int_to_float(data), sample_rate
+
+    if data.dtype == np.float32:
+        return data, sample_rate
+    return _int_to_float(data), sample_rate
+
+
+def _decode_compressed(path: str) -> Tuple[np.ndarray, int]:
+    try:
+        import librosa
+    except ImportError:
+        raise ImportError(f"librosa is required to decode '{os.path.basename(path)}'")
+
+    data, sample_rate = librosa.load(path, sr=None, mono=False)
+    if data.ndim == 2:
+        data = data.T
+    return np.ascontiguousarray(data, dtype=np.float32), int(sample_rate)
+
+
+def load_sample(path: str, target_rate: Optional[int] = None, cache: SampleCache = SAMPLE_CACHE) -> AudioBuffer:
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, target_rate)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    if path.lower().endswith(UNCOMPRESSED_EXTENSIONS):
+        data, sample_rate = _read_wav(path)
+    else:
+        data, sample_rate = _decode_compressed(path)
+
+    # Mono files map straight onto a one-channel buffer; multichannel files are
+    # interleaved on disk, so putting them in channel-first order costs one copy.
+    buffer = AudioBuffer.from_array(data, sample_rate)
+
+    if target_rate and target_rate != sample_rate:
+        buffer = AudioBuffer(resample_array(buffer.data, sample_rate, target_rate), target_rate)
+    # Cached buffers are shared by every consumer, so they are handed out read-only.
+    buffer.data.flags.writeable = False
+    # Mapped samples live in the page cache rather than the heap, but each one pins a mapping of its
+    # whole file, so they count toward the limit too; eviction is what closes mappings nobody uses.
+    cache.put(key, buffer, buffer.nbytes)
+    return buffer
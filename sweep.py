@@ -0,0 +1,96 @@
+import itertools
+import os
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from nodes import NODE_REGISTRY
+
+SweepAxis = Tuple[str, str, List[str]]
+Variant = Tuple[int, Dict[Tuple[str, str], str]]
+
+
+def parse_axis(text: str) -> SweepAxis:
+    # "node_id.param=a,b,c" lists values; "node_id.param=start:stop:count" spaces count values evenly.
+    target, _, values = text.partition("=")
+    node_id, _, param_name = target.strip().rpartition(".")
+    if not node_id or not param_name or not values:
+        raise ValueError(f"Sweep '{text}' must look like node_id.param=values")
+
+    points = _parse_range(values)
+    if points is not None:
+        return node_id, param_name, [f"{point:g}" for point in points]
+    return node_id, param_name, [value.strip() for value in values.split(",")]
+
+
+def _parse_range(values: str):
+    # Only all-numeric triples with a positive count are ranges; anything else, like a path or a
+    # time of day, is a literal value.
+    parts = values.split(":")
+    if len(parts) != 3:
+        return None
+    try:
+        start, stop, count = float(parts[0]), float(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+    return np.linspace(start, stop, count) if count > 0 else None
+
+
+def expand_variants(axes: List[SweepAxis], mode: str = "grid") -> List[Variant]:
+    keys = [(node_id, param_name) for node_id, param_name, _ in axes]
+    value_lists = [values for _, _, values in axes]
+    if mode == "zip":
+        if len({len(values) for values in value_lists}) > 1:
+            raise ValueError("Zipped sweeps need the same number of values on every axis")
+        combinations = zip(*value_lists)
+    elif mode == "grid":
+        combinations = itertools.product(*value_lists)
+    else:
+        raise ValueError(f"Unknown sweep mode '{mode}'")
+    return [(index, dict(zip(keys, combination))) for index, combination in enumerate(combinations)]
+
+
+def chunk_variants(variants: List[Variant], chunks: int) -> List[List[Variant]]:
+    chunks = max(1, min(chunks, len(variants)))
+    return [variants[start::chunks] for start in range(chunks)]
+
+
+def variant_filename(filename: str, index: int) -> str:
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}_v{index:03d}{extension}"
+
+
+def validate_axes(data: Dict[str, Any], axes: List[SweepAxis]):
+    node_types = {node_entry["id"]: node_entry["type"] for node_entry in data.get("nodes", [])}
+    for node_id, param_name, _ in axes:
+        if node_id not in node_types:
+            raise ValueError(f"Sweep refers to unknown node '{node_id}'")
+        if param_name not in NODE_REGISTRY.info(node_types[node_id])["params"]:
+            raise ValueError(f"Node '{node_id}' has no parameter '{param_name}'")
+
+
+def expand_graph(data: Dict[str, Any], variants: List[Variant]) -> Dict[str, Any]:
+    # Every variant becomes a copy of the graph inside one larger graph, so a single render covers
+    # them all: the engine batches same-class nodes such as OscNode into one stacked array, and
+    # plan-time merging computes the parts the variants share only once.
+    nodes = []
+    links = []
+    for index, overrides in variants:
+        prefix = f"v{index}/"
+        for node_entry in data.get("nodes", []):
+            params = dict(node_entry.get("params", {}))
+            for (node_id, param_name), value in overrides.items():
+                if node_id == node_entry["id"]:
+                    params[param_name] = value
+            # Sinks left on their default filename still need one per variant.
+            defaults = NODE_REGISTRY.info(node_entry["type"])["params"]
+            if "filename" in defaults:
+                params["filename"] = variant_filename(params.get("filename", defaults["filename"]), index)
+            nodes.append({"id": prefix + node_entry["id"], "type": node_entry["type"], "params": params})
+        for link_entry in data.get("links", []):
+            (out_id, out_port), (in_id, in_port) = link_entry["from"], link_entry["to"]
+            links.append({"from": [prefix + out_id, out_port], "to": [prefix + in_id, in_port]})
+    return {"version": data.get("version", 1), "nodes": nodes, "links": links}
+
+
+def describe_variant(index: int, overrides: Dict[Tuple[str, str], str]) -> str:
+    settings = ", ".join(f"{node_id}.{param_name}={value}" for (node_id, param_name), value in overrides.items())
+    return f"v{index:03d}: {settings}"
@@ -0,0 +1,65 @@
+import os
+import queue
+import sys
+import tempfile
+import pytest
+
+# The modules live flat in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keeps the suite from writing the node manifest into the user's cache directory. This has to
+# happen before anything else imports node modules, since the first registry scan writes it.
+import nodes
+MANIFEST_DIR = tempfile.TemporaryDirectory(prefix="sin-tests-")
+nodes.NODE_REGISTRY.manifest_path = os.path.join(MANIFEST_DIR.name, "node_manifest.json")
+
+from audio_engine import AudioEngine
+from node_graph import GraphManager
+import graph_io
+
+
+@pytest.fixture
+def engine():
+    audio_engine = AudioEngine(queue.Queue(), max_workers=2, preload_models=False)
+    yield audio_engine
+    audio_engine.shutdown_executor()
+    audio_engine.process_backend.shutdown()
+
+
+@pytest.fixture
+def graph(engine):
+    # Builds a GraphManager from graph-file style node and link lists; returns it with node tags by id.
+    def build(nodes, links=()):
+        graph_manager = GraphManager(engine)
+        data = {"version": 1, "nodes": nodes,
+                "links": [{"from": list(source), "to": list(dest)} for source, dest in links]}
+        return graph_manager, graph_io.populate_graph(data, graph_manager)
+    return build
+
+
+@pytest.fixture
+def stale_log(engine):
+    # Records the set of nodes each offline render recomputes.
+    log = []
+    collect = engine.collect_stale_nodes
+
+    def recording(sorted_nodes, adj):
+        stale = collect(sorted_nodes, adj)
+        log.append(set(stale))
+        return stale
+
+    engine.collect_stale_nodes = recording
+    return log
+
+
+def osc(node_id, frequency="220", sample_rate="44100", duration_secs="0.05"):
+    return {"id": node_id, "type": "generator/osc",
+            "params": {"frequency": frequency, "sample_rate": sample_rate, "duration_secs": duration_secs}}
+
+
+def file_out(node_id, path, sample_rate=""):
+    return {"id": node_id, "type": "output/file_out", "params": {"filename": str(path), "sample_rate": sample_rate}}
+
+
+def mixer(node_id, **params):
+    return {"id": node_id, "type": "utility/mixer", "params": params}
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+from audio_buffer import AudioBuffer
+from conftest import file_out, mixer, osc
+from nodes import BaseNode
+from render_cache import RenderCache
+
+
+def mixed_pair(graph, tmp_path):
+    return graph([osc("a"), osc("b", "330"), mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+                 [(("a", "audio_out"), ("mix", "audio_in_1")),
+                  (("b", "audio_out"), ("mix", "audio_in_2")),
+                  (("mix", "audio_out"), ("out", "audio_in"))])
+
+
+def test_only_dirty_nodes_and_their_descendants_rerender(graph, engine, stale_log, tmp_path):
+    graph_manager, tags = mixed_pair(graph, tmp_path)
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Graph processing finished")
+    assert stale_log[-1] == set(tags.values())
+
+    engine.execute_graph_task(graph_manager.build_task())
+    assert stale_log[-1] == set()
+
+    graph_manager.nodes[tags["b"]].params["frequency"] = "440"
+    graph_manager.mark_node_dirty(tags["b"])
+    engine.execute_graph_task(graph_manager.build_task())
+    assert stale_log[-1] == {tags["b"], tags["mix"], tags["out"]}
+
+
+def test_link_edits_dirty_the_destination(graph, engine, stale_log, tmp_path):
+    graph_manager, tags = mixed_pair(graph, tmp_path)
+    engine.execute_graph_task(graph_manager.build_task())
+
+    link_tag = next(link_tag for link_tag, (attr_out, _) in graph_manager.links.items()
+                    if attr_out == graph_manager.nodes[tags["b"]].output_attr_map["audio_out"])
+    graph_manager.on_link_removed(link_tag)
+    engine.execute_graph_task(graph_manager.build_task())
+    assert stale_log[-1] == {tags["mix"], tags["out"]}
+
+
+def test_removed_nodes_leave_the_output_cache(graph, engine, tmp_path):
+    graph_manager, tags = mixed_pair(graph, tmp_path)
+    engine.execute_graph_task(graph_manager.build_task())
+    assert tags["b"] in engine.output_cache
+
+    graph_manager.remove_node(tags["b"])
+    engine.execute_graph_task(graph_manager.build_task())
+    assert tags["b"] not in engine.output_cache
+
+
+def test_a_failed_render_recomputes_what_it_missed(graph, engine, stale_log, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "missing" / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Error:")
+
+    graph_manager.nodes[tags["out"]].params["filename"] = str(tmp_path / "a.wav")
+    graph_manager.mark_node_dirty(tags["out"])
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Graph processing finished")
+    assert stale_log[-1] == {tags["out"]}
+    assert (tmp_path / "a.wav").exists()
+
+
+class BatchNode(BaseNode):
+    NODE_TYPE = "test/batch"
+    DISK_CACHEABLE = True
+    batch_sizes = []
+    drop_last = False
+
+    @staticmethod
+    def get_attributes():
+        return {"inputs": {}, "outputs": {"audio_out": "audio"}}
+
+    @staticmethod
+    def get_parameters():
+        return {"value": "1"}
+
+    def compute(self, inputs):
+        return BatchNode.compute_batch([self], [inputs])[0]
+
+    @classmethod
+    def compute_batch(cls, nodes, inputs_list):
+        cls.batch_sizes.append(len(nodes))
+        results = [{"audio_out": AudioBuffer(np.full((1, 16), float(node.params["value"]), dtype=np.float32), 8000)}
+                   for node in nodes]
+        return results[:-1] if cls.drop_last else results
+
+
+@pytest.fixture
+def batch_task(monkeypatch):
+    monkeypatch.setattr(BatchNode, "batch_sizes", [])
+    nodes_map = {}
+    for node_tag in (1, 2, 3):
+        node = BatchNode(dpg_tag=node_tag)
+        node.params["value"] = str(node_tag)
+        node.output_attr_map["audio_out"] = f"{node_tag}.audio_out"
+        nodes_map[node_tag] = node
+    return {'type': 'process_graph', 'mode': 'offline', 'sorted_nodes': [1, 2, 3], 'link_map_by_tag': {},
+            'nodes_map': nodes_map, 'adj': {1: [], 2: [], 3: []}, 'dirty_nodes': {1, 2, 3}}
+
+
+def test_batches_are_profiled_and_stored_in_the_render_cache(engine, batch_task, tmp_path):
+    engine.render_cache = RenderCache(str(tmp_path))
+    engine.set_profiling(True)
+    assert engine.execute_graph_task(batch_task).startswith("Graph processing finished")
+    assert BatchNode.batch_sizes == [3]
+    assert {row["node_tag"] for row in engine.last_profile.summary()} == {1, 2, 3}
+    assert engine.output_cache[2]["audio_out"].data[0, 0] == 2.0
+
+    # A fresh session finds every node on disk and computes nothing.
+    engine.output_cache.clear()
+    assert engine.execute_graph_task(batch_task).startswith("Graph processing finished")
+    assert BatchNode.batch_sizes == [3]
+    assert engine.render_cache.hits == 3
+    assert engine.output_cache[3]["audio_out"].data[0, 0] == 3.0
+
+
+def test_short_batch_results_fail_the_render(engine, batch_task, monkeypatch):
+    monkeypatch.setattr(BatchNode, "drop_last", True)
+    assert engine.execute_graph_task(batch_task).startswith("Error:")
+    assert not engine.output_cache
+
+
+def root(array):
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def test_interactive_rerenders_recycle_the_outputs_they_replace(graph, engine, tmp_path):
+    graph_manager, tags = mixed_pair(graph, tmp_path)
+    engine.execute_graph_task(graph_manager.build_task())
+    recomputed = (tags["b"], tags["mix"])
+    old_arrays = {id(root(engine.output_cache[node_tag]["audio_out"].data)) for node_tag in recomputed}
+    clean_osc = engine.output_cache[tags["a"]]["audio_out"].data.copy()
+
+    graph_manager.nodes[tags["b"]].params["frequency"] = "440"
+    graph_manager.mark_node_dirty(tags["b"])
+    hits = engine.buffer_pool.hits
+    engine.execute_graph_task(graph_manager.build_task())
+    assert engine.buffer_pool.hits > hits
+    # The old mix buffer is reused. Old b is a row of the block a still holds, so it stays put.
+    new_arrays = {id(root(engine.output_cache[node_tag]["audio_out"].data)) for node_tag in recomputed}
+    assert new_arrays & old_arrays
+    np.testing.assert_array_equal(engine.output_cache[tags["a"]]["audio_out"].data, clean_osc)
+
+
+def test_views_held_by_cached_outputs_are_not_recycled(engine):
+    shared = engine.buffer_pool.acquire((2, 8))
+    engine.output_cache = {1: {"audio_out": AudioBuffer(shared[:1], 8000)}}
+    engine.recycle_outputs([{"audio_out": AudioBuffer(shared[1:], 8000)}])
+    assert engine.buffer_pool.pooled_bytes == 0
+
+    engine.output_cache = {}
+    engine.recycle_outputs([{"audio_out": AudioBuffer(shared[1:], 8000)}])
+    assert engine.buffer_pool.pooled_bytes == shared.nbytes
+
+
+def test_intermediates_return_to_the_pool_after_their_last_consumer(graph, engine, tmp_path):
+    engine.retain_outputs = False
+    graph_manager, _ = mixed_pair(graph, tmp_path)
+    engine.execute_graph_task(graph_manager.build_task())
+    assert engine.output_cache == {}
+    # The oscillator block and the mix both went back.
+    assert engine.buffer_pool.pooled_bytes == 3 * 2205 * 4
@@ -0,0 +1,109 @@
+import threading
+import numpy as np
+import pytest
+from audio_wire import AUDIO_HEADER, decode_audio, encode_audio
+
+audiocraft_server = pytest.importorskip("audiocraft_server")
+
+
+class RecordingModel(audiocraft_server.StubModel):
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.batches = []
+        self.fail_on = fail_on
+
+    def generate(self, descriptions):
+        self.batches.append((self.duration, list(descriptions)))
+        if self.fail_on in descriptions:
+            raise RuntimeError("generation failed")
+        return super().generate(descriptions)
+
+
+def submit_all(batcher, requests):
+    results = [None] * len(requests)
+
+    def run(index, prompt, duration):
+        try:
+            results[index] = batcher.submit(prompt, duration)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index, *request)) for index, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_audio_round_trips_through_the_wire_format():
+    stereo = np.random.default_rng(0).standard_normal((100, 2)).astype(np.float32)
+    payload = encode_audio(stereo, 32000)
+    assert len(payload) == AUDIO_HEADER.size + stereo.nbytes
+    decoded, sample_rate = decode_audio(payload)
+    assert sample_rate == 32000
+    np.testing.assert_array_equal(decoded, stereo)
+    mono, _ = decode_audio(encode_audio(stereo[:, 0], 32000))
+    assert mono.shape == (100,)
+
+
+def test_foreign_payloads_are_rejected():
+    with pytest.raises(ValueError):
+        decode_audio(b'RIFF' + bytes(AUDIO_HEADER.size))
+
+
+def test_concurrent_prompts_share_a_generation_per_duration():
+    model = RecordingModel()
+    batcher = audiocraft_server.GenerationBatcher(model, window_secs=0.2, max_batch=8)
+    results = submit_all(batcher, [("a", 0.1), ("b", 0.1), ("c", 0.2)])
+    assert sorted((duration, sorted(prompts)) for duration, prompts in model.batches) == \
+        [(0.1, ["a", "b"]), (0.2, ["c"])]
+    for (audio, sample_rate), duration in zip(results, (0.1, 0.1, 0.2)):
+        assert sample_rate == model.sample_rate
+        assert audio.shape == (int(model.sample_rate * duration), 1)
+    # Different prompts get their own audio, not a copy of the first.
+    assert not np.array_equal(results[0][0], results[1][0])
+
+
+def test_batches_are_capped():
+    model = RecordingModel()
+    batcher = audiocraft_server.GenerationBatcher(model, window_secs=0.2, max_batch=2)
+    submit_all(batcher, [(prompt, 0.05) for prompt in "abcde"])
+    assert max(len(prompts) for _, prompts in model.batches) <= 2
+    assert sum(len(prompts) for _, prompts in model.batches) == 5
+
+
+def test_a_failed_generation_fails_every_prompt_in_it():
+    model = RecordingModel(fail_on="bad")
+    batcher = audiocraft_server.GenerationBatcher(model, window_secs=0.2)
+    results = submit_all(batcher, [("bad", 0.05), ("good", 0.05), ("other", 0.1)])
+    assert isinstance(results[0], RuntimeError) and isinstance(results[1], RuntimeError)
+    assert results[2][0].shape[0] == int(model.sample_rate * 0.1)
+
+
+def test_generate_returns_binary_audio(monkeypatch):
+    monkeypatch.setattr(audiocraft_server, "batcher",
+                        audiocraft_server.GenerationBatcher(RecordingModel(fail_on="bad"), window_secs=0.0))
+    client = audiocraft_server.app.test_client()
+    response = client.post("/generate", json={"prompt": "tone", "duration_secs": 0.05})
+    assert response.status_code == 200 and response.mimetype == "application/octet-stream"
+    audio, sample_rate = decode_audio(response.data)
+    assert sample_rate == 32000 and audio.shape == (1600,)
+
+    response = client.post("/generate", json={"prompt": "bad", "duration_secs": 0.05})
+    assert response.status_code == 500 and response.get_json()["status"] == "error"
+
+
+def test_missing_audiocraft_exits_unless_stubbed(monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def no_audiocraft(name, *args, **kwargs):
+        if name.startswith("audiocraft.") or name == "audiocraft":
+            raise ImportError("No module named 'audiocraft'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_audiocraft)
+    with pytest.raises(SystemExit):
+        audiocraft_server.load_model("facebook/musicgen-small", use_stub=False)
+    assert isinstance(audiocraft_server.load_model("facebook/musicgen-small", use_stub=True), audiocraft_server.StubModel)
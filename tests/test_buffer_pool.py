@@ -0,0 +1,29 @@
+import numpy as np
+from buffer_pool import BufferPool
+
+
+def test_released_arrays_are_reused_by_shape_and_dtype():
+    pool = BufferPool()
+    array = pool.acquire((2, 64))
+    assert pool.release(array)
+    assert pool.acquire((2, 64), np.float64) is not array
+    assert pool.acquire((2, 64)) is array
+    assert (pool.hits, pool.misses) == (1, 2)
+
+
+def test_only_owned_arrays_are_taken_back_once():
+    pool = BufferPool()
+    assert not pool.release(np.empty((2, 64), dtype=np.float32))
+    array = pool.acquire(128)
+    assert pool.release(array)
+    assert not pool.release(array)
+    assert pool.pooled_bytes == array.nbytes
+
+
+def test_the_pool_stays_under_its_byte_limit():
+    pool = BufferPool(max_bytes=1024)
+    arrays = [pool.acquire(128) for _ in range(3)]
+    assert [pool.release(array) for array in arrays] == [True, True, False]
+    assert pool.pooled_bytes == 1024
+    pool.clear()
+    assert pool.pooled_bytes == 0
@@ -0,0 +1,78 @@
+import numpy as np
+from audio_buffer import AudioBuffer
+from conftest import file_out, osc
+from nodes import BaseNode
+
+
+class ToneNode(BaseNode):
+    NODE_TYPE = "test/tone"
+    cancel_on_compute = False
+
+    @staticmethod
+    def get_attributes():
+        return {"inputs": {"audio_in": "audio"}, "outputs": {"audio_out": "audio"}}
+
+    @staticmethod
+    def get_parameters():
+        return {}
+
+    def compute(self, inputs):
+        if self.cancel_on_compute:
+            # Stands in for a newer render arriving while this node is busy.
+            self.context.cancel_token.cancel()
+            self.check_cancelled()
+        return {"audio_out": AudioBuffer(np.zeros((1, 16), dtype=np.float32), 8000)}
+
+
+def chain_task(cancelling_tag=None):
+    nodes_map = {}
+    for node_tag in (1, 2, 3):
+        node = ToneNode(dpg_tag=node_tag)
+        node.cancel_on_compute = node_tag == cancelling_tag
+        node.output_attr_map["audio_out"] = f"{node_tag}.audio_out"
+        node.input_attr_map["audio_in"] = f"{node_tag}.audio_in"
+        nodes_map[node_tag] = node
+    return {'type': 'process_graph', 'mode': 'offline', 'sorted_nodes': [1, 2, 3], 'nodes_map': nodes_map,
+            'link_map_by_tag': {"2.audio_in": "1.audio_out", "3.audio_in": "2.audio_out"},
+            'adj': {1: [2], 2: [3], 3: []}, 'dirty_nodes': {1, 2, 3}}
+
+
+def test_superseded_tasks_are_coalesced(engine):
+    old_token = engine.cancel_token
+    engine.submit({'type': 'process_graph', 'dirty_nodes': {2}})
+    engine.submit({'type': 'process_graph', 'dirty_nodes': {3}})
+    assert old_token.cancelled
+
+    task = engine.take_latest_task({'type': 'process_graph', 'dirty_nodes': {1}})
+    assert task['dirty_nodes'] == {1, 2, 3}
+    assert engine.control_queue.empty()
+    # The next render gets a fresh token, shared with its nodes through the context.
+    assert not engine.cancel_token.cancelled
+    assert engine.context.cancel_token is engine.cancel_token
+
+
+def test_shutdown_keeps_the_dropped_edits(engine):
+    engine.control_queue.put(None)
+    assert engine.take_latest_task({'type': 'process_graph', 'dirty_nodes': {4}}) is None
+    assert 4 in engine.dirty_nodes
+
+
+def test_a_cancelled_render_stops_and_reruns_later(engine):
+    task = chain_task(cancelling_tag=2)
+    assert engine.execute_graph_task(task) == "Render cancelled."
+    assert 1 in engine.output_cache
+    assert 2 not in engine.output_cache and 3 not in engine.output_cache
+
+    task['nodes_map'][2].cancel_on_compute = False
+    engine.take_latest_task(task)
+    task['dirty_nodes'] = set()
+    assert engine.execute_graph_task(task).startswith("Graph processing finished")
+    assert set(engine.output_cache) == {1, 2, 3}
+
+
+def test_a_cancelled_stream_stops_between_blocks(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a", duration_secs="1.0"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    engine.cancel()
+    assert engine.stream_graph_task(graph_manager.build_task(mode='stream')) == "Render cancelled."
+    assert tags["a"] in engine.dirty_nodes
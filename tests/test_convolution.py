@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from scipy.io import wavfile
+from conftest import file_out, osc
+from convolution import PartitionedConvolver, convolve, ir_spectra
+
+
+@pytest.fixture
+def signals():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((2, 5000)).astype(np.float32), rng.standard_normal((1, 700)).astype(np.float32)
+
+
+def test_whole_buffer_matches_direct_convolution(signals):
+    data, ir = signals
+    out = convolve(data, ir_spectra(ir, 256), ir.shape[1], chunk_frames=1000)
+    assert out.shape == (2, data.shape[1] + ir.shape[1] - 1)
+    for row in range(2):
+        np.testing.assert_allclose(out[row], np.convolve(data[row], ir[0]), atol=1e-3)
+
+
+def test_blocks_of_any_size_match_the_whole_buffer(signals):
+    data, ir = signals
+    expected = convolve(data, ir_spectra(ir, 128), ir.shape[1], wet=0.5, dry=0.5)
+    convolver = PartitionedConvolver(ir_spectra(ir, 128), ir.shape[1], 2, wet=0.5, dry=0.5)
+    produced = [convolver.process(data[:, start:start + 300]) for start in range(0, data.shape[1], 300)]
+    produced.append(convolver.flush())
+    np.testing.assert_allclose(np.concatenate(produced, axis=1), expected, atol=1e-4)
+
+
+def test_mono_input_is_spread_over_a_stereo_response(signals):
+    data, ir = signals
+    stereo_ir = np.vstack([ir, -ir])
+    out = convolve(data[:1], ir_spectra(stereo_ir, 256), ir.shape[1])
+    assert out.shape[0] == 2
+    np.testing.assert_allclose(out[1], -out[0], atol=1e-5)
+
+
+def test_the_node_streams_like_it_renders(graph, engine, tmp_path):
+    ir_path = tmp_path / "ir.wav"
+    wavfile.write(ir_path, 44100, np.random.default_rng(1).standard_normal(300).astype(np.float32) * 0.1)
+    graph_manager, tags = graph([osc("a"), {"id": "verb", "type": "utility/convolver",
+                                           "params": {"ir_filepath": str(ir_path), "mix": "0.5"}},
+                                 file_out("out", tmp_path / "offline.wav")],
+                                [(("a", "audio_out"), ("verb", "audio_in")), (("verb", "audio_out"), ("out", "audio_in"))])
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Graph processing finished")
+    rate, offline = wavfile.read(tmp_path / "offline.wav")
+    assert len(offline) == 2205 + 300 - 1
+
+    graph_manager.nodes[tags["out"]].params["filename"] = str(tmp_path / "streamed.wav")
+    engine.block_size = 256
+    assert engine.stream_graph_task(graph_manager.build_task('stream')).startswith("Graph processing finished")
+    rate, streamed = wavfile.read(tmp_path / "streamed.wav")
+    np.testing.assert_allclose(streamed, offline, atol=1e-4)
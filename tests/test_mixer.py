@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+from audio_buffer import AudioBuffer
+from conftest import file_out, mixer, osc
+from nodes import END_OF_STREAM, NODE_REGISTRY
+
+
+def make_mixer(**params):
+    node = NODE_REGISTRY["utility/mixer"](dpg_tag=1)
+    node.params.update(params)
+    return node
+
+
+def tone(frames, sample_rate=44100, channels=1, value=None):
+    if value is not None:
+        return AudioBuffer(np.full((channels, frames), value, dtype=np.float32), sample_rate)
+    t = np.arange(frames) / sample_rate
+    data = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+    return AudioBuffer(np.tile(data, (channels, 1)), sample_rate)
+
+
+def stream(node, inputs, block_size):
+    # Feeds each input block by block, then END_OF_STREAM, and joins what the mixer emits.
+    node.begin_stream(block_size)
+    positions = {name: 0 for name in inputs}
+    blocks = []
+    for _ in range(10000):
+        block_inputs = {}
+        for name, audio in inputs.items():
+            if positions[name] < audio.frames:
+                block_inputs[name] = audio.slice(positions[name], positions[name] + block_size)
+                positions[name] += block_size
+            else:
+                block_inputs[name] = END_OF_STREAM
+        value = node.compute_block(block_inputs)["audio_out"]
+        if value is END_OF_STREAM:
+            break
+        if value is not None:
+            blocks.append(value)
+    node.end_stream()
+    return AudioBuffer(np.concatenate([block.data for block in blocks], axis=1), blocks[0].sample_rate)
+
+
+def test_gains_and_offsets_place_clips_on_a_timeline():
+    out = make_mixer(gains="0.5,2", offsets_secs="0,0.5").compute({"audio_in_1": tone(4, 4, value=1.0), "audio_in_2": tone(4, 4, value=1.0)})["audio_out"]
+    assert out.sample_rate == 4
+    np.testing.assert_allclose(out.data, [[0.5, 0.5, 2.5, 2.5, 2.0, 2.0]])
+
+
+def test_negative_offsets_trim_the_head_of_a_clip():
+    audio = AudioBuffer(np.arange(4, dtype=np.float32)[None, :], 4)
+    out = make_mixer(offsets_secs="-0.5").compute({"audio_in_1": audio})["audio_out"]
+    np.testing.assert_allclose(out.data, [[2.0, 3.0]])
+
+
+def test_pans_make_the_mix_stereo():
+    out = make_mixer(pans="-1,1").compute({"audio_in_1": tone(8, value=1.0), "audio_in_2": tone(8, value=0.5)})["audio_out"]
+    assert out.channels == 2
+    assert out.data[0, 0] > out.data[1, 0]
+    assert abs(out.data[0, 0] - 2 * out.data[1, 0]) < 1e-5
+
+
+def test_inputs_are_left_untouched():
+    audio = tone(16, value=1.0)
+    audio.data.flags.writeable = False
+    make_mixer(gains="0.5").compute({"audio_in_1": audio, "audio_in_2": tone(16, value=1.0)})
+    np.testing.assert_array_equal(audio.data, 1.0)
+
+
+def test_mismatched_rates_are_resampled_to_the_highest():
+    out = make_mixer().compute({"audio_in_1": tone(22050, 22050), "audio_in_2": tone(4410, 44100)})["audio_out"]
+    assert out.sample_rate == 44100
+    assert abs(out.frames - 44100) <= 1
+
+
+def test_sample_rate_param_pins_the_output_rate():
+    out = make_mixer(sample_rate="22050").compute({"audio_in_1": tone(44100, 44100)})["audio_out"]
+    assert out.sample_rate == 22050
+    assert abs(out.frames - 22050) <= 1
+
+
+def test_rate_hooks_leave_unknown_rates_to_compute():
+    node = make_mixer()
+    assert node.required_input_rate({"audio_in_1": 22050, "audio_in_2": 44100}) == 44100
+    assert node.required_input_rate({"audio_in_1": 44100, "audio_in_2": None}) is None
+    assert node.output_rate({"audio_in_1": 44100, "audio_in_2": None}) is None
+    assert make_mixer(sample_rate="48000").required_input_rate({"audio_in_1": None}) == 48000
+
+
+@pytest.mark.parametrize("block_size", [64, 1000])
+def test_streaming_matches_offline(block_size):
+    inputs = {"audio_in_1": tone(3000, channels=2), "audio_in_2": tone(1200, value=0.25)}
+    params = {"gains": "0.5,1", "pans": "0,0.3", "offsets_secs": "0,0.01"}
+    offline = make_mixer(**params).compute(inputs)["audio_out"]
+    streamed = stream(make_mixer(**params), inputs, block_size)
+    assert streamed.sample_rate == offline.sample_rate
+    np.testing.assert_allclose(streamed.data, offline.data, atol=1e-6)
+
+
+def test_streaming_resamples_mismatched_inputs_like_offline():
+    inputs = {"audio_in_1": tone(2205, 22050), "audio_in_2": tone(4410, 44100)}
+    offline = make_mixer().compute(inputs)["audio_out"]
+    streamed = stream(make_mixer(), inputs, 512)
+    assert streamed.sample_rate == 44100
+    np.testing.assert_allclose(streamed.data, offline.data, atol=1e-5)
+
+
+def test_a_failed_input_fails_the_render(graph, engine, tmp_path):
+    graph_manager, _ = graph([
+        {"id": "smp", "type": "generator/sample_loader", "params": {"filepath": str(tmp_path / "missing.wav")}},
+        mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+        [(("smp", "audio_out"), ("mix", "audio_in_1")), (("mix", "audio_out"), ("out", "audio_in"))])
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Error:")
+    assert not (tmp_path / "mix.wav").exists()
+
+
+def test_the_input_count_sets_the_ports(graph, engine, tmp_path):
+    stems = [osc(f"s{index}", frequency=str(100 + index)) for index in range(64)]
+    graph_manager, tags = graph(stems + [mixer("mix", inputs="64"), file_out("out", tmp_path / "mix.wav")],
+                                [((f"s{index}", "audio_out"), ("mix", f"audio_in_{index + 1}")) for index in range(64)] +
+                                [(("mix", "audio_out"), ("out", "audio_in"))])
+    assert len(graph_manager.nodes[tags["mix"]].input_attr_map) == 64
+    assert engine.execute_graph_task(graph_manager.build_task()).startswith("Graph processing finished")
+    expected = sum(engine.output_cache[tags[f"s{index}"]]["audio_out"].data for index in range(64))
+    np.testing.assert_allclose(engine.output_cache[tags["mix"]]["audio_out"].data, expected, atol=1e-4)
+
+
+def test_port_edits_drop_the_links_of_removed_ports(graph):
+    graph_manager, tags = graph([osc("a"), osc("b", "330"), mixer("mix", inputs="2")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("b", "audio_out"), ("mix", "audio_in_2"))])
+    counter = iter(range(1000, 2000))
+    node = graph_manager.nodes[tags["mix"]]
+    assert list(node.input_attr_map) == ["audio_in_1", "audio_in_2"]
+    assert not graph_manager.sync_ports(tags["mix"], lambda: next(counter))
+
+    node.params["inputs"] = "4"
+    assert graph_manager.sync_ports(tags["mix"], lambda: next(counter))
+    assert list(node.input_attr_map) == [f"audio_in_{index}" for index in range(1, 5)]
+    assert graph_manager.find_node_for_attribute(node.input_attr_map["audio_in_4"]) == tags["mix"]
+
+    node.params["inputs"] = "1"
+    graph_manager.dirty_nodes.clear()
+    assert graph_manager.sync_ports(tags["mix"], lambda: next(counter))
+    assert list(node.input_attr_map) == ["audio_in_1"]
+    assert len(graph_manager.links) == 1
+    assert list(graph_manager.children[tags["b"]]) == []
+    assert tags["mix"] in graph_manager.dirty_nodes
+    assert graph_manager.compile_plan()['adj'][tags["a"]] == [tags["mix"]]
+
+
+def test_streamed_blocks_are_not_copied_or_reused():
+    node = make_mixer()
+    node.begin_stream(64)
+    first = node.compute_block({"audio_in_1": tone(64, value=1.0)})["audio_out"]
+    second = node.compute_block({"audio_in_1": tone(64, value=2.0)})["audio_out"]
+    # Each block is a view of the accumulator it was summed in, and later mixing leaves it alone.
+    assert first.data.base is not None and first.data.base is not second.data.base
+    np.testing.assert_array_equal(first.data, 1.0)
+    np.testing.assert_array_equal(second.data, 2.0)
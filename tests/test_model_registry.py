@@ -0,0 +1,97 @@
+import queue
+import threading
+import time
+import pytest
+from audio_engine import AudioEngine
+from model_registry import ModelRegistry
+from nodes import NODE_REGISTRY
+
+
+class Loader:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = 0
+        self.unloaded = []
+        self.delay = delay
+        self.fail = fail
+
+    def load(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("no weights")
+        return f"model {self.calls}"
+
+    def unload(self, model):
+        self.unloaded.append(model)
+
+
+def test_concurrent_acquires_share_one_load():
+    loader = Loader(delay=0.1)
+    registry = ModelRegistry()
+    registry.declare("m", loader.load, loader.unload)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("m"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1 and results == ["model 1"] * 4
+    assert registry.is_ready("m")
+
+
+def test_preload_runs_in_the_background():
+    loader = Loader(delay=0.2)
+    registry = ModelRegistry()
+    registry.declare("m", loader.load)
+    started = time.perf_counter()
+    registry.preload(["m", "undeclared"])
+    assert time.perf_counter() - started < 0.1
+    assert registry.get("m") == "model 1"
+
+
+def test_models_in_use_are_never_unloaded():
+    loader = Loader()
+    registry = ModelRegistry(idle_timeout_secs=0.0)
+    registry.declare("m", loader.load, loader.unload)
+    registry.acquire("m")
+    time.sleep(0.01)
+    registry.unload_idle()
+    assert registry.is_ready("m") and loader.unloaded == []
+
+    registry.release("m")
+    time.sleep(0.01)
+    registry.unload_idle()
+    assert not registry.is_ready("m") and loader.unloaded == ["model 1"]
+    # The next use loads it again.
+    assert registry.get("m") == "model 2"
+
+
+def test_failed_loads_are_retried():
+    loader = Loader(fail=True)
+    registry = ModelRegistry()
+    registry.declare("m", loader.load)
+    with pytest.raises(RuntimeError):
+        registry.get("m")
+    loader.fail = False
+    assert registry.get("m") == "model 2"
+
+
+def test_undeclared_models_need_a_loader():
+    registry = ModelRegistry()
+    with pytest.raises(KeyError):
+        registry.acquire("m")
+    assert registry.get("m", lambda: "inline") == "inline"
+
+
+def test_engines_preload_only_the_models_a_graph_uses(monkeypatch):
+    engine = AudioEngine(queue.Queue(), preload_models=True)
+    requested = []
+    monkeypatch.setattr(engine.models, "preload", lambda names=None: requested.append(list(names)))
+    osc = NODE_REGISTRY["generator/osc"](dpg_tag=1)
+    engine.preload_node_models([osc])
+    assert requested == []
+
+    audiocraft = NODE_REGISTRY["generator/audiocraft"](dpg_tag=2)
+    audiocraft.params["model"] = "facebook/musicgen-medium"
+    engine.preload_node_models([osc, audiocraft])
+    assert requested == [["facebook/musicgen-medium"]]
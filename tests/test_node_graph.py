@@ -0,0 +1,126 @@
+import numpy as np
+from scipy.io import wavfile
+from conftest import file_out, mixer, osc
+
+
+def test_plan_is_reused_until_the_structure_changes(graph, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    plan = graph_manager.compile_plan()
+    assert graph_manager.compile_plan() is plan
+    assert plan['sorted_nodes'] == [tags["a"], tags["out"]]
+
+    # Param edits do not touch the structure.
+    graph_manager.nodes[tags["a"]].params["frequency"] = "330"
+    assert graph_manager.compile_plan() is plan
+
+    link_tag = next(iter(graph_manager.links))
+    graph_manager.on_link_removed(link_tag)
+    assert graph_manager.compile_plan() is not plan
+    assert graph_manager.compile_plan()['adj'][tags["a"]] == []
+
+
+def test_indexes_follow_node_removal(graph, tmp_path):
+    graph_manager, tags = graph([osc("a"), mixer("mix"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("a", "audio_out"), ("mix", "audio_in_2")),
+                                 (("mix", "audio_out"), ("out", "audio_in"))])
+    assert graph_manager.edge_counts[(tags["a"], tags["mix"])] == 2
+
+    graph_manager.remove_node(tags["mix"])
+    assert graph_manager.links == {}
+    assert graph_manager.link_map_by_tag == {}
+    assert graph_manager.children[tags["a"]] == {}
+    assert graph_manager.parents[tags["out"]] == {}
+    assert (tags["a"], tags["mix"]) not in graph_manager.edge_counts
+    assert graph_manager.compile_plan()['sorted_nodes'] == [tags["a"], tags["out"]]
+
+
+def test_cycles_are_rejected(graph):
+    graph_manager, tags = graph([mixer("m1"), mixer("m2")], [(("m1", "audio_out"), ("m2", "audio_in_1"))])
+    attr_out = graph_manager.nodes[tags["m2"]].output_attr_map["audio_out"]
+    attr_in = graph_manager.nodes[tags["m1"]].input_attr_map["audio_in_1"]
+    assert not graph_manager.on_link_added(1000, attr_out, attr_in)
+    assert 1000 not in graph_manager.links
+
+
+def test_pinned_rate_inserts_a_resampler(graph, engine, tmp_path):
+    path = tmp_path / "out.wav"
+    graph_manager, tags = graph([osc("a", sample_rate="48000"), file_out("out", path, sample_rate="22050")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    task = graph_manager.build_task()
+    resamplers = [node_tag for node_tag in task['sorted_nodes'] if str(node_tag).startswith("auto_resample:")]
+    assert len(resamplers) == 1
+    assert task['nodes_map'][resamplers[0]].params["sample_rate"] == "22050"
+    assert task['adj'][tags["a"]] == resamplers
+    # The graph itself is left untouched.
+    assert list(graph_manager.children[tags["a"]]) == [tags["out"]]
+
+    engine.execute_graph_task(task)
+    assert wavfile.read(path)[0] == 22050
+
+
+def test_unknown_rates_are_left_to_the_mixer(graph, tmp_path):
+    sample_path = tmp_path / "sample.wav"
+    wavfile.write(sample_path, 22050, np.zeros(100, dtype=np.float32))
+    graph_manager, _ = graph([osc("a"), {"id": "smp", "type": "generator/sample_loader", "params": {"filepath": str(sample_path)}},
+                              mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+                             [(("a", "audio_out"), ("mix", "audio_in_1")),
+                              (("smp", "audio_out"), ("mix", "audio_in_2")),
+                              (("mix", "audio_out"), ("out", "audio_in"))])
+    task = graph_manager.build_task()
+    assert not any(str(node_tag).startswith("auto_resample:") for node_tag in task['sorted_nodes'])
+
+
+def test_known_mismatched_rates_are_resampled_before_the_mixer(graph):
+    graph_manager, tags = graph([osc("a", sample_rate="22050"), osc("b", sample_rate="44100"), mixer("mix")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("b", "audio_out"), ("mix", "audio_in_2"))])
+    task = graph_manager.build_task()
+    rates = {task['nodes_map'][node_tag].params["sample_rate"] for node_tag in task['sorted_nodes']
+             if str(node_tag).startswith("auto_resample:")}
+    assert rates == {"44100"}
+
+
+def test_preview_builds_keep_resampler_changes_for_the_next_render(graph, engine, tmp_path):
+    path = tmp_path / "out.wav"
+    graph_manager, tags = graph([osc("a", sample_rate="48000"), file_out("out", path, sample_rate="44100")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    engine.execute_graph_task(graph_manager.build_task())
+    assert wavfile.read(path)[0] == 44100
+
+    graph_manager.nodes[tags["out"]].params["sample_rate"] = "22050"
+    graph_manager.mark_node_dirty(tags["out"])
+    graph_manager.build_task('stream', keep_dirty=True)
+    engine.execute_graph_task(graph_manager.build_task())
+    assert wavfile.read(path)[0] == 22050
+
+
+def test_identical_pure_nodes_are_merged(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), osc("b"), mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("b", "audio_out"), ("mix", "audio_in_2")),
+                                 (("mix", "audio_out"), ("out", "audio_in"))])
+    task = graph_manager.build_task()
+    merged = {tags["a"], tags["b"]} - set(task['sorted_nodes'])
+    assert len(merged) == 1
+    alias = graph_manager.nodes[merged.pop()].output_attr_map["audio_out"]
+    assert task['aliases'] == {alias: task['link_map_by_tag'][graph_manager.nodes[tags["mix"]].input_attr_map["audio_in_1"]]}
+    # Sinks are never merged, even when they look alike.
+    assert tags["out"] in task['sorted_nodes']
+    assert engine.execute_graph_task(task).startswith("Graph processing finished")
+
+
+def test_merge_changes_survive_preview_builds(graph, engine, stale_log, tmp_path):
+    graph_manager, tags = graph([osc("a"), osc("b", "330"), mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("b", "audio_out"), ("mix", "audio_in_2")),
+                                 (("mix", "audio_out"), ("out", "audio_in"))])
+    engine.execute_graph_task(graph_manager.build_task())
+
+    # b becomes a copy of a and is merged away; the mixer must notice even after a preview build.
+    graph_manager.nodes[tags["b"]].params["frequency"] = "220"
+    graph_manager.mark_node_dirty(tags["b"])
+    graph_manager.build_task('stream', keep_dirty=True)
+    engine.execute_graph_task(graph_manager.build_task())
+    assert tags["mix"] in stale_log[-1]
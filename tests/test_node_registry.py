@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import time
+import pytest
+import nodes
+from nodes import NodeRegistry
+
+PLUGIN_SOURCE = '''
+from nodes import BaseNode, register_node
+
+
+@register_node("plugin/{name}")
+class {name}Node(BaseNode):
+    NODE_NAME = "{name}"
+
+    @staticmethod
+    def get_attributes():
+        return {{"inputs": {{"audio_in": "audio"}}, "outputs": {{"audio_out": "audio"}}}}
+
+    @staticmethod
+    def get_parameters():
+        return {{"gain": "{gain}"}}
+
+    def compute(self, inputs):
+        return {{"audio_out": inputs.get("audio_in")}}
+'''
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    # Plugins register through the module-level registry, so each test swaps in its own.
+    name = f"plugin_{tmp_path.name.replace('-', '_')}"
+    directory = tmp_path / "plugins"
+    directory.mkdir()
+    monkeypatch.syspath_prepend(str(directory))
+
+    def write(gain="1.0"):
+        path = directory / f"{name}.py"
+        path.write_text(PLUGIN_SOURCE.format(name=name, gain=gain))
+        stamp = time.time_ns() + 10 ** 9
+        os.utime(path, ns=(stamp, stamp))
+        sys.modules.pop(name, None)
+
+    def registry():
+        instance = NodeRegistry([name], manifest_path=str(tmp_path / "manifest.json"))
+        monkeypatch.setattr(nodes, "NODE_REGISTRY", instance)
+        return instance
+
+    write()
+    yield name, write, registry
+    sys.modules.pop(name, None)
+
+
+def test_the_manifest_spares_later_imports(plugin, tmp_path):
+    name, write, registry = plugin
+    assert registry().info(f"plugin/{name}")["params"] == {"gain": "1.0"}
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert f"plugin/{name}" in manifest["modules"][name]["nodes"]
+
+    sys.modules.pop(name)
+    fresh = registry()
+    assert list(fresh) == [f"plugin/{name}"]
+    assert fresh.info(f"plugin/{name}")["inputs"] == {"audio_in": "audio"}
+    assert name not in sys.modules
+    # The class itself is imported on first use.
+    assert fresh[f"plugin/{name}"].__name__ == f"{name}Node"
+    assert name in sys.modules
+
+
+def test_edited_modules_are_described_again(plugin, tmp_path):
+    name, write, registry = plugin
+    registry().info(f"plugin/{name}")
+    write(gain="0.5")
+    assert registry().info(f"plugin/{name}")["params"] == {"gain": "0.5"}
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["modules"][name]["nodes"][f"plugin/{name}"]["params"] == {"gain": "0.5"}
+
+
+def test_plugin_directories_add_public_modules(tmp_path):
+    (tmp_path / "reverbs.py").write_text("")
+    (tmp_path / "_helpers.py").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    registry = NodeRegistry(manifest_path=str(tmp_path / "manifest.json"))
+    registry.add_plugin_directory(str(tmp_path))
+    registry.add_plugin_directory(str(tmp_path / "missing"))
+    assert registry._modules == ["reverbs"]
+    assert str(tmp_path) in sys.path
+    sys.path.remove(str(tmp_path))
+
+
+def test_module_lookups_do_not_scan(monkeypatch):
+    def scan():
+        raise AssertionError("scanned")
+
+    monkeypatch.setattr(nodes.NODE_REGISTRY, "_scan", scan)
+    assert not hasattr(nodes, "__path__")
+    from nodes import BaseNode, END_OF_STREAM  # noqa: F401
+    monkeypatch.undo()
+    # Node classes are still importable from here by their old names.
+    assert nodes.OscNode is nodes.NODE_REGISTRY["generator/osc"]
+    with pytest.raises(AttributeError):
+        nodes.MissingNode
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from conftest import file_out, mixer, osc
+from preview import FileSink, PreviewRenderer, RingBuffer, find_preview_output
+from sample_cache import SampleCache, load_sample
+
+
+def drain(renderer, frames=256):
+    pulled = []
+    while not renderer.done:
+        out = renderer.pull(frames, block=True, timeout=5.0)
+        pulled.append(out)
+    return np.concatenate(pulled)[:renderer.frames_played]
+
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(8, 1)
+    out = np.zeros((8, 1), dtype=np.float32)
+    assert ring.write(np.arange(6, dtype=np.float32)) == 6
+    assert ring.read(out[:4]) == 4
+    # Six more frames only fit partly, and wrap past the end of the storage.
+    assert ring.write(np.arange(6, 12, dtype=np.float32)) == 6
+    assert ring.free() == 0
+    assert ring.write(np.ones(1, dtype=np.float32)) == 0
+    assert ring.read(out) == 8
+    assert out[:, 0].tolist() == [4, 5, 6, 7, 8, 9, 10, 11]
+    assert ring.available() == 0
+
+
+def test_preview_taps_what_feeds_the_sink(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    task = graph_manager.build_task('stream', keep_dirty=True)
+    assert find_preview_output(task) == graph_manager.nodes[tags["a"]].output_attr_map["audio_out"]
+
+    renderer = PreviewRenderer(engine, task, block_size=512).start()
+    audio = drain(renderer)
+    renderer.stop()
+    assert renderer.error is None
+    assert renderer.task['sorted_nodes'] == [tags["a"]]
+    # Sinks are not run while previewing.
+    assert not (tmp_path / "a.wav").exists()
+    expected = engine.compute_nodes([graph_manager.nodes[tags["a"]]], [{}])[0]["audio_out"].interleaved()
+    np.testing.assert_allclose(audio, expected.reshape(len(audio), -1), atol=1e-5)
+
+
+def test_merged_outputs_are_previewed_through_their_alias(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), osc("b"), mixer("mix"), file_out("out", tmp_path / "mix.wav")],
+                                [(("a", "audio_out"), ("mix", "audio_in_1")),
+                                 (("b", "audio_out"), ("mix", "audio_in_2")),
+                                 (("mix", "audio_out"), ("out", "audio_in"))])
+    task = graph_manager.build_task('stream', keep_dirty=True)
+    merged_tag = graph_manager.nodes[tags["b"]].output_attr_map["audio_out"]
+    assert merged_tag in task['aliases']
+
+    renderer = PreviewRenderer(engine, task, output_tag=merged_tag)
+    assert renderer.output_tag == task['aliases'][merged_tag]
+    renderer.start()
+    assert len(drain(renderer)) == 2205
+    renderer.stop()
+
+    with pytest.raises(ValueError):
+        PreviewRenderer(engine, task, output_tag=-1)
+
+
+def test_previews_wait_for_renders(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    engine._rendering = True
+    with pytest.raises(RuntimeError):
+        engine.start_preview(graph_manager.build_task('stream', keep_dirty=True))
+    engine._rendering = False
+
+
+def test_file_sink_records_the_whole_preview(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    sink = FileSink(str(tmp_path / "preview.wav"), frames_per_pull=300)
+    renderer = engine.start_preview(graph_manager.build_task('stream', keep_dirty=True), sink=sink)
+    sink._thread.join(5.0)
+    engine.stop_preview()
+    assert renderer.underruns == 0
+    assert renderer.frames_played == 2205
+    recorded = load_sample(str(tmp_path / "preview.wav"), cache=SampleCache())
+    assert recorded.data.shape == (1, 2205)
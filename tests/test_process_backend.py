@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pytest
+from audio_buffer import AudioBuffer
+from nodes import NODE_REGISTRY
+from process_backend import ProcessNodeBackend, SharedMemoryPool, attach_array, share_array
+
+
+def shm_segments():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    # Workers are spawned with their own node registry; HOME keeps their manifest out of ~/.cache.
+    home = os.environ.get("HOME")
+    os.environ["HOME"] = str(tmp_path_factory.mktemp("home"))
+    process_backend = ProcessNodeBackend(num_workers=1)
+    try:
+        yield process_backend
+    finally:
+        process_backend.shutdown()
+        if home is None:
+            os.environ.pop("HOME", None)
+        else:
+            os.environ["HOME"] = home
+
+
+def make_node(node_type, **params):
+    node = NODE_REGISTRY[node_type](dpg_tag=1)
+    node.params.update(params)
+    return node
+
+
+def test_shared_arrays_round_trip():
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    descriptor, shm = share_array(array)
+    try:
+        attached = attach_array(descriptor)
+        np.testing.assert_array_equal(attached, array)
+        del attached
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_pool_describes_views_by_offset():
+    pool = SharedMemoryPool()
+    array = pool.acquire((2, 8))
+    array[...] = np.arange(16).reshape(2, 8)
+    descriptor, _ = pool.describe(array[1:, 2:6])
+    assert pool.describe(np.zeros(4)) is None
+    view = attach_array(descriptor)
+    np.testing.assert_array_equal(view, array[1:, 2:6])
+    del view, array
+    for shm in pool.take_segments():
+        shm.close()
+        shm.unlink()
+
+
+def test_outputs_match_in_process_computes(backend):
+    before = shm_segments()
+    node = make_node("generator/osc", frequency="330", duration_secs="0.1")
+    remote = backend.compute(node, {})["audio_out"]
+    np.testing.assert_array_equal(remote.data, node.compute({})["audio_out"].data)
+    assert remote.sample_rate == 44100
+    del remote
+    assert shm_segments() <= before
+
+
+def test_inputs_reach_the_worker(backend):
+    before = shm_segments()
+    mixer = make_node("utility/mixer", gains="0.5,0.25")
+    inputs = {"audio_in_1": AudioBuffer(np.ones((2, 64), dtype=np.float32), 8000),
+              "audio_in_2": AudioBuffer(np.full((2, 32), 2.0, dtype=np.float32), 8000)}
+    mixed = backend.compute(mixer, inputs)["audio_out"]
+    np.testing.assert_array_equal(mixed.data, mixer.compute(inputs)["audio_out"].data)
+    del mixed
+    assert shm_segments() <= before
+
+
+def test_worker_errors_are_raised_in_the_parent(backend):
+    with pytest.raises(RuntimeError, match="ValueError"):
+        backend.compute(make_node("utility/mixer", gains="loud"),
+                        {"audio_in_1": AudioBuffer(np.ones((1, 8), dtype=np.float32), 8000)})
+    # The worker survives and takes the next job.
+    assert backend.compute(make_node("generator/osc", duration_secs="0.01"), {})["audio_out"].frames == 441
+
+
+def test_model_commands_reach_every_worker(backend):
+    with pytest.raises(RuntimeError, match="does not load models"):
+        backend.load_model("generator/osc", "none")
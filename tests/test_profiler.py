@@ -0,0 +1,82 @@
+import json
+import numpy as np
+import pytest
+from audio_buffer import AudioBuffer
+from conftest import file_out, osc
+from profiler import NodeProfiler
+
+
+def audio(frames):
+    return {"audio_out": AudioBuffer(np.zeros((1, frames), dtype=np.float32), 44100)}
+
+
+def test_batched_calls_are_split_between_their_nodes():
+    profiler = NodeProfiler()
+    profiler.call((1, 2), "test/batch", ({}, {}), lambda: [audio(100), audio(100)])
+    profiler.call((3,), "test/single", ({},), lambda: audio(50))
+    rows = {row["node_tag"]: row for row in profiler.summary()}
+    span = profiler.spans[0]
+    assert rows[1]["calls"] == rows[2]["calls"] == 1
+    assert rows[1]["wall"] == pytest.approx(span.wall / 2)
+    assert rows[1]["samples"] == rows[2]["samples"] == 100
+    assert rows[3]["output_bytes"] == 50 * 4
+
+
+def test_sinks_are_measured_on_their_inputs():
+    profiler = NodeProfiler()
+    profiler.call((1,), "output/file_out", (audio(80),), lambda: {})
+    assert profiler.summary()[0]["samples"] == 80
+    assert profiler.summary()[0]["output_bytes"] == 0
+
+
+def test_failed_calls_are_recorded_and_reraised():
+    profiler = NodeProfiler()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        profiler.call((1,), "test/fail", ({},), fail)
+    assert profiler.summary()[0]["failed"]
+    event = profiler.chrome_trace()["traceEvents"][0]
+    assert event["args"]["failed"]
+
+
+def test_memory_peaks_are_traced():
+    profiler = NodeProfiler(trace_memory=True)
+    profiler.call((1,), "test/alloc", ({},), lambda: {"audio_out": AudioBuffer(np.ones((1, 250000), dtype=np.float32), 44100)})
+    profiler.call((2,), "test/noop", ({},), lambda: {})
+    profiler.finish()
+    rows = {row["node_tag"]: row for row in profiler.summary()}
+    assert rows[1]["peak_bytes"] >= 1000000
+    assert rows[2]["peak_bytes"] < 1000000
+
+
+def test_chrome_trace_covers_every_span(tmp_path):
+    profiler = NodeProfiler()
+    profiler.call((1, 2), "test/batch", ({}, {}), lambda: [audio(10), audio(10)])
+    profiler.call((3,), "test/single", ({},), lambda: audio(10))
+    profiler.finish()
+    path = tmp_path / "trace.json"
+    profiler.export_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [event for event in events if event.get("cat") == "node"]
+    assert [event["name"] for event in spans] == ["test/batch x2", "test/single"]
+    assert spans[0]["args"]["node_tags"] == [1, 2]
+    assert any(event["name"] == "Render" for event in events)
+    assert any(event["ph"] == "M" for event in events)
+
+
+def test_engine_profiles_each_node(graph, engine, tmp_path):
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    engine.execute_graph_task(graph_manager.build_task())
+    assert engine.last_profile is None
+
+    engine.set_profiling(True)
+    graph_manager.mark_node_dirty(tags["a"])
+    engine.execute_graph_task(graph_manager.build_task())
+    rows = {row["node_tag"]: row for row in engine.last_profile.summary()}
+    assert set(rows) == {tags["a"], tags["out"]}
+    assert rows[tags["out"]]["samples"] == rows[tags["a"]]["samples"] > 0
+    assert engine.last_profile.finished is not None
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+from scipy.io import wavfile
+from audio_buffer import AudioBuffer
+from conftest import file_out, mixer, osc
+from nodes import BaseNode
+from render_cache import RenderCache, cache_keys
+
+
+class CountingNode(BaseNode):
+    DISK_CACHEABLE = True
+
+    def __init__(self):
+        super().__init__(dpg_tag=1)
+        self.calls = 0
+
+    @staticmethod
+    def get_attributes():
+        return {"inputs": {}, "outputs": {"audio_out": "audio"}}
+
+    @staticmethod
+    def get_parameters():
+        return {}
+
+    def compute(self, inputs):
+        self.calls += 1
+        return {"audio_out": AudioBuffer(np.full((1, 8), self.calls, dtype=np.float32), 44100)}
+
+
+def test_stored_outputs_load_back_read_only(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    audio = AudioBuffer(np.arange(8, dtype=np.float32).reshape(2, 4), 22050)
+    assert cache.store("key", {"audio_out": audio})
+    loaded = cache.load("key")["audio_out"]
+    assert loaded.sample_rate == 22050
+    np.testing.assert_array_equal(loaded.data, audio.data)
+    assert not loaded.data.flags.writeable
+    assert cache.load("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_non_audio_outputs_are_not_stored(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert not cache.store("key", {"audio_out": None})
+    assert cache.load("key") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    audio = AudioBuffer(np.zeros((1, 1024), dtype=np.float32), 44100)
+    cache = RenderCache(str(tmp_path), max_bytes=10 * 1024)
+    for index, key in enumerate(["a", "b"]):
+        cache.store(key, {"audio_out": audio})
+        os.utime(tmp_path / key, (index, index))
+    cache.load("a")
+    cache.store("c", {"audio_out": audio})
+    assert cache.load("b") is None
+    assert cache.load("a") is not None and cache.load("c") is not None
+    assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_keys_follow_params_and_upstream_nodes(graph, tmp_path):
+    graph_manager, tags = graph([osc("osc"), mixer("mix"), file_out("out", tmp_path / "out.wav")],
+                                [(("osc", "audio_out"), ("mix", "audio_in_1")), (("mix", "audio_out"), ("out", "audio_in"))])
+    keys = cache_keys(graph_manager.build_task())
+    # File Out is neither pure nor cacheable, so it never gets a key.
+    assert keys[tags["out"]] is None
+    assert keys[tags["osc"]] and keys[tags["mix"]]
+    assert cache_keys(graph_manager.build_task()) == keys
+
+    graph_manager.nodes[tags["osc"]].params["frequency"] = "330"
+    changed = cache_keys(graph_manager.build_task())
+    assert changed[tags["osc"]] != keys[tags["osc"]]
+    assert changed[tags["mix"]] != keys[tags["mix"]]
+
+
+def test_keys_follow_the_files_nodes_read(graph, tmp_path):
+    path = tmp_path / "sample.wav"
+    wavfile.write(path, 44100, np.zeros(100, dtype=np.float32))
+    graph_manager, tags = graph([{"id": "smp", "type": "generator/sample_loader", "params": {"filepath": str(path)}},
+                                 mixer("mix")],
+                                [(("smp", "audio_out"), ("mix", "audio_in_1"))])
+    keys = cache_keys(graph_manager.build_task())
+    assert cache_keys(graph_manager.build_task()) == keys
+
+    # Same path and params, new contents.
+    wavfile.write(path, 44100, np.ones(200, dtype=np.float32))
+    os.utime(path, ns=(0, 10 ** 9))
+    changed = cache_keys(graph_manager.build_task())
+    assert changed[tags["smp"]] != keys[tags["smp"]]
+    assert changed[tags["mix"]] != keys[tags["mix"]]
+
+
+def test_engine_computes_each_key_once(engine, tmp_path):
+    engine.render_cache = RenderCache(str(tmp_path))
+    node = CountingNode()
+    first = engine.compute_nodes_cached([node], [{}], ["key"])[0]["audio_out"]
+    second = engine.compute_nodes_cached([node], [{}], ["key"])[0]["audio_out"]
+    assert node.calls == 1
+    np.testing.assert_array_equal(first.data, second.data)
+    engine.compute_nodes_cached([node], [{}], [None])
+    assert node.calls == 2
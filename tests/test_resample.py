@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from resample import TAPS_PER_PHASE, Resampler, filter_bank, rational_ratio, resample_array, taps_per_phase
+
+
+def tone(frequency, rate, frames, channels=1):
+    t = np.arange(frames) / rate
+    return np.tile(np.sin(2 * np.pi * frequency * t).astype(np.float32), (channels, 1))
+
+
+def test_ratios_are_reduced():
+    assert rational_ratio(48000, 44100) == (147, 160)
+    assert rational_ratio(22050, 44100) == (2, 1)
+
+
+def test_taps_scale_with_decimation():
+    assert taps_per_phase(2, 1) == TAPS_PER_PHASE
+    assert taps_per_phase(147, 160) == 2 * TAPS_PER_PHASE
+    assert taps_per_phase(1, 6) == 6 * TAPS_PER_PHASE
+    assert Resampler(96000, 16000, 1).taps == 6 * TAPS_PER_PHASE
+
+
+def test_filter_banks_are_shared_and_read_only():
+    bank = filter_bank(2, 1, TAPS_PER_PHASE)
+    assert bank is filter_bank(2, 1, TAPS_PER_PHASE)
+    assert bank.shape == (2, TAPS_PER_PHASE)
+    with pytest.raises(ValueError):
+        bank[0, 0] = 1.0
+
+
+@pytest.mark.parametrize("source_rate, target_rate", [(44100, 48000), (48000, 44100), (22050, 44100), (96000, 16000)])
+def test_tones_survive_resampling(source_rate, target_rate):
+    out = resample_array(tone(440.0, source_rate, source_rate // 5), source_rate, target_rate)
+    assert out.shape == (1, target_rate // 5)
+    expected = tone(440.0, target_rate, target_rate // 5)
+    # The filter's delay is removed, so the output lines up with the ideal tone away from the edges.
+    middle = slice(target_rate // 50, -target_rate // 50)
+    np.testing.assert_allclose(out[:, middle], expected[:, middle], atol=2e-3)
+
+
+def test_decimation_rejects_aliases():
+    # 10 kHz folds to 6 kHz at 16 kHz unless the low-pass removes it first.
+    out = resample_array(tone(10000.0, 96000, 96000), 96000, 16000)
+    spectrum = np.abs(np.fft.rfft(out[0, 1600:-1600] * np.hanning(12800)))
+    assert spectrum.max() < 1e-3 * 12800 / 4
+
+
+def test_blocks_match_a_whole_buffer_pass():
+    audio = np.random.default_rng(0).standard_normal((2, 9000)).astype(np.float32)
+    whole = resample_array(audio, 48000, 44100)
+    resampler = Resampler(48000, 44100, 2)
+    blocks = [resampler.process(audio[:, start:start + 1000]) for start in range(0, 9000, 1000)]
+    streamed = np.concatenate(blocks + [resampler.flush()], axis=1)
+    assert streamed.shape == whole.shape
+    np.testing.assert_allclose(streamed, whole, atol=1e-6)
+
+
+def test_equal_rates_pass_through():
+    audio = tone(440.0, 44100, 100)
+    assert resample_array(audio, 44100, 44100) is audio
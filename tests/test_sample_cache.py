@@ -0,0 +1,74 @@
+import os
+import numpy as np
+import pytest
+from scipy.io import wavfile
+from sample_cache import SampleCache, load_sample
+
+
+@pytest.fixture
+def cache():
+    return SampleCache()
+
+
+def write(path, data, sample_rate=8000):
+    wavfile.write(path, sample_rate, data)
+    return str(path)
+
+
+def mapped(array):
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_lru_entries_are_evicted_past_the_byte_limit():
+    cache = SampleCache(max_bytes=100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", 40)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.current_bytes == 80
+    # Entries larger than the whole cache are never kept.
+    cache.put("d", "D", 101)
+    assert cache.get("d") is None and cache.current_bytes == 80
+
+
+def test_mono_float_files_are_mapped_read_only(tmp_path, cache):
+    data = np.linspace(-1, 1, 500, dtype=np.float32)
+    audio = load_sample(write(tmp_path / "mono.wav", data), cache=cache)
+    assert audio.sample_rate == 8000 and audio.channels == 1
+    np.testing.assert_array_equal(audio.data[0], data)
+    assert not audio.data.flags.writeable
+    assert mapped(audio.data)
+    # Mapped entries count toward the limit like decoded ones.
+    assert cache.current_bytes == audio.nbytes
+
+
+def test_pcm_and_multichannel_files_are_decoded_to_float(tmp_path, cache):
+    data = (np.arange(-300, 300).reshape(300, 2) * 50).astype(np.int16)
+    audio = load_sample(write(tmp_path / "stereo.wav", data), cache=cache)
+    assert audio.channels == 2 and audio.data.dtype == np.float32
+    np.testing.assert_allclose(audio.data, data.T / 32768.0)
+
+
+def test_repeat_loads_hit_the_cache_until_the_file_changes(tmp_path, cache):
+    path = write(tmp_path / "a.wav", np.zeros(100, dtype=np.float32))
+    first = load_sample(path, cache=cache)
+    assert load_sample(path, cache=cache) is first
+    assert cache.hits == 1
+
+    write(tmp_path / "a.wav", np.ones(200, dtype=np.float32))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_sample(path, cache=cache).frames == 200
+
+
+def test_target_rates_are_cached_separately(tmp_path, cache):
+    path = write(tmp_path / "a.wav", np.zeros(8000, dtype=np.float32))
+    resampled = load_sample(path, 16000, cache=cache)
+    assert resampled.sample_rate == 16000 and abs(resampled.frames - 16000) <= 1
+    assert load_sample(path, cache=cache).sample_rate == 8000
@@ -0,0 +1,60 @@
+import json
+import pytest
+from scipy.io import wavfile
+import render
+import sweep
+from conftest import file_out, osc
+
+
+def test_axes_take_lists_and_ranges():
+    assert sweep.parse_axis("osc.frequency=110, 220,440") == ("osc", "frequency", ["110", "220", "440"])
+    assert sweep.parse_axis("osc.frequency=100:200:3") == ("osc", "frequency", ["100", "150", "200"])
+    # Node ids may contain dots; the param is whatever follows the last one.
+    assert sweep.parse_axis("v1.osc.gain=1")[:2] == ("v1.osc", "gain")
+    with pytest.raises(ValueError):
+        sweep.parse_axis("frequency=110")
+
+
+def test_only_numeric_triples_are_ranges():
+    assert sweep.parse_axis("out.filename=c:/a:b.wav")[2] == ["c:/a:b.wav"]
+    assert sweep.parse_axis("osc.frequency=1:2:0.5")[2] == ["1:2:0.5"]
+    assert sweep.parse_axis("osc.frequency=1:2:0")[2] == ["1:2:0"]
+
+
+def test_variants_form_a_grid_or_zip():
+    axes = [("a", "x", ["1", "2"]), ("b", "y", ["3", "4"])]
+    grid = sweep.expand_variants(axes)
+    assert len(grid) == 4 and grid[1] == (1, {("a", "x"): "1", ("b", "y"): "4"})
+    assert sweep.expand_variants(axes, "zip") == [(0, {("a", "x"): "1", ("b", "y"): "3"}),
+                                                 (1, {("a", "x"): "2", ("b", "y"): "4"})]
+    with pytest.raises(ValueError):
+        sweep.expand_variants([("a", "x", ["1"]), ("b", "y", ["3", "4"])], "zip")
+    chunks = sweep.chunk_variants(grid, 3)
+    assert sorted(index for chunk in chunks for index, _ in chunk) == [0, 1, 2, 3]
+
+
+def test_expanded_graphs_give_each_variant_its_own_file(tmp_path):
+    data = {"nodes": [osc("osc"), file_out("out", tmp_path / "out.wav")],
+            "links": [{"from": ["osc", "audio_out"], "to": ["out", "audio_in"]}]}
+    axes = [sweep.parse_axis("osc.frequency=110,220")]
+    sweep.validate_axes(data, axes)
+    with pytest.raises(ValueError):
+        sweep.validate_axes(data, [("osc", "missing", ["1"])])
+
+    expanded = sweep.expand_graph(data, sweep.expand_variants(axes))
+    entries = {entry["id"]: entry for entry in expanded["nodes"]}
+    assert entries["v1/osc"]["params"]["frequency"] == "220"
+    assert entries["v1/out"]["params"]["filename"] == str(tmp_path / "out_v001.wav")
+    assert {"from": ["v1/osc", "audio_out"], "to": ["v1/out", "audio_in"]} in expanded["links"]
+
+
+def test_sweeps_render_every_variant(tmp_path):
+    graph_path = tmp_path / "graph.json"
+    graph_path.write_text(json.dumps({"version": 1, "nodes": [osc("osc"), file_out("out", tmp_path / "out.wav")],
+                                      "links": [{"from": ["osc", "audio_out"], "to": ["out", "audio_in"]}]}))
+    assert render.main([str(graph_path), "--workers", "1", "--no-render-cache",
+                        "--sweep", "osc.frequency=110,220,440", "--sweep", "osc.sample_rate=22050,44100"]) == 0
+    for index in range(6):
+        rate, audio = wavfile.read(tmp_path / sweep.variant_filename("out.wav", index))
+        assert rate == (22050 if index % 2 == 0 else 44100)
+        assert len(audio) == rate // 20
@@ -0,0 +1,82 @@
+import struct
+import numpy as np
+import pytest
+from scipy.io import wavfile
+import wav_io
+from wav_io import WavStreamWriter, build_wav_header, encode_samples, write_wav_chunked
+
+
+def signal(frames=1000, channels=2):
+    t = np.arange(frames) / 8000
+    return np.stack([0.5 * np.sin(2 * np.pi * 220 * (index + 1) * t) for index in range(channels)], axis=1).astype(np.float32)
+
+
+@pytest.mark.parametrize("sample_format, dtype, scale", [("pcm16", np.int16, 2 ** 15), ("pcm24", np.int32, 2 ** 31),
+                                                         ("pcm32", np.int32, 2 ** 31), ("float32", np.float32, 1)])
+def test_written_files_read_back(tmp_path, sample_format, dtype, scale):
+    path = tmp_path / "out.wav"
+    audio = signal()
+    write_wav_chunked(str(path), audio, 8000, sample_format, chunk_frames=300)
+    sample_rate, data = wavfile.read(path)
+    assert sample_rate == 8000 and data.dtype == dtype
+    np.testing.assert_allclose(data / scale, audio, atol=1e-4)
+
+
+@pytest.mark.parametrize("sample_format, channels, extensible", [("pcm16", 2, False), ("pcm24", 1, True),
+                                                                ("pcm32", 2, True), ("float32", 2, False),
+                                                                ("pcm16", 6, True), ("float32", 4, True)])
+def test_extensible_format_where_the_spec_requires_it(sample_format, channels, extensible):
+    header = build_wav_header(48000, channels, sample_format, 10)
+    format_tag, = struct.unpack_from('<H', header, 20)
+    assert (format_tag == wav_io.WAVE_FORMAT_EXTENSIBLE) == extensible
+    if extensible:
+        sub_format, = struct.unpack_from('<H', header, 44)
+        assert sub_format == wav_io.SAMPLE_FORMATS[sample_format][0]
+
+
+def test_multichannel_extensible_files_read_back(tmp_path):
+    path = tmp_path / "out.wav"
+    audio = signal(channels=6)
+    write_wav_chunked(str(path), audio, 8000, "pcm24")
+    _, data = wavfile.read(path)
+    np.testing.assert_allclose(data / 2 ** 31, audio, atol=1e-4)
+
+
+def test_streamed_files_match_chunked_files(tmp_path):
+    audio = signal(channels=3)
+    writer = WavStreamWriter(str(tmp_path / "stream.wav"), 8000, 3, "pcm16")
+    for start in range(0, len(audio), 256):
+        writer.write(audio[start:start + 256])
+    writer.close()
+    write_wav_chunked(str(tmp_path / "chunked.wav"), audio, 8000, "pcm16")
+    np.testing.assert_array_equal(wavfile.read(tmp_path / "stream.wav")[1], wavfile.read(tmp_path / "chunked.wav")[1])
+
+
+def test_headers_past_4gb_switch_to_rf64():
+    frames = (2 ** 32) // 8 + 1
+    header = build_wav_header(48000, 2, "float32", frames)
+    assert header[:4] == b'RF64' and header[12:16] == b'ds64'
+    riff_size, data_size, sample_count = struct.unpack_from('<QQQ', header, 20)
+    assert data_size == frames * 8 and sample_count == frames
+    assert riff_size == len(header) - 8 + data_size
+    # Streams reserve the ds64 space up front, so the rewritten header keeps its length.
+    assert len(build_wav_header(48000, 2, "float32", 0, reserve_ds64=True)) == \
+        len(build_wav_header(48000, 2, "float32", frames, reserve_ds64=True))
+
+
+def test_streams_that_outgrow_riff_are_rewritten_as_rf64(tmp_path, monkeypatch):
+    monkeypatch.setattr(wav_io, "MAX_RIFF_SIZE", 4096)
+    audio = signal(frames=2000)
+    writer = WavStreamWriter(str(tmp_path / "long.wav"), 8000, 2, "float32")
+    writer.write(audio)
+    writer.close()
+    with open(tmp_path / "long.wav", "rb") as f:
+        assert f.read(4) == b'RF64'
+    np.testing.assert_array_equal(wavfile.read(tmp_path / "long.wav")[1], audio)
+
+
+def test_tpdf_dither_stays_within_one_step():
+    audio = np.full((1000, 1), 0.25, dtype=np.float32)
+    encoded = encode_samples(audio, "pcm16", "tpdf", np.random.default_rng(0)).view('<i2')
+    assert np.abs(encoded.astype(np.int32) - round(0.25 * 32767)).max() <= 1
+    assert len(np.unique(encoded)) > 1
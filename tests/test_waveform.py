@@ -0,0 +1,76 @@
+import numpy as np
+from conftest import file_out, osc
+from waveform import WaveformPyramid
+
+
+def reference(audio, bin_frames):
+    bins = -(-len(audio) // bin_frames)
+    return (np.array([audio[i * bin_frames:(i + 1) * bin_frames].min() for i in range(bins)]),
+            np.array([audio[i * bin_frames:(i + 1) * bin_frames].max() for i in range(bins)]))
+
+
+def test_levels_hold_the_envelope_at_each_resolution():
+    audio = np.random.default_rng(0).standard_normal(16 * 64).astype(np.float32)
+    pyramid = WaveformPyramid.from_array(audio)
+    assert [level.bin_frames for level in pyramid.levels] == [16, 64, 256, 1024]
+    for level in pyramid.levels:
+        mins, maxs = reference(audio, level.bin_frames)
+        np.testing.assert_array_equal(level.mins[:level.count], mins)
+        np.testing.assert_array_equal(level.maxs[:level.count], maxs)
+
+
+def test_views_pick_the_finest_level_that_fits():
+    audio = np.random.default_rng(1).standard_normal(16 * 256).astype(np.float32)
+    pyramid = WaveformPyramid.from_array(audio)
+    positions, mins, maxs = pyramid.view(max_points=100)
+    assert len(positions) == 64 and positions[1] == 64
+    np.testing.assert_array_equal(mins, reference(audio, 64)[0])
+
+    positions, mins, maxs = pyramid.view(1024, 2048, max_points=100)
+    assert positions[0] == 1024 and len(positions) == 64
+    np.testing.assert_array_equal(maxs, reference(audio[1024:2048], 16)[1])
+
+
+def test_the_partial_bin_at_the_end_is_shown():
+    audio = np.zeros(16 * 5 + 3, dtype=np.float32)
+    audio[-1] = 2.0
+    audio[70] = -1.0
+    pyramid = WaveformPyramid.from_array(audio)
+    positions, mins, maxs = pyramid.view()
+    assert positions.tolist() == [0, 16, 32, 48, 64, 80]
+    assert maxs[-1] == 2.0 and mins[-2] == -1.0
+
+    # Coarser levels fold the pending finer bins into their tail.
+    positions, mins, maxs = pyramid.view(max_points=1)
+    assert positions.tolist() == [0, 64]
+    assert mins[-1] == -1.0 and maxs[-1] == 2.0
+
+
+def test_appended_blocks_match_one_append():
+    audio = np.random.default_rng(2).standard_normal((2, 5000)).astype(np.float32)
+    whole = WaveformPyramid.from_array(audio)
+    streamed = WaveformPyramid()
+    for start in range(0, 5000, 333):
+        streamed.append(audio[:, start:start + 333])
+    assert streamed.frames == whole.frames == 5000
+    for max_points in (1024, 50, 5):
+        for a, b in zip(whole.view(max_points=max_points), streamed.view(max_points=max_points)):
+            np.testing.assert_array_equal(a, b)
+    # Stereo is drawn as one envelope over both channels.
+    assert whole.view()[2].max() == audio.max()
+
+
+def test_engine_tracks_waveforms_per_output(graph, engine, tmp_path):
+    engine.track_waveforms = True
+    graph_manager, tags = graph([osc("a"), file_out("out", tmp_path / "a.wav")],
+                                [(("a", "audio_out"), ("out", "audio_in"))])
+    engine.execute_graph_task(graph_manager.build_task())
+    output_tag = graph_manager.nodes[tags["a"]].output_attr_map["audio_out"]
+    pyramid = engine.waveforms[output_tag]
+    assert pyramid.frames == 2205 and pyramid.sample_rate == 44100
+    seconds, mins, maxs = pyramid.view_seconds()
+    assert seconds[-1] < 0.05 and maxs.max() > 0.0
+
+    graph_manager.remove_node(tags["a"])
+    engine.execute_graph_task(graph_manager.build_task())
+    assert output_tag not in engine.waveforms
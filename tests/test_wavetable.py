@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from nodes import NODE_REGISTRY
+from wavetable import WAVEFORMS, render_oscillators, waveform_index
+
+
+def make_osc(dpg_tag=1, **params):
+    node = NODE_REGISTRY["generator/osc"](dpg_tag=dpg_tag)
+    node.params.update({name: str(value) for name, value in params.items()})
+    return node
+
+
+def test_sine_matches_the_reference():
+    block, _ = render_oscillators([440.0], [0.5], [waveform_index("sine")], 4410, 44100)
+    expected = 0.5 * np.sin(2 * np.pi * 440 * np.arange(4410) / 44100)
+    np.testing.assert_allclose(block[0], expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("waveform", WAVEFORMS[1:])
+def test_tables_stay_below_nyquist(waveform):
+    sample_rate = 44100
+    block, _ = render_oscillators([5000.0], [1.0], [waveform_index(waveform)], sample_rate, sample_rate)
+    spectrum = np.abs(np.fft.rfft(block[0]))
+    # A naive 5 kHz saw or square folds its upper harmonics back down between the partials.
+    partials = spectrum[np.arange(5000, sample_rate // 2, 5000)]
+    between = np.delete(spectrum, np.arange(0, len(spectrum), 5000))
+    assert between.max() < 1e-3 * partials.max()
+
+
+def test_phases_carry_across_calls():
+    whole, _ = render_oscillators([220.0, 330.0], [1.0, 1.0], [0, 1], 1000, 8000)
+    first, phases = render_oscillators([220.0, 330.0], [1.0, 1.0], [0, 1], 300, 8000)
+    second, _ = render_oscillators([220.0, 330.0], [1.0, 1.0], [0, 1], 700, 8000, phases)
+    np.testing.assert_allclose(np.hstack([first, second]), whole, atol=1e-4)
+
+
+def test_unknown_waveforms_are_rejected():
+    with pytest.raises(ValueError):
+        waveform_index("noise")
+
+
+def test_batched_voices_match_single_computes():
+    nodes = [make_osc(1, frequency=220), make_osc(2, frequency=330, waveform="square"),
+             make_osc(3, frequency=220, sample_rate=22050)]
+    batched = type(nodes[0]).compute_batch(nodes, [{}] * len(nodes))
+    assert len(batched) == len(nodes)
+    for node, outputs in zip(nodes, batched):
+        single = node.compute({})["audio_out"]
+        assert outputs["audio_out"].sample_rate == single.sample_rate
+        np.testing.assert_array_equal(outputs["audio_out"].data, single.data)
+
+
+def test_a_bad_voice_does_not_sink_the_batch():
+    nodes = [make_osc(1), make_osc(2, frequency="loud")]
+    batched = type(nodes[0]).compute_batch(nodes, [{}, {}])
+    assert batched[0]["audio_out"].frames == 44100
+    assert batched[1]["audio_out"] is None
+
+
+def test_streamed_blocks_match_the_whole_buffer():
+    node = make_osc(frequency=440, duration_secs=0.1)
+    whole = node.compute({})["audio_out"]
+    node.begin_stream(1000)
+    blocks = []
+    while True:
+        value = node.compute_block({})["audio_out"]
+        if not hasattr(value, "data"):
+            break
+        blocks.append(value.data)
+    np.testing.assert_allclose(np.hstack(blocks), whole.data, atol=1e-4)
@@ -0,0 +1,402 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from audio_buffer import AudioBuffer
+from convolution import OFFLINE_PARTITION, PartitionedConvolver, convolve, load_ir_spectra
+from nodes import BaseNode, END_OF_STREAM, register_node
+from resample import Resampler, resample_array
+
+@register_node("utility/resample")
+class ResampleNode(BaseNode):
+    NODE_NAME = "Resample"
+    PURE = True
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {"audio_in": "audio"},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        return {
+            "sample_rate": "44100"
+        }
+
+    def output_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        return self._param_rate()
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing ResampleNode {self.dpg_tag}")
+        audio = inputs.get("audio_in")
+        if not isinstance(audio, AudioBuffer):
+            return {"audio_out": None}
+
+        target_rate = self._param_rate()
+        if target_rate is None or target_rate == audio.sample_rate:
+            return {"audio_out": audio}
+
+        resampled = resample_array(audio.data, audio.sample_rate, target_rate)
+        print(f"ResampleNode: {audio.sample_rate}Hz -> {target_rate}Hz, {audio.frames} -> {resampled.shape[1]} frames")
+        return {"audio_out": AudioBuffer(resampled, target_rate)}
+
+    def begin_stream(self, block_size: int):
+        super().begin_stream(block_size)
+        self._resampler = None
+        self._flushed = False
+
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        audio = inputs.get("audio_in")
+
+        if audio is END_OF_STREAM:
+            if self._resampler is None or self._flushed:
+                return {"audio_out": END_OF_STREAM}
+            self._flushed = True
+            return {"audio_out": AudioBuffer(self._resampler.flush(), self._resampler.target_rate)}
+        if audio is None:
+            return {"audio_out": None}
+
+        target_rate = self._param_rate()
+        if target_rate is None or target_rate == audio.sample_rate:
+            return {"audio_out": audio}
+
+        if self._resampler is None:
+            self._resampler = Resampler(audio.sample_rate, target_rate, audio.channels)
+        resampled = self._resampler.process(audio.data)
+        # Early blocks can be too short to fill the filter window yet.
+        return {"audio_out": AudioBuffer(resampled, target_rate) if resampled.shape[1] else None}
+
+# Default port count; the inputs param sets it per node.
+MIXER_INPUTS = 16
+
+
+def _pan_gains(pan: float, source_channels: int) -> Tuple[float, float]:
+    pan = min(1.0, max(-1.0, pan))
+    if source_channels == 1:
+        # Equal-power for mono sources, scaled so the centre keeps unity gain on both sides.
+        angle = (pan + 1.0) * np.pi / 4.0
+        return float(np.cos(angle) * np.sqrt(2.0)), float(np.sin(angle) * np.sqrt(2.0))
+    # Stereo sources are balanced: the far side is attenuated and the near side is left alone.
+    return min(1.0, 1.0 - pan), min(1.0, 1.0 + pan)
+
+
+@register_node("utility/mixer")
+class MixerNode(BaseNode):
+    NODE_NAME = "Mixer"
+    PURE = True
+    PORT_PARAMS = ("inputs",)
+
+    @staticmethod
+    def get_attributes(inputs: int = MIXER_INPUTS) -> Dict[str, Any]:
+        return {
+            "inputs": {f"audio_in_{index}": "audio" for index in range(1, inputs + 1)},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    def port_attributes(self) -> Dict[str, Any]:
+        return self.get_attributes(self._input_count())
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        # Comma-separated, one entry per input in port order; missing or blank entries use the default.
+        return {
+            "inputs": str(MIXER_INPUTS),
+            "gains": "",
+            "pans": "",
+            "offsets_secs": "",
+            "sample_rate": ""
+        }
+
+    def required_input_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        # Inputs are summed sample by sample, so disagreeing rates are brought up to the highest one.
+        # While any linked rate is unknown the highest is not known either, so compute resamples instead.
+        pinned = self._param_rate()
+        if pinned is not None:
+            return pinned
+        rates = set(input_rates.values())
+        return max(rates) if len(rates) > 1 and None not in rates else None
+
+    def output_rate(self, input_rates: Dict[str, Optional[int]]) -> Optional[int]:
+        pinned = self._param_rate()
+        if pinned is not None:
+            return pinned
+        rates = set(input_rates.values())
+        return max(rates) if rates and None not in rates else None
+
+    def _input_count(self) -> int:
+        try:
+            return max(1, int(str(self.params.get("inputs", "")).strip()))
+        except ValueError:
+            return MIXER_INPUTS
+
+    def _param_list(self, param_name: str, default: float) -> List[float]:
+        values = [float(value) if value.strip() else default for value in self.params.get(param_name, "").split(",")]
+        return values + [default] * (self._input_count() - len(values))
+
+    def _read_mix(self) -> Tuple[List[float], List[float], List[float]]:
+        return self._param_list("gains", 1.0), self._param_list("pans", 0.0), self._param_list("offsets_secs", 0.0)
+
+    @staticmethod
+    def _output_channels(input_channels: Dict[int, int], pans: List[float]) -> int:
+        panned = any(pans[index] != 0.0 for index in input_channels)
+        return max(max(input_channels.values()), 2 if panned else 1)
+
+    @staticmethod
+    def _accumulate(target: np.ndarray, source: np.ndarray, gain: float, pan: float,
+                    scratch: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        # Adds source into the target view in place; scaled rows go through one reused scratch row,
+        # which is returned so the caller can keep it between calls.
+        if target.shape[0] == 2:
+            row_gains = [gain * side for side in _pan_gains(pan, source.shape[0])]
+        else:
+            row_gains = [gain] * target.shape[0]
+
+        frames = source.shape[1]
+        for row, row_gain in enumerate(row_gains):
+            if source.shape[0] == 1:
+                source_row = source[0]
+            elif row < source.shape[0]:
+                source_row = source[row]
+            else:
+                continue
+            if row_gain == 1.0:
+                np.add(target[row], source_row, out=target[row])
+            elif row_gain != 0.0:
+                if scratch is None or len(scratch) < frames:
+                    scratch = np.empty(frames, dtype=np.float32)
+                scaled = scratch[:frames]
+                np.multiply(source_row, row_gain, out=scaled)
+                np.add(target[row], scaled, out=target[row])
+        return scratch
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing MixerNode {self.dpg_tag}")
+        try:
+            gains, pans, offsets = self._read_mix()
+            sources = {index: inputs.get(f"audio_in_{index + 1}") for index in range(self._input_count())}
+            sources = {index: audio for index, audio in sources.items() if isinstance(audio, AudioBuffer)}
+            if not sources:
+                print(f"MixerNode: No inputs received.")
+                return {"audio_out": None}
+
+            # The planner usually resamples inputs already; rates it could not know are matched here.
+            sample_rate = self._param_rate() or max(audio.sample_rate for audio in sources.values())
+            for index, audio in sources.items():
+                if audio.sample_rate != sample_rate:
+                    print(f"MixerNode: Resampling input {index + 1} from {audio.sample_rate}Hz to {sample_rate}Hz")
+                    sources[index] = AudioBuffer(resample_array(audio.data, audio.sample_rate, sample_rate), sample_rate)
+
+            # Negative offsets trim the head of a clip instead of shifting the whole timeline.
+            placed = []
+            for index, audio in sources.items():
+                start = int(round(offsets[index] * sample_rate))
+                placed.append((index, max(0, start), audio.data[:, max(0, -start):]))
+            frames = max(start + data.shape[1] for _, start, data in placed)
+
+            channels = self._output_channels({index: audio.channels for index, audio in sources.items()}, pans)
+            mixed = self.allocate_buffer(channels, frames, sample_rate)
+            mixed.data.fill(0.0)
+            scratch = None
+            for index, start, data in placed:
+                self.check_cancelled()
+                scratch = self._accumulate(mixed.data[:, start:start + data.shape[1]], data, gains[index], pans[index], scratch)
+
+            print(f"MixerNode: Mixed {len(placed)} input(s) into {channels} channel(s), {frames} frames")
+            return {"audio_out": mixed}
+
+        except Exception as e:
+            print(f"MixerNode: Error mixing inputs: {e}")
+            raise
+
+    def begin_stream(self, block_size: int):
+        super().begin_stream(block_size)
+        self._inputs = self._input_count()
+        self._gains, self._pans, self._offsets = self._read_mix()
+        self._scratch = None
+        self._sample_rate = None
+        self._running = set()
+        self._input_channels: Dict[int, int] = {}
+        self._input_rates: Dict[int, int] = {}
+        self._consumed: Dict[int, int] = {}
+        self._pending_blocks: List[Tuple[int, AudioBuffer]] = []
+        self._resamplers: Dict[int, Resampler] = {}
+        # Accumulator whose column 0 is the first frame not yet emitted.
+        self._mix = None
+        self._emitted = 0
+        self._mix_end = 0
+        self._finished = False
+
+    def _start_frame(self, index: int) -> int:
+        return int(round(self._offsets[index] * self._sample_rate))
+
+    def _place(self, index: int, audio: AudioBuffer):
+        data = audio.data
+        if audio.sample_rate != self._sample_rate:
+            if index not in self._resamplers:
+                self._resamplers[index] = Resampler(audio.sample_rate, self._sample_rate, audio.channels)
+            data = self._resamplers[index].process(data)
+        position = self._start_frame(index) + self._consumed.get(index, 0)
+        self._consumed[index] = self._consumed.get(index, 0) + data.shape[1]
+        if position < 0:
+            data = data[:, -position:]
+            position = 0
+        if not data.shape[1]:
+            return
+        end = position + data.shape[1]
+        self._reserve(end)
+        self._scratch = self._accumulate(self._mix[:, position - self._emitted:end - self._emitted], data,
+                                         self._gains[index], self._pans[index], self._scratch)
+        self._mix_end = max(self._mix_end, end)
+
+    def _new_mix(self, channels: int, frames: int, carry: Optional[np.ndarray] = None) -> np.ndarray:
+        mix = self.allocate((channels, frames))
+        carried = 0 if carry is None else carry.shape[1]
+        if carried:
+            mix[:, :carried] = carry
+        mix[:, carried:] = 0.0
+        return mix
+
+    def _reserve(self, end: int):
+        needed = end - self._emitted
+        if needed > self._mix.shape[1]:
+            filled = max(0, self._mix_end - self._emitted)
+            self._mix = self._new_mix(self._mix.shape[0], max(needed, 2 * self._mix.shape[1]), self._mix[:, :filled])
+
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        if self._finished:
+            return {"audio_out": END_OF_STREAM}
+
+        for index in range(self._inputs):
+            value = inputs.get(f"audio_in_{index + 1}", END_OF_STREAM)
+            if value is END_OF_STREAM:
+                self._running.discard(index)
+                continue
+            self._running.add(index)
+            if value is None:
+                continue
+            self._input_channels[index] = value.channels
+            self._input_rates[index] = value.sample_rate
+            self._pending_blocks.append((index, value))
+
+        if self._mix is None:
+            # The channel count and rate are fixed once every running input has shown its first block.
+            if not self._input_channels or any(index not in self._input_channels for index in self._running):
+                if not self._running:
+                    self._finished = True
+                    return {"audio_out": END_OF_STREAM}
+                return {"audio_out": None}
+            self._sample_rate = self._param_rate() or max(self._input_rates.values())
+            channels = self._output_channels(self._input_channels, self._pans)
+            self._mix = self._new_mix(channels, 2 * self.block_size)
+
+        for index, audio in self._pending_blocks:
+            self._place(index, audio)
+        self._pending_blocks = []
+        # Inputs that ended still owe the frames held back in their resampler.
+        for index in [index for index in self._resamplers if index not in self._running]:
+            resampler = self._resamplers.pop(index)
+            self._place(index, AudioBuffer(resampler.flush(), self._sample_rate))
+
+        # Frames before every running input's next write position will not change any more.
+        if self._running:
+            ready_until = min(max(0, self._start_frame(index) + self._consumed.get(index, 0)) for index in self._running)
+        else:
+            ready_until = self._mix_end
+            self._finished = True
+        ready = ready_until - self._emitted
+        if ready <= 0:
+            return {"audio_out": END_OF_STREAM if self._finished else None}
+
+        self._reserve(ready_until)
+        # The ready frames go out as a view of the accumulator, which is handed over with them;
+        # mixing carries on in a fresh one that only takes the frames summed past this block.
+        block = AudioBuffer(self._mix[:, :ready], self._sample_rate)
+        filled = max(0, self._mix_end - self._emitted)
+        carry = self._mix[:, ready:max(ready, filled)]
+        self._mix = self._new_mix(self._mix.shape[0], max(2 * self.block_size, carry.shape[1]), carry)
+        self._emitted = ready_until
+        return {"audio_out": block}
+
+
+@register_node("utility/convolver")
+class ConvolverNode(BaseNode):
+    NODE_NAME = "Convolver"
+    PURE = True
+    FILE_PARAMS = ("ir_filepath",)
+
+    @staticmethod
+    def get_attributes() -> Dict[str, Any]:
+        return {
+            "inputs": {"audio_in": "audio"},
+            "outputs": {"audio_out": "audio"}
+        }
+
+    @staticmethod
+    def get_parameters() -> Dict[str, Any]:
+        # mix runs from 0.0 (dry signal only) to 1.0 (convolved signal only).
+        return {
+            "ir_filepath": "",
+            "mix": "1.0"
+        }
+
+    def _levels(self) -> Tuple[float, float]:
+        mix = min(1.0, max(0.0, float(self.params.get("mix", "1.0") or 1.0)))
+        return mix, 1.0 - mix
+
+    def compute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"Computing ConvolverNode {self.dpg_tag}")
+        audio = inputs.get("audio_in")
+        if not isinstance(audio, AudioBuffer):
+            return {"audio_out": None}
+
+        try:
+            filepath = self.params.get("ir_filepath", "")
+            spectra, ir_frames = load_ir_spectra(filepath, audio.sample_rate, OFFLINE_PARTITION)
+            wet, dry = self._levels()
+            channels = max(audio.channels, spectra.shape[0])
+            result = self.allocate_buffer(channels, audio.frames + ir_frames - 1, audio.sample_rate)
+            convolve(audio.data, spectra, ir_frames, result.data, wet, dry)
+
+            print(f"ConvolverNode: Convolved {audio.frames} frames with a {ir_frames}-frame response from {filepath}")
+            return {"audio_out": result}
+
+        except Exception as e:
+            print(f"ConvolverNode: Error convolving: {e}")
+            raise
+
+    def begin_stream(self, block_size: int):
+        super().begin_stream(block_size)
+        self._convolver = None
+        self._tail = None
+        self._tail_position = 0
+
+    def compute_block(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        audio = inputs.get("audio_in")
+
+        if audio is END_OF_STREAM:
+            if self._convolver is None:
+                return {"audio_out": END_OF_STREAM}
+            # The response tail rings on after the input ends; it is handed out a block at a time.
+            if self._tail is None:
+                self._tail = self._convolver.flush()
+            if self._tail_position >= self._tail.shape[1]:
+                return {"audio_out": END_OF_STREAM}
+            block = self._tail[:, self._tail_position:self._tail_position + self.block_size]
+            self._tail_position += block.shape[1]
+            return {"audio_out": AudioBuffer(block, self._sample_rate)}
+        if audio is None:
+            return {"audio_out": None}
+
+        if self._convolver is None:
+            # Partitions match the stream's blocks, so each full block comes straight back out.
+            spectra, ir_frames = load_ir_spectra(self.params.get("ir_filepath", ""), audio.sample_rate, self.block_size)
+            wet, dry = self._levels()
+            self._convolver = PartitionedConvolver(spectra, ir_frames, audio.channels, wet, dry)
+            self._sample_rate = audio.sample_rate
+        convolved = self._convolver.process(audio.data)
+        return {"audio_out": AudioBuffer(convolved, self._sample_rate) if convolved.shape[1] else None}
+
+    def end_stream(self):
+        super().end_stream()
+        self._convolver = None
+        self._tail = None
@@ -0,0 +1,174 @@
+import struct
+from typing import Callable, Optional
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# The extensible SubFormat GUID is the plain format tag followed by these fixed bytes.
+SUBFORMAT_GUID_TAIL = b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+# Mono is front center and stereo front left/right; other layouts are left unassigned.
+CHANNEL_MASKS = {1: 0x4, 2: 0x3}
+# RIFF sizes are 32-bit; larger files are written as RF64, with the real sizes in a ds64 chunk.
+MAX_RIFF_SIZE = 0xFFFFFFFF
+SIZE_IN_DS64 = 0xFFFFFFFF
+DS64_SIZE = 28
+
+# sample format name -> (WAV format tag, bytes per sample)
+SAMPLE_FORMATS = {
+    "pcm16": (WAVE_FORMAT_PCM, 2),
+    "pcm24": (WAVE_FORMAT_PCM, 3),
+    "pcm32": (WAVE_FORMAT_PCM, 4),
+    "float32": (WAVE_FORMAT_IEEE_FLOAT, 4),
+}
+DITHER_MODES = ("none", "tpdf")
+CHUNK_FRAMES = 65536
+
+
+def check_sample_format(sample_format: str, dither: str = "none"):
+    if sample_format not in SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported sample format '{sample_format}', expected one of {', '.join(SAMPLE_FORMATS)}")
+    if dither not in DITHER_MODES:
+        raise ValueError(f"Unsupported dither '{dither}', expected one of {', '.join(DITHER_MODES)}")
+
+
+def build_wav_header(sample_rate: int, channels: int, sample_format: str, num_frames: int,
+                     reserve_ds64: bool = False) -> bytes:
+    # reserve_ds64 holds space for a ds64 chunk in a JUNK chunk, so a header written before the
+    # length is known can be rewritten as RF64 in place once it turns out to be too large.
+    format_tag, bytes_per_sample = SAMPLE_FORMATS[sample_format]
+    block_align = channels * bytes_per_sample
+    data_size = num_frames * block_align
+    bits = bytes_per_sample * 8
+
+    if channels > 2 or (format_tag == WAVE_FORMAT_PCM and bits > 16):
+        # Required for more than two channels or more than 16-bit PCM.
+        fmt_chunk = struct.pack('<4sIHHIIHHHHI', b'fmt ', 40, WAVE_FORMAT_EXTENSIBLE, channels, sample_rate,
+                                sample_rate * block_align, block_align, bits, 22, bits,
+                                CHANNEL_MASKS.get(channels, 0)) + struct.pack('<H', format_tag) + SUBFORMAT_GUID_TAIL
+    elif format_tag == WAVE_FORMAT_PCM:
+        fmt_chunk = struct.pack('<4sIHHIIHH', b'fmt ', 16, format_tag, channels, sample_rate,
+                                sample_rate * block_align, block_align, bits)
+    else:
+        fmt_chunk = struct.pack('<4sIHHIIHHH', b'fmt ', 18, format_tag, channels, sample_rate,
+                                sample_rate * block_align, block_align, bits, 0)
+    fact_chunk = b''
+    if format_tag != WAVE_FORMAT_PCM:
+        fact_chunk = struct.pack('<4sII', b'fact', 4, min(num_frames, SIZE_IN_DS64))
+
+    reserved = 8 + DS64_SIZE if reserve_ds64 else 0
+    riff_size = 4 + reserved + len(fmt_chunk) + len(fact_chunk) + 8 + data_size + data_size % 2
+    if riff_size <= MAX_RIFF_SIZE:
+        junk_chunk = struct.pack('<4sI', b'JUNK', DS64_SIZE) + bytes(DS64_SIZE) if reserve_ds64 else b''
+        return (struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE') + junk_chunk + fmt_chunk + fact_chunk +
+                struct.pack('<4sI', b'data', data_size))
+
+    if not reserve_ds64:
+        riff_size += 8 + DS64_SIZE
+    ds64_chunk = struct.pack('<4sIQQQI', b'ds64', DS64_SIZE, riff_size, data_size, num_frames, 0)
+    return (struct.pack('<4sI4s', b'RF64', SIZE_IN_DS64, b'WAVE') + ds64_chunk + fmt_chunk + fact_chunk +
+            struct.pack('<4sI', b'data', SIZE_IN_DS64))
+
+
+def _to_float(chunk: np.ndarray) -> np.ndarray:
+    if chunk.dtype.kind == 'f':
+        return chunk
+    if chunk.dtype.kind == 'u':
+        half = float(2 ** (chunk.dtype.itemsize * 8 - 1))
+        return (chunk.astype(np.float32) - half) / half
+    return chunk.astype(np.float32) / float(2 ** (chunk.dtype.itemsize * 8 - 1))
+
+
+def encode_samples(chunk: np.ndarray, sample_format: str, dither: str = "none",
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    chunk = _to_float(chunk)
+    if sample_format == "float32":
+        return np.ascontiguousarray(chunk, dtype='<f4').reshape(-1).view(np.uint8)
+
+    _, bytes_per_sample = SAMPLE_FORMATS[sample_format]
+    full_scale = float(2 ** (bytes_per_sample * 8 - 1) - 1)
+    # float64 keeps 32-bit full scale exact; the temporary is bounded by the chunk size.
+    scaled = np.multiply(chunk, full_scale, dtype=np.float64)
+    if dither == "tpdf":
+        rng = rng or np.random.default_rng()
+        scaled += rng.random(scaled.shape)
+        scaled -= rng.random(scaled.shape)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -full_scale - 1, full_scale, out=scaled)
+
+    if bytes_per_sample == 2:
+        return scaled.astype('<i2').reshape(-1).view(np.uint8)
+    samples = scaled.astype('<i4').reshape(-1).view(np.uint8)
+    if bytes_per_sample == 4:
+        return samples
+    # 24-bit PCM: keep the three low bytes of each little-endian int32.
+    return samples.reshape(-1, 4)[:, :3].reshape(-1)
+
+
+def write_wav_chunked(filename: str, audio_array: np.ndarray, sample_rate: int, sample_format: str = "float32",
+                      dither: str = "none", chunk_frames: int = CHUNK_FRAMES,
+                      on_chunk: Optional[Callable[[], None]] = None):
+    check_sample_format(sample_format, dither)
+    frames = audio_array.shape[0]
+    channels = 1 if audio_array.ndim == 1 else audio_array.shape[1]
+    _, bytes_per_sample = SAMPLE_FORMATS[sample_format]
+    frame_bytes = channels * bytes_per_sample
+
+    header = build_wav_header(sample_rate, channels, sample_format, frames)
+    data_size = frames * frame_bytes
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + data_size + data_size % 2)
+
+    if data_size == 0:
+        return
+
+    # The data chunk is preallocated and memory-mapped, so only one converted chunk is ever held in RAM.
+    data = np.memmap(filename, dtype=np.uint8, mode='r+', offset=len(header), shape=(data_size,))
+    try:
+        rng = np.random.default_rng() if dither == "tpdf" else None
+        for start in range(0, frames, chunk_frames):
+            if on_chunk is not None:
+                on_chunk()
+            stop = min(start + chunk_frames, frames)
+            data[start * frame_bytes:stop * frame_bytes] = encode_samples(audio_array[start:stop], sample_format, dither, rng)
+        data.flush()
+    finally:
+        del data
+
+
+class WavStreamWriter:
+    def __init__(self, filename: str, sample_rate: int, channels: int, sample_format: str = "float32",
+                 dither: str = "none"):
+        check_sample_format(sample_format, dither)
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.dither = dither
+        self.frames_written = 0
+        self._rng = np.random.default_rng() if dither == "tpdf" else None
+        self._file = open(filename, 'wb')
+        # The final length is unknown, so room for a ds64 chunk is kept in case the stream passes 4 GB.
+        self._file.write(build_wav_header(sample_rate, channels, sample_format, 0, reserve_ds64=True))
+
+    def write(self, audio_array: np.ndarray):
+        frames = audio_array.shape[0]
+        block_channels = 1 if audio_array.ndim == 1 else audio_array.shape[1]
+        if block_channels != self.channels:
+            raise ValueError(f"Expected {self.channels} channels, got {block_channels}")
+        self._file.write(encode_samples(audio_array, self.sample_format, self.dither, self._rng))
+        self.frames_written += frames
+
+    def close(self):
+        if self._file is None:
+            return
+        # Sizes are only known once the stream ends, so the header is rewritten in place.
+        data_size = self.frames_written * self.channels * SAMPLE_FORMATS[self.sample_format][1]
+        if data_size % 2:
+            self._file.write(b'\x00')
+        self._file.seek(0)
+        self._file.write(build_wav_header(self.sample_rate, self.channels, self.sample_format, self.frames_written,
+                                          reserve_ds64=True))
+        self._file.close()
+        self._file = None
@@ -0,0 +1,127 @@
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+
+BASE_BIN_FRAMES = 16
+LEVEL_FACTOR = 4
+
+
+class _Level:
+    def __init__(self, bin_frames: int):
+        self.bin_frames = bin_frames
+        self.mins = np.empty(256, dtype=np.float32)
+        self.maxs = np.empty(256, dtype=np.float32)
+        self.count = 0
+
+    def append(self, mins: np.ndarray, maxs: np.ndarray):
+        needed = self.count + len(mins)
+        if needed > len(self.mins):
+            capacity = max(needed, 2 * len(self.mins))
+            self.mins = np.resize(self.mins, capacity)
+            self.maxs = np.resize(self.maxs, capacity)
+        self.mins[self.count:needed] = mins
+        self.maxs[self.count:needed] = maxs
+        self.count = needed
+
+
+class WaveformPyramid:
+    # Min/max envelope at several resolutions. Level 0 holds one bin per BASE_BIN_FRAMES
+    # frames and every level above merges LEVEL_FACTOR bins of the one below, so drawing
+    # any zoom touches roughly as many bins as there are pixels.
+    def __init__(self, sample_rate: int = None, base_bin_frames: int = BASE_BIN_FRAMES, factor: int = LEVEL_FACTOR):
+        self.sample_rate = sample_rate
+        self.factor = factor
+        self.levels: List[_Level] = [_Level(base_bin_frames)]
+        self.frames = 0
+        self.version = 0
+        self._pending_frames = np.empty((2, 0), dtype=np.float32)
+        # Bins not yet merged into the next level, per level.
+        self._pending_bins: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_array(cls, audio: np.ndarray, sample_rate: int = None) -> 'WaveformPyramid':
+        pyramid = cls(sample_rate)
+        pyramid.append(audio)
+        return pyramid
+
+    def append(self, block: np.ndarray):
+        # Blocks are (frames,) or channel-first (channels, frames), like AudioBuffer data.
+        if block.ndim == 2:
+            # The overview is mono: each bin spans the extremes of every channel.
+            block_min, block_max = block.min(axis=0), block.max(axis=0)
+        else:
+            block_min = block_max = block
+
+        with self._lock:
+            bin_frames = self.levels[0].bin_frames
+            block_min = np.concatenate([self._pending_frames[0], block_min])
+            block_max = np.concatenate([self._pending_frames[1], block_max])
+            full = len(block_min) // bin_frames * bin_frames
+            self._pending_frames = np.stack([block_min[full:], block_max[full:]]).astype(np.float32)
+
+            mins = block_min[:full].reshape(-1, bin_frames).min(axis=1)
+            maxs = block_max[:full].reshape(-1, bin_frames).max(axis=1)
+            self._push(0, mins, maxs)
+            self.frames += block.shape[-1]
+            self.version += 1
+
+    def _push(self, level_index: int, mins: np.ndarray, maxs: np.ndarray):
+        while len(mins):
+            level = self.levels[level_index]
+            level.append(mins, maxs)
+            if level_index >= len(self._pending_bins):
+                self._pending_bins.append((np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)))
+            pending_min, pending_max = self._pending_bins[level_index]
+            mins = np.concatenate([pending_min, mins])
+            maxs = np.concatenate([pending_max, maxs])
+            full = len(mins) // self.factor * self.factor
+            self._pending_bins[level_index] = (mins[full:], maxs[full:])
+            if not full:
+                return
+
+            mins = mins[:full].reshape(-1, self.factor).min(axis=1)
+            maxs = maxs[:full].reshape(-1, self.factor).max(axis=1)
+            level_index += 1
+            if level_index == len(self.levels):
+                self.levels.append(_Level(level.bin_frames * self.factor))
+
+    def _tail(self, level_index: int) -> Optional[Tuple[float, float]]:
+        # Min and max of the frames after a level's last full bin: the bins of every finer level
+        # still waiting to be merged, plus the frames not yet filling a base bin.
+        pending = [tuple(self._pending_frames)] + self._pending_bins[:level_index]
+        mins = np.concatenate([bins[0] for bins in pending])
+        if not len(mins):
+            return None
+        return float(mins.min()), float(np.concatenate([bins[1] for bins in pending]).max())
+
+    def view(self, start_frame: int = 0, end_frame: int = None, max_points: int = 1024) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Returns bin start frames with the min and max of each bin, from the finest level that fits in max_points.
+        # The partly filled bin at the end is included, so the view always reaches the last frame.
+        with self._lock:
+            end_frame = self.frames if end_frame is None else min(end_frame, self.frames)
+            start_frame = max(0, start_frame)
+            span = max(0, end_frame - start_frame)
+            level_index = len(self.levels) - 1
+            for index, candidate in enumerate(self.levels):
+                if span / candidate.bin_frames <= max_points and candidate.count:
+                    level_index = index
+                    break
+            level = self.levels[level_index]
+
+            first = start_frame // level.bin_frames
+            last = min(level.count, -(-end_frame // level.bin_frames))
+            positions = np.arange(first, last, dtype=np.float64) * level.bin_frames
+            mins, maxs = level.mins[first:last].copy(), level.maxs[first:last].copy()
+            tail = self._tail(level_index) if end_frame > level.count * level.bin_frames else None
+            if tail is not None and start_frame < self.frames:
+                positions = np.append(positions, float(level.count * level.bin_frames))
+                mins = np.append(mins, np.float32(tail[0]))
+                maxs = np.append(maxs, np.float32(tail[1]))
+            return positions, mins, maxs
+
+    def view_seconds(self, start_secs: float = 0.0, end_secs: float = None, max_points: int = 1024):
+        rate = self.sample_rate or 1
+        end_frame = None if end_secs is None else int(end_secs * rate)
+        positions, mins, maxs = self.view(int(start_secs * rate), end_frame, max_points)
+        return positions / rate, mins, maxs
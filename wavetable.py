@@ -0,0 +1,121 @@
+import threading
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+TABLE_SIZE = 2048
+WAVEFORMS = ("sine", "saw", "square", "triangle")
+# One mip level per octave of allowed harmonics: 1, 2, 4, ... TABLE_SIZE // 2.
+NUM_LEVELS = int(np.log2(TABLE_SIZE // 2)) + 1
+CHUNK_FRAMES = 4096
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def _harmonic_amplitudes(waveform: str, max_harmonic: int) -> np.ndarray:
+    k = np.arange(1, max_harmonic + 1, dtype=np.float64)
+    if waveform == "sine":
+        return (k == 1).astype(np.float64)
+    if waveform == "saw":
+        return (2. / np.pi) * np.where(k % 2 == 1, 1., -1.) / k
+    if waveform == "square":
+        return np.where(k % 2 == 1, (4. / np.pi) / k, 0.)
+    if waveform == "triangle":
+        signs = np.where((k - 1) % 4 == 0, 1., -1.)
+        return np.where(k % 2 == 1, (8. / np.pi ** 2) * signs / k ** 2, 0.)
+    raise ValueError(f"Unknown waveform '{waveform}'")
+
+
+def _build_tables() -> np.ndarray:
+    tables = np.empty((len(WAVEFORMS), NUM_LEVELS, TABLE_SIZE + 1), dtype=np.float32)
+    for wave_index, waveform in enumerate(WAVEFORMS):
+        for level in range(NUM_LEVELS):
+            amplitudes = _harmonic_amplitudes(waveform, 2 ** level)
+            spectrum = np.zeros(TABLE_SIZE // 2 + 1, dtype=np.complex128)
+            spectrum[1:len(amplitudes) + 1] = -0.5j * TABLE_SIZE * amplitudes
+            table = np.fft.irfft(spectrum, TABLE_SIZE)
+            tables[wave_index, level, :TABLE_SIZE] = table
+            tables[wave_index, level, TABLE_SIZE] = table[0]
+    return tables
+
+
+def get_tables() -> np.ndarray:
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                _tables = _build_tables()
+    return _tables
+
+
+def waveform_index(waveform: str) -> int:
+    try:
+        return WAVEFORMS.index(waveform)
+    except ValueError:
+        raise ValueError(f"Unknown waveform '{waveform}', expected one of {', '.join(WAVEFORMS)}")
+
+
+def _mip_levels(frequencies: np.ndarray, sample_rate: int) -> np.ndarray:
+    # Pick the richest table whose highest harmonic still sits below Nyquist.
+    max_harmonics = np.floor((sample_rate / 2.) / np.maximum(np.abs(frequencies), 1e-6))
+    levels = np.floor(np.log2(np.maximum(max_harmonics, 1.)))
+    return np.clip(levels, 0, NUM_LEVELS - 1).astype(np.int64)
+
+
+def render_oscillators(frequencies: Sequence[float], amplitudes: Sequence[float], waveforms: Sequence[int],
+                       frames: int, sample_rate: int, phases: Optional[np.ndarray] = None,
+                       out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    amplitudes = np.asarray(amplitudes, dtype=np.float32)
+    waveforms = np.asarray(waveforms, dtype=np.int64)
+    voices = len(frequencies)
+
+    phases = np.zeros(voices, dtype=np.float64) if phases is None else np.asarray(phases, dtype=np.float64)
+    if out is None:
+        out = np.empty((voices, frames), dtype=np.float32)
+
+    tables = get_tables()
+    flat_tables = tables.reshape(-1)
+    row_offsets = ((waveforms * NUM_LEVELS + _mip_levels(frequencies, sample_rate)) * (TABLE_SIZE + 1)).astype(np.int64)
+
+    increments = frequencies / sample_rate
+    increments32 = increments.astype(np.float32)[:, None]
+    amplitudes = amplitudes[:, None]
+
+    chunk = min(CHUNK_FRAMES, max(frames, 1))
+    ramp = np.arange(chunk, dtype=np.float32)
+    position = np.empty((voices, chunk), dtype=np.float32)
+    whole = np.empty((voices, chunk), dtype=np.float32)
+    index = np.empty((voices, chunk), dtype=np.int64)
+    lower = np.empty((voices, chunk), dtype=np.float32)
+    upper = np.empty((voices, chunk), dtype=np.float32)
+
+    for start in range(0, frames, chunk):
+        n = min(chunk, frames - start)
+        pos, whl, idx, lo, hi = position[:, :n], whole[:, :n], index[:, :n], lower[:, :n], upper[:, :n]
+
+        # Phase within the chunk is a float32 ramp from the carried per-voice start phase.
+        np.multiply(increments32, ramp[:n], out=pos)
+        np.add(pos, phases.astype(np.float32)[:, None], out=pos)
+        np.floor(pos, out=whl)
+        np.subtract(pos, whl, out=pos)
+        np.multiply(pos, TABLE_SIZE, out=pos)
+
+        np.floor(pos, out=whl)
+        np.subtract(pos, whl, out=pos)
+        idx[...] = whl
+        np.add(idx, row_offsets[:, None], out=idx)
+
+        np.take(flat_tables, idx, out=lo, mode='clip')
+        np.add(idx, 1, out=idx)
+        np.take(flat_tables, idx, out=hi, mode='clip')
+
+        np.subtract(hi, lo, out=hi)
+        np.multiply(hi, pos, out=hi)
+        target = out[:, start:start + n]
+        np.add(lo, hi, out=target)
+        np.multiply(target, amplitudes, out=target)
+
+        phases = (phases + increments * n) % 1.0
+
+    return out, phases